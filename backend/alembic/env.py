@@ -1,3 +1,4 @@
+import os
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -14,6 +15,12 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Let the app's DATABASE_URL win over alembic.ini so both always agree.
+if os.environ.get("DATABASE_URL"):
+    config.set_main_option(
+        "sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%")
+    )
+
 from app.models import Board, Card, Connection  # noqa: F401
 from app.database import Base
 
@@ -0,0 +1,46 @@
+"""jobs
+
+Revision ID: 0d93e4b7c1a8
+Revises: f2b6a9d03c71
+Create Date: 2026-10-19 21:15:37.204519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import GUID
+
+
+revision: str = '0d93e4b7c1a8'
+down_revision: Union[str, Sequence[str], None] = 'f2b6a9d03c71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('jobs',
+    sa.Column('id', GUID(), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('board_id', GUID(), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=False),
+    sa.Column('progress', sa.Float(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('cancel_requested', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_status_created', 'jobs', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_status_created', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,27 @@
+"""card z_index index
+
+Revision ID: 5c1e2a7b9d40
+Revises: 417dc4ed0bc8
+Create Date: 2026-10-19 09:12:44.108213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '5c1e2a7b9d40'
+down_revision: Union[str, Sequence[str], None] = '417dc4ed0bc8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cards_board_z', 'cards', ['board_id', 'z_index'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cards_board_z', table_name='cards')
@@ -0,0 +1,101 @@
+"""compact uuid keys
+
+Revision ID: 8f3b6d2e1a57
+Revises: 5c1e2a7b9d40
+Create Date: 2026-10-19 11:03:27.551902
+
+"""
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '8f3b6d2e1a57'
+down_revision: Union[str, Sequence[str], None] = '5c1e2a7b9d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+KEY_COLUMNS = {
+    'boards': ['id'],
+    'cards': ['id', 'board_id'],
+    'connections': ['id', 'board_id', 'from_card_id', 'to_card_id'],
+}
+
+FOREIGN_KEYS = [
+    ('cards_board_id_fkey', 'cards', 'boards', 'board_id'),
+    ('connections_board_id_fkey', 'connections', 'boards', 'board_id'),
+    ('connections_from_card_id_fkey', 'connections', 'cards', 'from_card_id'),
+    ('connections_to_card_id_fkey', 'connections', 'cards', 'to_card_id'),
+]
+
+
+def _to_bytes(value):
+    return uuid.UUID(value).bytes
+
+
+def _to_string(value):
+    return str(uuid.UUID(bytes=bytes(value)))
+
+
+def _rewrite_sqlite_keys(convert) -> None:
+    # SQLite has no unhex() before 3.41, so the conversion runs in Python.
+    # Alembic's connection does not enable foreign_keys, so ids can be
+    # rewritten table by table without tripping the constraints.
+    bind = op.get_bind()
+    for table, columns in KEY_COLUMNS.items():
+        rows = bind.execute(
+            sa.text(f"SELECT rowid, {', '.join(columns)} FROM {table}")
+        ).all()
+        if not rows:
+            continue
+        assignments = ', '.join(f"{column} = :{column}" for column in columns)
+        bind.execute(
+            sa.text(f"UPDATE {table} SET {assignments} WHERE rowid = :rowid"),
+            [
+                {'rowid': row[0], **{c: convert(v) for c, v in zip(columns, row[1:])}}
+                for row in rows
+            ],
+        )
+
+
+def _retype_sqlite(existing, new) -> None:
+    for table, columns in KEY_COLUMNS.items():
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=existing, type_=new)
+
+
+def _retype_postgresql(new, using) -> None:
+    for name, table, _, _ in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+    for table, columns in KEY_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table, column, type_=new, postgresql_using=f"{column}::{using}"
+            )
+    for name, table, referent, column in FOREIGN_KEYS:
+        op.create_foreign_key(
+            name, table, referent, [column], ['id'], ondelete='CASCADE'
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        _retype_postgresql(postgresql.UUID(as_uuid=False), 'uuid')
+    else:
+        _rewrite_sqlite_keys(_to_bytes)
+        _retype_sqlite(sa.String(length=36), sa.LargeBinary(length=16))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        _retype_postgresql(sa.String(length=36), 'varchar')
+    else:
+        _rewrite_sqlite_keys(_to_string)
+        _retype_sqlite(sa.LargeBinary(length=16), sa.String(length=36))
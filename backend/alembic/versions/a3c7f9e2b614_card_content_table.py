@@ -0,0 +1,216 @@
+"""card content table
+
+Revision ID: a3c7f9e2b614
+Revises: e91c5a0d7f34
+Create Date: 2026-10-19 18:12:40.318204
+
+"""
+import hashlib
+import json
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a3c7f9e2b614'
+down_revision: Union[str, Sequence[str], None] = 'e91c5a0d7f34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Frozen copy of app.models.CompressedText and the default
+# CONTENT_COMPRESS_THRESHOLD as of this revision, so later changes to either
+# cannot change what this migration writes
+_COMPRESS_THRESHOLD = 1024
+
+
+class CompressedText(sa.types.TypeDecorator):
+    impl = sa.LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        raw = value.encode()
+        if len(raw) >= _COMPRESS_THRESHOLD:
+            return b'z' + zlib.compress(raw)
+        return b't' + raw
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        value = bytes(value)
+        body = value[1:]
+        if value[:1] == b'z':
+            body = zlib.decompress(body)
+        return body.decode()
+
+
+card_contents = sa.table(
+    'card_contents', sa.column('hash', sa.String), sa.column('body', CompressedText)
+)
+board_operations = sa.table(
+    'board_operations', sa.column('id'), sa.column('undo', sa.JSON), sa.column('redo', sa.JSON)
+)
+board_snapshots = sa.table(
+    'board_snapshots', sa.column('id'), sa.column('board_id'), sa.column('manifest', sa.JSON)
+)
+snapshot_objects = sa.table(
+    'snapshot_objects', sa.column('board_id'), sa.column('hash'), sa.column('data', sa.JSON)
+)
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _digest(data) -> str:
+    # Same canonical form as app.snapshots
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _rewrite_journal(bind, old: str, new: str, convert) -> None:
+    """Replace a cards field in every journaled step, converting its values."""
+    changed = []
+    for operation in bind.execute(sa.select(board_operations)).all():
+        steps = {'undo': operation.undo, 'redo': operation.redo}
+        touched = False
+        for step in (*steps['undo'], *steps['redo']):
+            if step['table'] != 'cards' or old not in step.get('fields', []):
+                continue
+            index = step['fields'].index(old)
+            step['fields'][index] = new
+            for row in step['rows']:
+                row[index] = convert(row[index])
+            touched = True
+        if touched:
+            changed.append({'_id': operation.id, **steps})
+    if changed:
+        bind.execute(
+            board_operations.update()
+            .where(board_operations.c.id == sa.bindparam('_id'))
+            .values(undo=sa.bindparam('undo'), redo=sa.bindparam('redo')),
+            changed,
+        )
+
+
+def _rewrite_snapshots(bind, old: str, new: str, convert) -> None:
+    """Re-encode snapshot card records, then re-address their pages and manifests.
+
+    Objects are keyed by the hash of their data, so every record that changes
+    gets a new hash, and so does every page listing it.
+    """
+    objects = bind.execute(sa.select(snapshot_objects)).all()
+    new_hashes = {}
+    replaced = {}
+    for obj in objects:
+        if isinstance(obj.data, dict) and old in obj.data:
+            data = {**obj.data, new: convert(obj.data[old])}
+            del data[old]
+            new_hashes[(obj.board_id, obj.hash)] = _digest(data)
+            replaced[(obj.board_id, obj.hash)] = data
+    if not replaced:
+        return
+    for obj in objects:
+        if isinstance(obj.data, list) and any(
+            (obj.board_id, row_hash) in new_hashes for _, row_hash in obj.data
+        ):
+            page = sorted(
+                [row_id, new_hashes.get((obj.board_id, row_hash), row_hash)]
+                for row_id, row_hash in obj.data
+            )
+            new_hashes[(obj.board_id, obj.hash)] = _digest(page)
+            replaced[(obj.board_id, obj.hash)] = page
+
+    bind.execute(
+        snapshot_objects.delete().where(
+            snapshot_objects.c.board_id == sa.bindparam('_board_id'),
+            snapshot_objects.c.hash == sa.bindparam('_hash'),
+        ),
+        [{'_board_id': board_id, '_hash': object_hash} for board_id, object_hash in replaced],
+    )
+    # Identical records on one board collapse into a single object again
+    rows = {
+        (board_id, new_hashes[(board_id, object_hash)]): data
+        for (board_id, object_hash), data in replaced.items()
+    }
+    bind.execute(
+        sa.insert(snapshot_objects),
+        [{'board_id': b, 'hash': h, 'data': data} for (b, h), data in rows.items()],
+    )
+
+    for snapshot in bind.execute(sa.select(board_snapshots)).all():
+        manifest = snapshot.manifest
+        pages = {
+            bucket: new_hashes.get((snapshot.board_id, page_hash), page_hash)
+            for bucket, page_hash in manifest['cards'].items()
+        }
+        if pages != manifest['cards']:
+            bind.execute(
+                board_snapshots.update()
+                .where(board_snapshots.c.id == snapshot.id)
+                .values(manifest={**manifest, 'cards': pages})
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('card_contents',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('body', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.add_column('cards', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    bind = op.get_bind()
+    bodies = {_hash(''): ''}
+
+    def store(text: str) -> str:
+        digest = _hash(text)
+        bodies[digest] = text
+        return digest
+
+    cards = bind.execute(sa.text('SELECT id, content FROM cards')).all()
+    hashes = [{'_id': card_id, 'content_hash': store(text)} for card_id, text in cards]
+    _rewrite_journal(bind, 'content', 'content_hash', store)
+    _rewrite_snapshots(bind, 'content', 'content_hash', store)
+    bind.execute(
+        sa.insert(card_contents),
+        [{'hash': digest, 'body': text} for digest, text in bodies.items()],
+    )
+    if hashes:
+        bind.execute(
+            sa.text('UPDATE cards SET content_hash = :content_hash WHERE id = :_id'), hashes
+        )
+
+    with op.batch_alter_table('cards') as batch_op:
+        batch_op.alter_column('content_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_foreign_key(
+            'fk_cards_content_hash_card_contents', 'card_contents', ['content_hash'], ['hash']
+        )
+        batch_op.drop_column('content')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('cards', sa.Column('content', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    bodies = dict(bind.execute(sa.select(card_contents.c.hash, card_contents.c.body)).all())
+    cards = bind.execute(sa.text('SELECT id, content_hash FROM cards')).all()
+    if cards:
+        bind.execute(
+            sa.text('UPDATE cards SET content = :content WHERE id = :_id'),
+            [{'_id': card_id, 'content': bodies[digest]} for card_id, digest in cards],
+        )
+    _rewrite_journal(bind, 'content_hash', 'content', bodies.__getitem__)
+    _rewrite_snapshots(bind, 'content_hash', 'content', bodies.__getitem__)
+
+    with op.batch_alter_table('cards') as batch_op:
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_constraint('fk_cards_content_hash_card_contents', type_='foreignkey')
+        batch_op.drop_column('content_hash')
+    op.drop_table('card_contents')
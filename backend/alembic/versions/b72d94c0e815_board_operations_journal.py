@@ -0,0 +1,41 @@
+"""board operations journal
+
+Revision ID: b72d94c0e815
+Revises: 8f3b6d2e1a57
+Create Date: 2026-10-19 13:40:12.873051
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import GUID
+
+
+revision: str = 'b72d94c0e815'
+down_revision: Union[str, Sequence[str], None] = '8f3b6d2e1a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('board_operations',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('board_id', GUID(), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('undo', sa.JSON(), nullable=False),
+    sa.Column('redo', sa.JSON(), nullable=False),
+    sa.Column('undone', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['board_id'], ['boards.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_board_operations_board', 'board_operations', ['board_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_board_operations_board', table_name='board_operations')
+    op.drop_table('board_operations')
@@ -0,0 +1,29 @@
+"""card filter indexes
+
+Revision ID: c58e1d7a4f92
+Revises: a3c7f9e2b614
+Create Date: 2026-10-19 19:40:08.905137
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c58e1d7a4f92'
+down_revision: Union[str, Sequence[str], None] = 'a3c7f9e2b614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cards_color_board', 'cards', ['color', 'board_id', 'updated_at'], unique=False)
+    op.create_index('ix_cards_updated_at', 'cards', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cards_updated_at', table_name='cards')
+    op.drop_index('ix_cards_color_board', table_name='cards')
@@ -0,0 +1,49 @@
+"""board snapshots
+
+Revision ID: d4a8e3f61b29
+Revises: b72d94c0e815
+Create Date: 2026-10-19 15:21:08.402716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import GUID
+
+
+revision: str = 'd4a8e3f61b29'
+down_revision: Union[str, Sequence[str], None] = 'b72d94c0e815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('board_snapshots',
+    sa.Column('id', GUID(), nullable=False),
+    sa.Column('board_id', GUID(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('manifest', sa.JSON(), nullable=False),
+    sa.Column('card_count', sa.Integer(), nullable=False),
+    sa.Column('connection_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['board_id'], ['boards.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_board_snapshots_board_id'), 'board_snapshots', ['board_id'], unique=False)
+    op.create_table('snapshot_objects',
+    sa.Column('board_id', GUID(), nullable=False),
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['board_id'], ['boards.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('board_id', 'hash')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('snapshot_objects')
+    op.drop_index(op.f('ix_board_snapshots_board_id'), table_name='board_snapshots')
+    op.drop_table('board_snapshots')
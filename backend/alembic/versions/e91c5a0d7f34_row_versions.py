@@ -0,0 +1,31 @@
+"""row versions
+
+Revision ID: e91c5a0d7f34
+Revises: d4a8e3f61b29
+Create Date: 2026-10-19 17:05:51.226740
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e91c5a0d7f34'
+down_revision: Union[str, Sequence[str], None] = 'd4a8e3f61b29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cards', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('connections', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('connections') as batch_op:
+        batch_op.drop_column('version')
+    with op.batch_alter_table('cards') as batch_op:
+        batch_op.drop_column('version')
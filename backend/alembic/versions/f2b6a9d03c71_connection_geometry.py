@@ -0,0 +1,91 @@
+"""connection geometry
+
+Revision ID: f2b6a9d03c71
+Revises: c58e1d7a4f92
+Create Date: 2026-10-19 20:26:14.572913
+
+"""
+import math
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'f2b6a9d03c71'
+down_revision: Union[str, Sequence[str], None] = 'c58e1d7a4f92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Frozen copy of app.geometry as of this revision, so later changes to how
+# connections are drawn cannot change what this migration writes
+GEOMETRY_FIELDS = ('start_x', 'start_y', 'control_x', 'control_y', 'end_x', 'end_y')
+_CURVE = 0.2
+_MAX_OFFSET = 5.0
+
+
+def _edge_midpoints(x: float, y: float, width: float, height: float) -> list[tuple]:
+    # Order matters for ties: top, bottom, left, right
+    return [
+        (x + width / 2, y),
+        (x + width / 2, y + height),
+        (x, y + height / 2),
+        (x + width, y + height / 2),
+    ]
+
+
+def connection_path(from_rect: tuple, to_rect: tuple) -> dict[str, float]:
+    best = None
+    for start in _edge_midpoints(*from_rect):
+        for end in _edge_midpoints(*to_rect):
+            distance = (start[0] - end[0]) ** 2 + (start[1] - end[1]) ** 2
+            if best is None or distance < best[0]:
+                best = (distance, start, end)
+    _, (start_x, start_y), (end_x, end_y) = best
+    dx, dy = end_x - start_x, end_y - start_y
+    length = math.hypot(dx, dy)
+    offset = min(length * _CURVE, _MAX_OFFSET)
+    nx, ny = (-dy / length, dx / length) if length > 0 else (0.0, 0.0)
+    return {
+        'start_x': start_x,
+        'start_y': start_y,
+        'control_x': (start_x + end_x) / 2 + nx * offset,
+        'control_y': (start_y + end_y) / 2 + ny * offset,
+        'end_x': end_x,
+        'end_y': end_y,
+    }
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name in GEOMETRY_FIELDS:
+        op.add_column('connections', sa.Column(name, sa.Float(), nullable=True))
+    op.create_index('ix_connections_board', 'connections', ['board_id'], unique=False)
+    op.create_index('ix_connections_to_card', 'connections', ['to_card_id'], unique=False)
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        'SELECT connections.id, '
+        'a.x, a.y, a.width, a.height, b.x, b.y, b.width, b.height '
+        'FROM connections '
+        'JOIN cards AS a ON a.id = connections.from_card_id '
+        'JOIN cards AS b ON b.id = connections.to_card_id'
+    )).all()
+    if rows:
+        assignments = ', '.join(f'{name} = :{name}' for name in GEOMETRY_FIELDS)
+        bind.execute(
+            sa.text(f'UPDATE connections SET {assignments} WHERE id = :_id'),
+            [
+                {'_id': row[0], **connection_path(tuple(row[1:5]), tuple(row[5:9]))}
+                for row in rows
+            ],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_connections_to_card', table_name='connections')
+    op.drop_index('ix_connections_board', table_name='connections')
+    with op.batch_alter_table('connections') as batch_op:
+        for name in reversed(GEOMETRY_FIELDS):
+            batch_op.drop_column(name)
@@ -0,0 +1,79 @@
+"""Runtime settings, read once from the environment.
+
+Every worker process reads these independently, so a launcher only has to
+export the variables before spawning workers.
+"""
+import os
+
+
+def _int_env(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./corkboard.db")
+
+# Optional read replica (app.replication) for read-only routes. A client's
+# reads stay on the primary for up to REPLICA_MAX_LAG seconds after its own
+# write, or until the replica has replayed it (PostgreSQL only).
+REPLICA_DATABASE_URL = os.environ.get("REPLICA_DATABASE_URL", "")
+REPLICA_MAX_LAG = _int_env("CORKBOARD_REPLICA_MAX_LAG", 5)
+
+# Worker threads that run the sync route handlers (anyio's default is 40).
+THREADPOOL_SIZE = _int_env("CORKBOARD_THREADPOOL_SIZE", 40)
+
+# Per-worker connection pool. pool_size + max_overflow should cover
+# THREADPOOL_SIZE, otherwise handler threads queue on the pool.
+DB_POOL_SIZE = _int_env("CORKBOARD_DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _int_env("CORKBOARD_DB_MAX_OVERFLOW", 30)
+DB_POOL_TIMEOUT = _int_env("CORKBOARD_DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = _int_env("CORKBOARD_DB_POOL_RECYCLE", 1800)
+
+# Responses smaller than this are sent uncompressed.
+GZIP_MINIMUM_SIZE = _int_env("CORKBOARD_GZIP_MINIMUM_SIZE", 1024)
+GZIP_COMPRESS_LEVEL = _int_env("CORKBOARD_GZIP_COMPRESS_LEVEL", 6)
+
+# Undo/redo operations kept per board; older ones are pruned.
+HISTORY_LIMIT = _int_env("CORKBOARD_HISTORY_LIMIT", 100)
+
+# Card bodies at least this many bytes are stored zlib-compressed.
+CONTENT_COMPRESS_THRESHOLD = _int_env("CORKBOARD_CONTENT_COMPRESS_THRESHOLD", 1024)
+
+# Background jobs (app.jobs): threads per worker process, an optional
+# process pool for CPU-bound kinds (0 disables it), and how many jobs may
+# wait in the queue before new ones are refused.
+JOB_WORKERS = _int_env("CORKBOARD_JOB_WORKERS", 2)
+JOB_PROCESSES = _int_env("CORKBOARD_JOB_PROCESSES", 0)
+JOB_QUEUE_LIMIT = _int_env("CORKBOARD_JOB_QUEUE_LIMIT", 100)
+# Seconds between queue polls, and without a heartbeat before a running job
+# is considered orphaned (its worker died) and requeued.
+JOB_POLL_INTERVAL = _int_env("CORKBOARD_JOB_POLL_INTERVAL", 1)
+JOB_STALE_AFTER = _int_env("CORKBOARD_JOB_STALE_AFTER", 60)
+
+# Mutation rate limits (app.ratelimit): token buckets per client address
+# and per board, refilled at RATE requests/second up to BURST; 0 disables.
+RATE_LIMIT_CLIENT_RATE = _int_env("CORKBOARD_RATE_LIMIT_CLIENT_RATE", 30)
+RATE_LIMIT_CLIENT_BURST = _int_env("CORKBOARD_RATE_LIMIT_CLIENT_BURST", 60)
+RATE_LIMIT_BOARD_RATE = _int_env("CORKBOARD_RATE_LIMIT_BOARD_RATE", 60)
+RATE_LIMIT_BOARD_BURST = _int_env("CORKBOARD_RATE_LIMIT_BOARD_BURST", 120)
+# The client address is the peer of the connection, so by default everyone
+# behind one reverse proxy shares a bucket. Behind N trusted proxies set this
+# to N to use the address the outermost one saw (the Nth X-Forwarded-For
+# entry from the right); never set it when clients can connect directly.
+RATE_LIMIT_TRUSTED_PROXIES = _int_env("CORKBOARD_RATE_LIMIT_TRUSTED_PROXIES", 0)
+# Mutations are shed while this many are already in flight in a worker, or
+# while the recent ones took longer than this on average; 0 disables either.
+ADMISSION_MAX_WRITES = _int_env("CORKBOARD_ADMISSION_MAX_WRITES", 32)
+ADMISSION_MAX_LATENCY_MS = _int_env("CORKBOARD_ADMISSION_MAX_LATENCY_MS", 1000)
+
+# On-demand profiling (app.profiling): requests sending this value in an
+# X-Corkboard-Profile header are profiled, and the captures kept in a ring
+# buffer of PROFILE_BUFFER_SIZE. Unset, nothing is installed at all.
+PROFILING_TOKEN = os.environ.get("CORKBOARD_PROFILING_TOKEN", "")
+PROFILE_BUFFER_SIZE = _int_env("CORKBOARD_PROFILE_BUFFER_SIZE", 20)
+
+# Production launcher (app.serve).
+HOST = os.environ.get("CORKBOARD_HOST", "127.0.0.1")
+PORT = _int_env("CORKBOARD_PORT", 8000)
+WORKERS = _int_env("CORKBOARD_WORKERS", os.cpu_count() or 1)
+GRACEFUL_SHUTDOWN_TIMEOUT = _int_env("CORKBOARD_GRACEFUL_SHUTDOWN_TIMEOUT", 30)
@@ -0,0 +1,90 @@
+"""Deduplicated storage for card bodies.
+
+Cards refer to their text by ``content_hash``; the text itself lives once in
+``card_contents`` no matter how many cards, journal entries or snapshots use
+it. Content rows are never updated, and only deleted by ``collect_garbage``
+once nothing can refer to them again, so a hash in the journal or a snapshot
+stays resolvable, e.g. when an undo puts an old body back.
+"""
+import hashlib
+from collections.abc import Iterable
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import BoardOperation, Card, CardContent, SnapshotObject
+
+# Keeps IN lists well below SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def store_content(db: Session, text: str) -> str:
+    """Store ``text`` unless it already is, and return its hash."""
+    return store_contents(db, [text])[text]
+
+
+def store_contents(db: Session, texts: Iterable[str]) -> dict[str, str]:
+    """Store several texts in one statement; map each text to its hash."""
+    hashes = {text: content_hash(text) for text in texts}
+    if not hashes:
+        return hashes
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    # Two requests saving the same text race on the primary key; both win
+    db.execute(
+        dialect.insert(CardContent).on_conflict_do_nothing(index_elements=["hash"]),
+        [{"hash": digest, "body": text} for text, digest in hashes.items()],
+    )
+    return hashes
+
+
+def _journal_hashes(db: Session) -> set[str]:
+    hashes = set()
+    rows = db.execute(select(BoardOperation.undo, BoardOperation.redo))
+    for undo, redo in rows.yield_per(_CHUNK):
+        for step in (*undo, *redo):
+            fields = step.get("fields", [])
+            if step["table"] == "cards" and "content_hash" in fields:
+                index = fields.index("content_hash")
+                hashes.update(row[index] for row in step["rows"])
+    return hashes
+
+
+def _snapshot_hashes(db: Session) -> set[str]:
+    # Pages are lists; row records are dicts, and card records carry the hash
+    return {
+        data["content_hash"]
+        for data in db.scalars(select(SnapshotObject.data)).yield_per(_CHUNK)
+        if isinstance(data, dict) and "content_hash" in data
+    }
+
+
+def collect_garbage(db: Session) -> int:
+    """Delete the bodies no card, journal step or snapshot refers to; return how many.
+
+    Journal steps and snapshot records are JSON, so they are scanned here;
+    the cards are checked again by each DELETE, so a body a card took up in
+    the meantime is kept.
+    """
+    kept = _journal_hashes(db) | _snapshot_hashes(db)
+    in_use = select(Card.content_hash)
+    unused = [
+        digest
+        for digest in db.scalars(
+            select(CardContent.hash).where(CardContent.hash.not_in(in_use))
+        )
+        if digest not in kept
+    ]
+    deleted = 0
+    for start in range(0, len(unused), _CHUNK):
+        deleted += db.execute(
+            delete(CardContent).where(
+                CardContent.hash.in_(unused[start : start + _CHUNK]),
+                CardContent.hash.not_in(in_use),
+            )
+        ).rowcount
+    return deleted
@@ -1,32 +1,73 @@
-import os
 from collections.abc import Generator
 
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
-DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./corkboard.db")
-
-engine = create_engine(
+from app.config import (
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    REPLICA_DATABASE_URL,
 )
 
 
+def _create_engine(url: str):
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False} if "sqlite" in url else {},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+engine = _create_engine(DATABASE_URL)
+# Read-only routes go here when it is set (see app.replication)
+replica_engine = _create_engine(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None
+
+
 @event.listens_for(engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     if "sqlite" in DATABASE_URL:
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys = ON")
+        # WAL lets worker processes read while another one writes
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.close()
+
+
+if replica_engine is not None and "sqlite" in REPLICA_DATABASE_URL:
+
+    @event.listens_for(replica_engine, "connect")
+    def set_replica_pragma(dbapi_connection, connection_record):
+        # A file standing in for a replica must not be written by mistake
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only = ON")
         cursor.close()
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    if replica_engine is not None
+    else None
+)
 
 
 class Base(DeclarativeBase):
     pass
 
 
+def warm_pool() -> None:
+    """Check out and return one connection so the first request skips connect."""
+    with engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+
+
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
@@ -0,0 +1,129 @@
+"""Cached rendering geometry for connections.
+
+A connection is drawn as a quadratic bezier from the nearest pair of edge
+midpoints of its two cards, with the control point pushed off the straight
+line in proportion to its length (capped). The result is stored on the
+connection row, so clients only draw it; whenever a card's rectangle
+changes, the connections touching that card are recomputed together: one
+read of the card rectangles and one executemany UPDATE.
+
+Being derived, the geometry is left out of snapshot records and does not
+bump connection versions; rows re-inserted from older journal entries or
+snapshots get it recomputed.
+"""
+import math
+from collections.abc import Iterable
+
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Card, Connection
+
+GEOMETRY_FIELDS = ("start_x", "start_y", "control_x", "control_y", "end_x", "end_y")
+
+# Card fields a connection's geometry depends on
+RECT_FIELDS = ("x", "y", "width", "height")
+
+# Curve offset as a share of the line length, and its cap (as in ConnectionLine.tsx)
+_CURVE = 0.2
+_MAX_OFFSET = 5.0
+
+# Keeps IN lists well below SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+def _edge_midpoints(x: float, y: float, width: float, height: float) -> list[tuple]:
+    # Order matters for ties: top, bottom, left, right
+    return [
+        (x + width / 2, y),
+        (x + width / 2, y + height),
+        (x, y + height / 2),
+        (x + width, y + height / 2),
+    ]
+
+
+def connection_path(from_rect: tuple, to_rect: tuple) -> dict[str, float]:
+    """Geometry of a connection between two ``(x, y, width, height)`` rects."""
+    best = None
+    for start in _edge_midpoints(*from_rect):
+        for end in _edge_midpoints(*to_rect):
+            distance = (start[0] - end[0]) ** 2 + (start[1] - end[1]) ** 2
+            if best is None or distance < best[0]:
+                best = (distance, start, end)
+    _, (start_x, start_y), (end_x, end_y) = best
+    dx, dy = end_x - start_x, end_y - start_y
+    length = math.hypot(dx, dy)
+    offset = min(length * _CURVE, _MAX_OFFSET)
+    nx, ny = (-dy / length, dx / length) if length > 0 else (0.0, 0.0)
+    return {
+        "start_x": start_x,
+        "start_y": start_y,
+        "control_x": (start_x + end_x) / 2 + nx * offset,
+        "control_y": (start_y + end_y) / 2 + ny * offset,
+        "end_x": end_x,
+        "end_y": end_y,
+    }
+
+
+def card_rect(card) -> tuple:
+    return tuple(getattr(card, field) for field in RECT_FIELDS)
+
+
+def _chunks(values: list) -> Iterable[list]:
+    for start in range(0, len(values), _CHUNK):
+        yield values[start : start + _CHUNK]
+
+
+def _rects(db: Session, card_ids: set[str]) -> dict[str, tuple]:
+    rects = {}
+    for chunk in _chunks(list(card_ids)):
+        rows = db.execute(
+            select(Card.id, *(getattr(Card, f) for f in RECT_FIELDS)).where(
+                Card.id.in_(chunk)
+            )
+        )
+        rects.update((row[0], tuple(row[1:])) for row in rows)
+    return rects
+
+
+def _write(db: Session, connections: list[tuple[str, str, str]]) -> None:
+    rects = _rects(db, {card_id for _, a, b in connections for card_id in (a, b)})
+    rows = []
+    for connection_id, a, b in connections:
+        path = connection_path(rects[a], rects[b])
+        rows.append({"_id": connection_id, **{f"_{k}": v for k, v in path.items()}})
+    if not rows:
+        return
+    table = Connection.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("_id"))
+        .values({name: bindparam(f"_{name}") for name in GEOMETRY_FIELDS}),
+        rows,
+    )
+
+
+def refresh_for_cards(db: Session, card_ids: Iterable[str]) -> list[str]:
+    """Recompute the geometry of every connection touching ``card_ids``; return their ids."""
+    connections = {}
+    for chunk in _chunks(list(set(card_ids))):
+        rows = db.execute(
+            select(Connection.id, Connection.from_card_id, Connection.to_card_id).where(
+                or_(Connection.from_card_id.in_(chunk), Connection.to_card_id.in_(chunk))
+            )
+        )
+        connections.update((row[0], tuple(row)) for row in rows)
+    _write(db, list(connections.values()))
+    return list(connections)
+
+
+def refresh_connections(db: Session, connection_ids: Iterable[str]) -> None:
+    """Recompute the geometry of the given connections, e.g. after re-inserting them."""
+    connections = []
+    for chunk in _chunks(list(set(connection_ids))):
+        connections += db.execute(
+            select(Connection.id, Connection.from_card_id, Connection.to_card_id).where(
+                Connection.id.in_(chunk)
+            )
+        ).all()
+    _write(db, [tuple(row) for row in connections])
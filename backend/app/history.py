@@ -0,0 +1,167 @@
+"""Per-board undo/redo journal.
+
+Each user action is stored as one ``BoardOperation`` holding two step lists:
+the steps that undo it and the steps that redo it. A step is a compact,
+column-oriented description of one set-based statement::
+
+    {"op": "insert", "table": "cards", "fields": [...], "rows": [[...], ...]}
+    {"op": "update", "table": "cards", "fields": ["id", "x"], "rows": [[...]]}
+    {"op": "delete", "table": "cards", "ids": [...]}
+
+so undoing a 500-card move is a single executemany UPDATE, and undoing a card
+delete is one INSERT for the card and one for its connections.
+"""
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import DateTime, delete, insert, select
+from sqlalchemy.orm import Session
+
+from app import geometry, versioning
+from app.config import HISTORY_LIMIT
+from app.models import BoardOperation, Card, Connection
+
+TABLES = {"cards": Card, "connections": Connection}
+
+
+def _columns(table: str) -> list[str]:
+    return [column.key for column in TABLES[table].__table__.columns]
+
+
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def insert_step(table: str, objects: Iterable) -> dict:
+    fields = _columns(table)
+    rows = [[_encode(getattr(obj, field)) for field in fields] for obj in objects]
+    return {"op": "insert", "table": table, "fields": fields, "rows": rows}
+
+
+def update_step(table: str, fields: list[str], rows: list[list]) -> dict:
+    """``rows`` are ``[id, *values]`` in the order of ``fields``."""
+    return {"op": "update", "table": table, "fields": ["id", *fields], "rows": rows}
+
+
+def update_steps(
+    table: str, changes: Iterable[tuple[str, dict[str, tuple]]]
+) -> tuple[list[dict], list[dict]]:
+    """Build (undo, redo) steps from ``(id, {field: (old, new)})`` changes.
+
+    Rows touching the same set of fields share one step, so each step stays a
+    single executemany UPDATE.
+    """
+    grouped: dict[tuple[str, ...], tuple[list, list]] = {}
+    for row_id, fields in changes:
+        names = tuple(sorted(fields))
+        if not names:
+            continue
+        old_rows, new_rows = grouped.setdefault(names, ([], []))
+        old_rows.append([row_id, *(_encode(fields[n][0]) for n in names)])
+        new_rows.append([row_id, *(_encode(fields[n][1]) for n in names)])
+    undo = [update_step(table, list(names), old) for names, (old, _) in grouped.items()]
+    redo = [update_step(table, list(names), new) for names, (_, new) in grouped.items()]
+    return undo, redo
+
+
+def delete_step(table: str, ids: Iterable[str]) -> dict:
+    return {"op": "delete", "table": table, "ids": list(ids)}
+
+
+def record_operation(
+    db: Session, board_id: str, kind: str, undo: list[dict], redo: list[dict]
+) -> None:
+    """Journal an action in the caller's transaction.
+
+    A new action discards anything that was undone (the redo branch) and prunes
+    the board's journal down to ``HISTORY_LIMIT`` entries. Steps without rows
+    are dropped, and an action left with none is not journaled at all, so a
+    request that changed nothing keeps the redo branch.
+    """
+    undo = [step for step in undo if step.get("ids") or step.get("rows")]
+    redo = [step for step in redo if step.get("ids") or step.get("rows")]
+    if not undo and not redo:
+        return
+    db.execute(
+        delete(BoardOperation).where(
+            BoardOperation.board_id == board_id, BoardOperation.undone.is_(True)
+        )
+    )
+    db.add(BoardOperation(board_id=board_id, kind=kind, undo=undo, redo=redo))
+    db.flush()
+    kept = (
+        select(BoardOperation.id)
+        .where(BoardOperation.board_id == board_id)
+        .order_by(BoardOperation.id.desc())
+        .limit(HISTORY_LIMIT)
+    )
+    db.execute(
+        delete(BoardOperation).where(
+            BoardOperation.board_id == board_id, BoardOperation.id.not_in(kept)
+        )
+    )
+
+
+def clear(db: Session, board_id: str) -> None:
+    """Forget a board's history, e.g. after its rows were replaced wholesale."""
+    db.execute(delete(BoardOperation).where(BoardOperation.board_id == board_id))
+
+
+def _decode_row(table: str, fields: list[str], row: list) -> dict:
+    columns = TABLES[table].__table__.columns
+    decoded = {}
+    for field, value in zip(fields, row):
+        if value is not None and isinstance(columns[field].type, DateTime):
+            value = datetime.fromisoformat(value)
+        decoded[field] = value
+    return decoded
+
+
+def apply_steps(db: Session, steps: list[dict]) -> None:
+    for step in steps:
+        model = TABLES[step["table"]]
+        if step["op"] == "delete":
+            db.execute(
+                delete(model)
+                .where(model.id.in_(step["ids"]))
+                .execution_options(synchronize_session=False)
+            )
+            continue
+        rows = [_decode_row(step["table"], step["fields"], row) for row in step["rows"]]
+        if not rows:
+            continue
+        if step["op"] == "insert":
+            db.execute(insert(model), rows)
+            if model is Connection:
+                geometry.refresh_connections(db, [row["id"] for row in rows])
+        else:
+            versioning.bulk_update(db, model, rows)
+            if model is Card and not set(step["fields"]).isdisjoint(geometry.RECT_FIELDS):
+                geometry.refresh_for_cards(db, [row["id"] for row in rows])
+
+
+def _next_operation(db: Session, board_id: str, undone: bool) -> BoardOperation | None:
+    # Undo takes the newest applied entry, redo the oldest undone one
+    order = BoardOperation.id.asc() if undone else BoardOperation.id.desc()
+    return db.scalars(
+        select(BoardOperation)
+        .where(BoardOperation.board_id == board_id, BoardOperation.undone.is_(undone))
+        .order_by(order)
+        .limit(1)
+    ).first()
+
+
+def undo(db: Session, board_id: str) -> BoardOperation | None:
+    operation = _next_operation(db, board_id, undone=False)
+    if operation:
+        apply_steps(db, operation.undo)
+        operation.undone = True
+    return operation
+
+
+def redo(db: Session, board_id: str) -> BoardOperation | None:
+    operation = _next_operation(db, board_id, undone=True)
+    if operation:
+        apply_steps(db, operation.redo)
+        operation.undone = False
+    return operation
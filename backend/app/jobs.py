@@ -0,0 +1,355 @@
+"""In-process background jobs.
+
+Routes enqueue a ``Job`` row and answer 202 with it straight away. Every
+worker process runs a ``JobRunner`` that claims queued rows and runs them on
+a bounded thread pool, or on a process pool for CPU-bound kinds when
+``JOB_PROCESSES`` is set. Claiming is a conditional UPDATE, so with several
+workers each job still runs once.
+
+A job's work and its final status are committed in one transaction, so a
+job either finished or can safely run again. Handlers report progress and
+check for cancellation through their ``JobContext``, which only touches
+memory: the runner's poller persists progress along with a heartbeat and
+passes cancellation requests back in. A job whose heartbeat stops (its
+process died) is requeued after ``JOB_STALE_AFTER`` seconds, and queued
+jobs are picked up again after a restart.
+
+The poller starts at startup once the jobs table is known to exist, so a
+worker started before ``alembic upgrade head`` does not fail a poll every
+second; it then starts with the first job request instead. The process pool
+spawns fresh interpreters rather than forking, so no child inherits the
+parent's pooled database connections.
+"""
+import logging
+import multiprocessing
+import threading
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import JSON, delete, func, insert, inspect, literal, select, update
+from sqlalchemy.orm import Session
+
+from app import contents, snapshots
+from app.config import (
+    JOB_POLL_INTERVAL,
+    JOB_PROCESSES,
+    JOB_QUEUE_LIMIT,
+    JOB_STALE_AFTER,
+    JOB_WORKERS,
+)
+from app.database import SessionLocal
+from app.models import GUID, Board, Card, Connection, Job, generate_uuid, utcnow
+from app.routes.boards import copy_board_contents
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key serialising enqueues on PostgreSQL
+_ENQUEUE_LOCK = 0x6A6F6273
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """What a running handler sees of its job: progress out, cancellation in.
+
+    ``state`` is a plain dict for jobs on the thread pool and a manager dict
+    for jobs on the process pool.
+    """
+
+    def __init__(self, state):
+        self._state = state
+
+    def progress(self, fraction: float) -> None:
+        """Record progress (0 to 1) and stop here if the job was cancelled."""
+        self._state["progress"] = fraction
+        if self._state["cancelled"]:
+            raise JobCancelled
+
+
+@dataclass
+class JobKind:
+    run: Callable[..., dict | None]
+    cpu_bound: bool = False
+
+
+KINDS: dict[str, JobKind] = {}
+
+
+def job_kind(name: str, cpu_bound: bool = False):
+    """Register ``run(db, context, board_id, **params)`` as the handler for a job kind."""
+
+    def register(run):
+        KINDS[name] = JobKind(run, cpu_bound)
+        return run
+
+    return register
+
+
+def enqueue(db: Session, kind: str, board_id: str | None = None, **params) -> Job:
+    """Add a job in the caller's transaction; call ``runner.wake()`` after commit.
+
+    The queue-length check is part of the INSERT. SQLite runs one writer at
+    a time, which makes that atomic; on PostgreSQL an advisory lock held
+    until the caller's transaction ends serialises enqueues.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(_ENQUEUE_LOCK)))
+    job_id = generate_uuid()
+    queued = select(func.count()).where(Job.status == "queued").scalar_subquery()
+    inserted = db.execute(
+        insert(Job).from_select(
+            ["id", "kind", "board_id", "params"],
+            select(
+                literal(job_id, GUID),
+                literal(kind),
+                literal(board_id, GUID),
+                literal(params, JSON),
+            ).where(queued < JOB_QUEUE_LIMIT),
+        )
+    )
+    if not inserted.rowcount:
+        raise HTTPException(status_code=503, detail="Job queue is full")
+    return db.get(Job, job_id)
+
+
+def cancel(db: Session, job: Job) -> None:
+    """Cancel a queued job outright, or ask a running one to stop.
+
+    Both are conditional UPDATEs, so a job the runner claims meanwhile is
+    asked to stop rather than marked cancelled while it runs.
+    """
+    cancelled = db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status == "queued")
+        .values(status="cancelled", finished_at=utcnow())
+    )
+    if cancelled.rowcount:
+        return
+    requested = db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status == "running")
+        .values(cancel_requested=True)
+    )
+    if requested.rowcount:
+        runner.cancel(job.id)
+
+
+def _finish(db: Session, job_id: str, status: str, **values) -> None:
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(status=status, finished_at=utcnow(), **values)
+    )
+
+
+def run_job(job_id: str, state, session_factory=None) -> None:
+    """Run a claimed job to completion; picklable for the process pool."""
+    with (session_factory or SessionLocal)() as db:
+        job = db.get(Job, job_id)
+        context = JobContext(state)
+        try:
+            result = KINDS[job.kind].run(db, context, job.board_id, **job.params)
+            _finish(db, job_id, "succeeded", result=result, progress=1.0)
+            db.commit()
+        except JobCancelled:
+            db.rollback()
+            _finish(db, job_id, "cancelled", progress=state["progress"])
+            db.commit()
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed", job_id, job.kind)
+            db.rollback()
+            _finish(db, job_id, "failed", error=str(exc) or type(exc).__name__)
+            db.commit()
+
+
+class JobRunner:
+    def __init__(self):
+        self._threads = None
+
+    def start(self, session_factory=SessionLocal) -> None:
+        """Get ready to run jobs; polling starts with ``resume()`` or ``ensure_polling()``."""
+        self.session_factory = session_factory
+        self._threads = ThreadPoolExecutor(JOB_WORKERS, thread_name_prefix="job")
+        self._processes = None
+        if JOB_PROCESSES:
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._processes = ProcessPoolExecutor(JOB_PROCESSES, mp_context=context)
+        self._states: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._poller = None
+
+    def stop(self) -> None:
+        """Stop claiming work and wait for the running jobs to finish."""
+        if self._threads is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        if self._poller is not None:
+            self._poller.join()
+        self._threads.shutdown(wait=True)
+        if self._processes:
+            self._processes.shutdown(wait=True)
+            self._manager.shutdown()
+        self._threads = None
+
+    def resume(self) -> bool:
+        """Start polling if the jobs table exists; return whether it does.
+
+        Called at startup, so jobs left queued or running by a previous
+        process are picked up without waiting for a job request.
+        """
+        if self._threads is None:
+            return False
+        with self.session_factory() as db:
+            ready = inspect(db.connection()).has_table(Job.__tablename__)
+        if ready:
+            self.ensure_polling()
+        return ready
+
+    def ensure_polling(self) -> None:
+        """Start the poller if it is not running yet."""
+        if self._threads is None:
+            return
+        with self._lock:
+            if self._poller is None and not self._stopping.is_set():
+                self._poller = threading.Thread(
+                    target=self._poll, name="job-poller", daemon=True
+                )
+                self._poller.start()
+
+    def wake(self) -> None:
+        """Poll now instead of at the next interval, e.g. after an enqueue."""
+        if self._threads is not None:
+            self.ensure_polling()
+            self._wake.set()
+
+    def cancel(self, job_id: str) -> None:
+        if self._threads is None:
+            return
+        with self._lock:
+            if job_id in self._states:
+                self._states[job_id]["cancelled"] = True
+
+    def _poll(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._tick()
+            except Exception:
+                # SQLite may be locked by a job's transaction; try next round
+                logger.warning("Job poll failed", exc_info=True)
+            self._wake.wait(JOB_POLL_INTERVAL)
+            self._wake.clear()
+
+    def _tick(self) -> None:
+        now = utcnow()
+        with self.session_factory() as db:
+            with self._lock:
+                states = {job_id: dict(state) for job_id, state in self._states.items()}
+            for job_id, state in states.items():
+                cancel_requested = db.scalar(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == "running")
+                    .values(progress=state["progress"], heartbeat_at=now)
+                    .returning(Job.cancel_requested)
+                )
+                if cancel_requested:
+                    self.cancel(job_id)
+            db.execute(
+                update(Job)
+                .where(
+                    Job.status == "running",
+                    Job.heartbeat_at < now - timedelta(seconds=JOB_STALE_AFTER),
+                )
+                .values(status="queued", started_at=None, heartbeat_at=None)
+            )
+            db.commit()
+            free = JOB_WORKERS - len(states)
+            if free <= 0 or self._stopping.is_set():
+                return
+            candidates = db.execute(
+                select(Job.id, Job.kind)
+                .where(Job.status == "queued")
+                .order_by(Job.created_at)
+                .limit(free)
+            ).all()
+            for job_id, kind in candidates:
+                claimed = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == "queued")
+                    .values(status="running", started_at=now, heartbeat_at=now)
+                )
+                db.commit()
+                if claimed.rowcount:
+                    # An unknown kind fails inside run_job like any other error
+                    self._submit(job_id, kind in KINDS and KINDS[kind].cpu_bound)
+
+    def _submit(self, job_id: str, cpu_bound: bool) -> None:
+        on_processes = cpu_bound and self._processes is not None
+        state = {"progress": 0.0, "cancelled": False}
+        if on_processes:
+            state = self._manager.dict(state)
+        with self._lock:
+            self._states[job_id] = state
+        self._threads.submit(self._run, job_id, state, on_processes)
+
+    def _run(self, job_id: str, state, on_processes: bool) -> None:
+        try:
+            if on_processes:
+                # The thread waits on the process, so JOB_WORKERS bounds both
+                self._processes.submit(run_job, job_id, state).result()
+            else:
+                run_job(job_id, state, self.session_factory)
+        except Exception:
+            logger.exception("Job %s crashed", job_id)
+        finally:
+            with self._lock:
+                del self._states[job_id]
+            self.wake()
+
+
+runner = JobRunner()
+
+
+@job_kind("duplicate_board")
+def _duplicate_board(db: Session, context: JobContext, board_id: str, name: str):
+    if db.get(Board, board_id) is None:
+        raise LookupError("Board not found")
+    board = Board(name=name)
+    db.add(board)
+    db.flush()
+    context.progress(0.1)
+    copy_board_contents(db, board_id, board.id)
+    return {"board_id": board.id}
+
+
+@job_kind("delete_board")
+def _delete_board(db: Session, context: JobContext, board_id: str):
+    # Children first, so each statement is one step of progress; the foreign
+    # keys would cascade the rest (history, snapshots) from the board row.
+    for step, model in enumerate((Connection, Card, Board)):
+        context.progress(step / 3)
+        column = model.id if model is Board else model.board_id
+        db.execute(delete(model).where(column == board_id))
+    return None
+
+
+@job_kind("create_snapshot", cpu_bound=True)
+def _create_snapshot(db: Session, context: JobContext, board_id: str, name: str):
+    # Hashing every row is the bulk of the work
+    if db.get(Board, board_id) is None:
+        raise LookupError("Board not found")
+    snapshot = snapshots.create_snapshot(db, board_id, name)
+    return {"snapshot_id": snapshot.id}
+
+
+@job_kind("collect_contents")
+def _collect_contents(db: Session, context: JobContext, board_id: None):
+    return {"deleted": contents.collect_garbage(db)}
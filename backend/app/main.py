@@ -1,21 +1,122 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import StatementError
 
-from app.database import Base, engine
-from app.routes import boards, cards, connections
+from app import profiling, replication
+from app.config import (
+    GZIP_COMPRESS_LEVEL,
+    GZIP_MINIMUM_SIZE,
+    PROFILING_TOKEN,
+    REPLICA_DATABASE_URL,
+    THREADPOOL_SIZE,
+)
+from app.database import engine, replica_engine, warm_pool
+from app.jobs import runner as job_runner
+from app.models import MalformedId
+from app.ratelimit import AdmissionMiddleware
+from app.routes import (
+    boards,
+    cards,
+    connections,
+    history,
+    jobs,
+    metrics,
+    ops,
+    profiles,
+    snapshots,
+)
 
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="CorkBoard API", version="0.1.0")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def _warm_up() -> None:
+    try:
+        await asyncio.to_thread(warm_pool)
+    except Exception:
+        logger.warning("Database warm-up failed", exc_info=True)
+        return
+    try:
+        if not await asyncio.to_thread(job_runner.resume):
+            logger.info("No jobs table yet; jobs start with the first job request")
+    except Exception:
+        logger.warning("Resuming background jobs failed", exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The schema is owned by Alembic (`alembic upgrade head`), so startup does
+    # no DDL. Sync handlers run on anyio's threadpool, sized to match the pool.
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Warming the pool runs in the background and never delays serving.
+    # Job polling starts from _warm_up too, once the database answers
+    job_runner.start()
+    warm_up = asyncio.create_task(_warm_up())
+    yield
+    warm_up.cancel()
+    # Lets running jobs commit; unfinished ones are picked up after restart
+    await asyncio.to_thread(job_runner.stop)
+    engine.dispose()
+    if replica_engine is not None:
+        replica_engine.dispose()
+
+
+async def _malformed_id(request: Request, exc: Exception):
+    # Ids that are not UUIDs cannot name a row, so looking one up is a 404 like
+    # any unknown id. Routes taking ids that are not lookups validate them.
+    if isinstance(exc, StatementError) and not isinstance(exc.orig, MalformedId):
+        raise exc
+    return JSONResponse({"detail": "Not found"}, status_code=404)
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="CorkBoard API", version="0.1.0", lifespan=lifespan)
+    app.add_exception_handler(MalformedId, _malformed_id)
+    app.add_exception_handler(StatementError, _malformed_id)
+
+    # Inside CORS, so browsers can read its 429s
+    app.add_middleware(AdmissionMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Retry-After"],
+    )
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=GZIP_MINIMUM_SIZE,
+        compresslevel=GZIP_COMPRESS_LEVEL,
+    )
+
+    routers = [
+        boards.router,
+        cards.router,
+        connections.router,
+        ops.router,
+        history.router,
+        snapshots.router,
+        jobs.router,
+        metrics.router,
+    ]
+    if REPLICA_DATABASE_URL:
+        replication.install(app)
+    if PROFILING_TOKEN:
+        # Handlers are wrapped before their routers are included
+        routers.append(profiles.router)
+        # The replica serves the board loads worth profiling most
+        engines = [engine] if replica_engine is None else [engine, replica_engine]
+        profiling.install(app, routers, *engines)
+    for router in routers:
+        app.include_router(router)
+    return app
+
 
-app.include_router(boards.router)
-app.include_router(cards.router)
-app.include_router(connections.router)
+app = create_app()
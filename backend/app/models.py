@@ -1,9 +1,27 @@
 import uuid
+import zlib
 from datetime import datetime, timezone
 
-from sqlalchemy import Float, ForeignKey, Integer, String, Text, UniqueConstraint
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    TypeDecorator,
+    UniqueConstraint,
+    select,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Mapped, column_property, mapped_column, relationship
+from sqlalchemy.sql.expression import FunctionElement
 
+from app.config import CONTENT_COMPRESS_THRESHOLD
 from app.database import Base
 
 
@@ -11,6 +29,98 @@ def generate_uuid() -> str:
     return str(uuid.uuid4())
 
 
+class MalformedId(ValueError):
+    """Raised for an id that is not a UUID, so cannot name any row."""
+
+
+def canonical_id(value) -> str:
+    """The lowercase 36-character form of a UUID key, whatever form it came in."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise MalformedId(f"Malformed id {value!r}") from None
+
+
+class GUID(TypeDecorator):
+    """UUID key stored as native ``uuid`` on PostgreSQL and 16-byte BLOB elsewhere.
+
+    Python code and the API keep working with the canonical 36-character string.
+    Binding a malformed id raises ``MalformedId`` (wrapped in SQLAlchemy's
+    ``StatementError``) rather than matching nothing.
+
+    There is deliberately no setting to keep ``String(36)`` keys: the column
+    type is part of the schema that revision 8f3b6d2e1a57 converts, and a
+    switch would have to agree with whichever revision a database is at.
+    Downgrading past that revision is the way back.
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        parsed = uuid.UUID(canonical_id(value))
+        return str(parsed) if dialect.name == "postgresql" else parsed.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == "postgresql":
+            return str(value)
+        return str(uuid.UUID(bytes=bytes(value)))
+
+
+class new_uuid(FunctionElement):
+    """SQL expression yielding a fresh random id, for set-based inserts."""
+
+    type = GUID()
+    inherit_cache = True
+
+
+@compiles(new_uuid, "postgresql")
+def _new_uuid_postgresql(element, compiler, **kw):
+    return "gen_random_uuid()"
+
+
+@compiles(new_uuid, "sqlite")
+def _new_uuid_sqlite(element, compiler, **kw):
+    return "randomblob(16)"
+
+
+class CompressedText(TypeDecorator):
+    """Text stored as bytes, zlib-compressed from ``CONTENT_COMPRESS_THRESHOLD`` up.
+
+    A one-byte prefix records the encoding, so the threshold can change
+    without rewriting what is already stored.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        raw = value.encode()
+        if len(raw) >= CONTENT_COMPRESS_THRESHOLD:
+            return b"z" + zlib.compress(raw)
+        return b"t" + raw
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        value = bytes(value)
+        body = value[1:]
+        if value[:1] == b"z":
+            body = zlib.decompress(body)
+        return body.decode()
+
+
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -18,7 +128,7 @@ def utcnow() -> datetime:
 class Board(Base):
     __tablename__ = "boards"
 
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(GUID, primary_key=True, default=generate_uuid)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     created_at: Mapped[datetime] = mapped_column(default=utcnow)
     updated_at: Mapped[datetime] = mapped_column(default=utcnow, onupdate=utcnow)
@@ -31,23 +141,54 @@ class Board(Base):
     )
 
 
+class CardContent(Base):
+    """A card body, stored once per distinct text and keyed by its SHA-256.
+
+    Bodies live outside ``cards`` so position updates and column-projected
+    reads never touch them. Rows are immutable and shared by every card,
+    journal entry and snapshot that refers to the same text.
+    """
+
+    __tablename__ = "card_contents"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    body: Mapped[str] = mapped_column(CompressedText, nullable=False)
+
+
 class Card(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        Index("ix_cards_board_z", "board_id", "z_index"),
+        # Cross-board filters and counts (see /api/cards/query and /counts)
+        Index("ix_cards_color_board", "color", "board_id", "updated_at"),
+        Index("ix_cards_updated_at", "updated_at"),
+    )
 
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(GUID, primary_key=True, default=generate_uuid)
     board_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("boards.id", ondelete="CASCADE"), nullable=False
+        GUID, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False
+    )
+    content_hash: Mapped[str] = mapped_column(
+        String(64), ForeignKey("card_contents.hash"), nullable=False
     )
-    content: Mapped[str] = mapped_column(Text, default="")
     x: Mapped[float] = mapped_column(Float, default=10.0)
     y: Mapped[float] = mapped_column(Float, default=10.0)
     width: Mapped[float] = mapped_column(Float, default=15.0)
     height: Mapped[float] = mapped_column(Float, default=10.0)
     color: Mapped[str] = mapped_column(String(7), default="#FEF3C7")
     z_index: Mapped[int] = mapped_column(Integer, default=0)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
     created_at: Mapped[datetime] = mapped_column(default=utcnow)
     updated_at: Mapped[datetime] = mapped_column(default=utcnow, onupdate=utcnow)
 
+    # Looked up by primary key only when a query asks for it
+    content: Mapped[str] = column_property(
+        select(CardContent.body)
+        .where(CardContent.hash == content_hash)
+        .scalar_subquery(),
+        deferred=True,
+    )
+
     board: Mapped["Board"] = relationship(back_populates="cards")
     connections_from: Mapped[list["Connection"]] = relationship(
         foreign_keys="Connection.from_card_id",
@@ -65,19 +206,30 @@ class Connection(Base):
     __tablename__ = "connections"
     __table_args__ = (
         UniqueConstraint("from_card_id", "to_card_id", name="uq_connection_pair"),
+        # uq_connection_pair covers lookups by from_card_id
+        Index("ix_connections_to_card", "to_card_id"),
+        Index("ix_connections_board", "board_id"),
     )
 
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(GUID, primary_key=True, default=generate_uuid)
     board_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("boards.id", ondelete="CASCADE"), nullable=False
+        GUID, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False
     )
     from_card_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("cards.id", ondelete="CASCADE"), nullable=False
+        GUID, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False
     )
     to_card_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("cards.id", ondelete="CASCADE"), nullable=False
+        GUID, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False
     )
     color: Mapped[str] = mapped_column(String(7), default="#92400E")
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    # Cached bezier geometry, kept current by app.geometry
+    start_x: Mapped[float | None] = mapped_column(Float)
+    start_y: Mapped[float | None] = mapped_column(Float)
+    control_x: Mapped[float | None] = mapped_column(Float)
+    control_y: Mapped[float | None] = mapped_column(Float)
+    end_x: Mapped[float | None] = mapped_column(Float)
+    end_y: Mapped[float | None] = mapped_column(Float)
 
     board: Mapped["Board"] = relationship(back_populates="connections")
     from_card: Mapped["Card"] = relationship(
@@ -86,3 +238,78 @@ class Connection(Base):
     to_card: Mapped["Card"] = relationship(
         foreign_keys=[to_card_id], back_populates="connections_to"
     )
+
+
+class BoardOperation(Base):
+    """One undoable user action, journaled as the steps that undo and redo it."""
+
+    __tablename__ = "board_operations"
+    __table_args__ = (Index("ix_board_operations_board", "board_id", "id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    board_id: Mapped[str] = mapped_column(
+        GUID, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False
+    )
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    undo: Mapped[list] = mapped_column(JSON, nullable=False)
+    redo: Mapped[list] = mapped_column(JSON, nullable=False)
+    undone: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(default=utcnow)
+
+
+class BoardSnapshot(Base):
+    """A point-in-time version of a board.
+
+    ``manifest`` maps each table to ``{bucket: page hash}``; pages and rows
+    live in ``SnapshotObject`` and are shared by every snapshot that contains
+    them unchanged.
+    """
+
+    __tablename__ = "board_snapshots"
+
+    id: Mapped[str] = mapped_column(GUID, primary_key=True, default=generate_uuid)
+    board_id: Mapped[str] = mapped_column(
+        GUID, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    manifest: Mapped[dict] = mapped_column(JSON, nullable=False)
+    card_count: Mapped[int] = mapped_column(Integer, default=0)
+    connection_count: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(default=utcnow)
+
+
+class SnapshotObject(Base):
+    """Content-addressed snapshot storage: one row record or one page of hashes."""
+
+    __tablename__ = "snapshot_objects"
+
+    board_id: Mapped[str] = mapped_column(
+        GUID, ForeignKey("boards.id", ondelete="CASCADE"), primary_key=True
+    )
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    data: Mapped[dict | list] = mapped_column(JSON, nullable=False)
+
+
+class Job(Base):
+    """A background job and its outcome; see ``app.jobs``.
+
+    ``board_id`` has no foreign key so that a job outlives the board it
+    deleted.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_created", "status", "created_at"),)
+
+    id: Mapped[str] = mapped_column(GUID, primary_key=True, default=generate_uuid)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    board_id: Mapped[str | None] = mapped_column(GUID)
+    status: Mapped[str] = mapped_column(String(16), default="queued")
+    params: Mapped[dict] = mapped_column(JSON, default=dict)
+    progress: Mapped[float] = mapped_column(Float, default=0.0)
+    result: Mapped[dict | None] = mapped_column(JSON)
+    error: Mapped[str | None] = mapped_column(Text)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(default=utcnow)
+    started_at: Mapped[datetime | None] = mapped_column()
+    finished_at: Mapped[datetime | None] = mapped_column()
+    heartbeat_at: Mapped[datetime | None] = mapped_column()
@@ -0,0 +1,286 @@
+"""On-demand profiling of single requests.
+
+Only installed when ``CORKBOARD_PROFILING_TOKEN`` is set; otherwise no
+middleware, wrapper or engine listener exists and requests pay nothing.
+When installed, a request sending the token in an ``X-Corkboard-Profile``
+header gets:
+
+* its route handler run under ``cProfile`` (in the threadpool thread that
+  runs it, which is why handlers are wrapped rather than the whole request).
+  Only sync handlers are wrapped: profiling an ``async def`` one would also
+  record every other task the event loop ran between its awaits;
+* every SQL statement it sends through the engine recorded with its
+  duration and query plan (``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN`` on
+  PostgreSQL; the plan is looked up after the statement ran).
+
+Only one request per worker is profiled at a time, since a thread can only
+enable a profiler while no other is active; a second one gets 429 until the
+first is done. The capture's id comes back in an ``X-Corkboard-Profile-Id``
+response header, and the last ``PROFILE_BUFFER_SIZE`` captures of each
+worker process can be downloaded from ``/api/debug/profiles`` as JSON or
+pstats.
+"""
+import cProfile
+import functools
+import hmac
+import inspect
+import marshal
+import pstats
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import JSONResponse
+
+from app.config import PROFILE_BUFFER_SIZE, PROFILING_TOKEN
+from app.models import utcnow
+
+HEADER = b"x-corkboard-profile"
+ID_HEADER = b"x-corkboard-profile-id"
+
+_EXPLAINED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+_MAX_PARAMS_LENGTH = 200
+
+
+@dataclass
+class Capture:
+    id: str
+    method: str
+    path: str
+    created_at: datetime
+    status: int | None = None
+    duration_ms: float = 0.0
+    queries: list[dict] = field(default_factory=list)
+    profiler: cProfile.Profile = field(default_factory=cProfile.Profile)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 3),
+            "query_count": len(self.queries),
+            "created_at": self.created_at,
+        }
+
+    def _stats(self) -> dict:
+        self.profiler.create_stats()
+        return self.profiler.stats
+
+    def dump(self) -> bytes:
+        """The profile in the format ``pstats.Stats`` loads from a file."""
+        return marshal.dumps(self._stats())
+
+    def functions(self, limit: int = 50) -> list[dict]:
+        """The most expensive functions by cumulative time."""
+        # pstats refuses an empty profile, e.g. of a request that never
+        # reached its handler
+        if not self._stats():
+            return []
+        stats = pstats.Stats(self.profiler)
+        stats.sort_stats("cumulative")
+        rows = []
+        for func in stats.fcn_list[:limit]:
+            primitive_calls, calls, total, cumulative, _ = stats.stats[func]
+            filename, line, name = func
+            rows.append(
+                {
+                    "function": f"{filename}:{line}({name})",
+                    "calls": calls,
+                    "primitive_calls": primitive_calls,
+                    "total_ms": round(total * 1000, 3),
+                    "cumulative_ms": round(cumulative * 1000, 3),
+                }
+            )
+        return rows
+
+
+_current: ContextVar[Capture | None] = ContextVar("profile_capture", default=None)
+# Held by the one request being profiled
+_active = threading.Lock()
+_captures: deque[Capture] = deque(maxlen=PROFILE_BUFFER_SIZE)
+_captures_lock = threading.Lock()
+
+
+def token_matches(value: str | None) -> bool:
+    return bool(PROFILING_TOKEN and value) and hmac.compare_digest(
+        value.encode(), PROFILING_TOKEN.encode()
+    )
+
+
+def captures() -> list[Capture]:
+    with _captures_lock:
+        return list(_captures)
+
+
+def get_capture(capture_id: str) -> Capture | None:
+    return next((c for c in captures() if c.id == capture_id), None)
+
+
+def _store(capture: Capture) -> None:
+    with _captures_lock:
+        _captures.append(capture)
+
+
+# --- Handlers ---
+
+
+def _profiled(call):
+    """Wrap a sync route handler so it runs under the request's profiler, if any.
+
+    The wrapper gets a ``profiled`` attribute, so handlers are wrapped once.
+    """
+
+    @functools.wraps(call)
+    def run(*args, **kwargs):
+        capture = _current.get()
+        if capture is None:
+            return call(*args, **kwargs)
+        capture.profiler.enable()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            capture.profiler.disable()
+
+    run.profiled = True
+    return run
+
+
+# --- SQL ---
+
+
+def _explain(conn, cursor, statement: str, parameters) -> list[str]:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if keyword not in _EXPLAINED:
+        return []
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    # On PostgreSQL a failed statement aborts the whole transaction, so the
+    # EXPLAIN gets a savepoint to roll back to; SQLite carries on regardless
+    savepoint = conn.dialect.name == "postgresql"
+    # A cursor of its own, so the statement's pending rows stay intact
+    explain = cursor.connection.cursor()
+    try:
+        if savepoint:
+            explain.execute("SAVEPOINT corkboard_explain")
+        try:
+            explain.execute(prefix + statement, parameters)
+            plan = [str(row[-1]) for row in explain.fetchall()]
+        except Exception as exc:
+            if savepoint:
+                explain.execute("ROLLBACK TO SAVEPOINT corkboard_explain")
+            plan = [f"EXPLAIN failed: {exc}"]
+        if savepoint:
+            explain.execute("RELEASE SAVEPOINT corkboard_explain")
+        return plan
+    finally:
+        explain.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    capture = _current.get()
+    if capture is None:
+        return
+    duration = time.perf_counter() - conn.info["profile_started"].pop()
+    sample = parameters[0] if executemany and parameters else parameters
+    capture.queries.append(
+        {
+            "statement": statement,
+            "parameters": repr(parameters)[:_MAX_PARAMS_LENGTH],
+            "executemany": executemany,
+            "duration_ms": round(duration * 1000, 3),
+            "plan": _explain(conn, cursor, statement, sample),
+        }
+    )
+
+
+def watch_engine(engine: Engine) -> None:
+    """Record the statements profiled requests send through ``engine``."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Requests ---
+
+
+class ProfilingMiddleware:
+    """Starts a capture for requests carrying the profiling token."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/api/debug/"):
+            await self.app(scope, receive, send)
+            return
+        token = dict(scope["headers"]).get(HEADER)
+        if not token_matches(token.decode("latin-1") if token else None):
+            await self.app(scope, receive, send)
+            return
+        if not _active.acquire(blocking=False):
+            response = JSONResponse(
+                {"detail": "Another request is being profiled"},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        capture = Capture(
+            id=uuid.uuid4().hex,
+            method=scope["method"],
+            path=scope["path"],
+            created_at=utcnow(),
+        )
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                capture.status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (ID_HEADER, capture.id.encode()),
+                ]
+            await send(message)
+
+        reset = _current.set(capture)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            capture.duration_ms = (time.perf_counter() - start) * 1000
+            _current.reset(reset)
+            _active.release()
+            _store(capture)
+
+
+def install(app: FastAPI, routers: list[APIRouter], *engines: Engine) -> None:
+    """Add the middleware, wrap the routers' handlers and watch ``engines``.
+
+    Including a router copies its routes' endpoints, so call this before
+    ``app.include_router``.
+    """
+    app.add_middleware(ProfilingMiddleware)
+    for router in routers:
+        for route in router.routes:
+            if (
+                isinstance(route, APIRoute)
+                and not inspect.iscoroutinefunction(route.endpoint)
+                and not hasattr(route.endpoint, "profiled")
+            ):
+                route.endpoint = _profiled(route.endpoint)
+    for engine in engines:
+        watch_engine(engine)
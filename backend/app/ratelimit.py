@@ -0,0 +1,257 @@
+"""Rate limiting and admission control for card and connection mutations.
+
+Each check answers 429 with a Retry-After header:
+
+* a token bucket per client address, checked by ``AdmissionMiddleware``
+  before the request reaches a handler. The address is the connection's
+  peer unless ``RATE_LIMIT_TRUSTED_PROXIES`` says to read it from
+  X-Forwarded-For (see ``client_key``);
+* a token bucket per board, checked by the handlers through
+  ``check_board`` once they know which board they are about to write;
+* admission control, also in the middleware: mutations are shed while too
+  many are already in flight in this worker, or while the ones finished in
+  the last few seconds were slow on average. Both mean writers are queueing
+  on SQLite's single write lock.
+
+Reads are never limited, so board loads keep working while writes are shed.
+State and metrics are per worker process; ``GET /api/metrics`` reports the
+worker that answers it.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from app.config import (
+    ADMISSION_MAX_LATENCY_MS,
+    ADMISSION_MAX_WRITES,
+    RATE_LIMIT_BOARD_BURST,
+    RATE_LIMIT_BOARD_RATE,
+    RATE_LIMIT_CLIENT_BURST,
+    RATE_LIMIT_CLIENT_RATE,
+    RATE_LIMIT_TRUSTED_PROXIES,
+)
+
+_MUTATION_PATH = re.compile(r"^/api/(boards/[^/]+/)?(cards|connections|ops)(/|$)")
+_READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Seconds of finished mutations averaged for the latency check, and how many
+# it needs before one slow request can shed anything
+_LATENCY_WINDOW = 5.0
+_LATENCY_MIN_SAMPLES = 5
+
+# Buckets are pruned once there are this many (and again at twice the survivors)
+_PRUNE_AT = 10_000
+
+
+def is_mutation(method: str, path: str) -> bool:
+    return method not in _READ_METHODS and _MUTATION_PATH.match(path) is not None
+
+
+def retry_after(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
+
+
+def client_key(scope) -> str:
+    """The address the per-client limit counts a request against."""
+    client = scope.get("client")
+    address = client[0] if client else ""
+    if not RATE_LIMIT_TRUSTED_PROXIES:
+        return address
+    forwarded = ",".join(
+        value.decode("latin-1")
+        for name, value in scope["headers"]
+        if name == b"x-forwarded-for"
+    )
+    # Each proxy appends the address it received the request from, so the
+    # entries the trusted ones added are the rightmost
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    if not hops:
+        return address
+    return hops[-min(RATE_LIMIT_TRUSTED_PROXIES, len(hops))]
+
+
+class RateLimiter:
+    """Token buckets by key, refilled at ``rate`` per second up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._prune_at = _PRUNE_AT
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        """Take a token for ``key``; return 0, or the seconds until one is available."""
+        if not self.rate:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) >= self._prune_at:
+                self._prune(now)
+            return 0.0
+
+    def _prune(self, now: float) -> None:
+        # A bucket that has refilled is the same as no bucket
+        full_after = self.burst / self.rate
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if now - bucket[1] < full_after
+        }
+        self._prune_at = max(_PRUNE_AT, 2 * len(self._buckets))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class Admission:
+    """In-flight count and recent latency of mutations in this worker.
+
+    Only used from the event loop (by the middleware), so it needs no lock.
+    """
+
+    def __init__(self, max_writes: int, max_latency: float):
+        self.max_writes = max_writes
+        self.max_latency = max_latency
+        self.in_flight = 0
+        self._samples: deque[tuple[float, float]] = deque()
+        self._total = 0.0
+
+    def _expire(self, now: float) -> None:
+        while self._samples and self._samples[0][0] < now - _LATENCY_WINDOW:
+            self._total -= self._samples.popleft()[1]
+
+    def latency(self) -> float:
+        """Mean duration of the mutations finished within the window."""
+        self._expire(time.monotonic())
+        return self._total / len(self._samples) if self._samples else 0.0
+
+    def check(self) -> tuple[str, float] | None:
+        """Return ``(reason, retry_after_seconds)`` if a mutation should be shed."""
+        if self.max_writes and self.in_flight >= self.max_writes:
+            return "shed_queue", 1.0
+        if (
+            self.max_latency
+            and len(self._samples) >= _LATENCY_MIN_SAMPLES
+            and self.latency() > self.max_latency
+        ):
+            # Nothing new is admitted, so the average clears as samples expire
+            return "shed_latency", self._samples[0][0] + _LATENCY_WINDOW - time.monotonic()
+        return None
+
+    def started(self) -> None:
+        self.in_flight += 1
+
+    def finished(self, duration: float) -> None:
+        self.in_flight -= 1
+        now = time.monotonic()
+        self._samples.append((now, duration))
+        self._total += duration
+        self._expire(now)
+
+    def reset(self) -> None:
+        self.in_flight = 0
+        self._samples.clear()
+        self._total = 0.0
+
+
+clients = RateLimiter(RATE_LIMIT_CLIENT_RATE, RATE_LIMIT_CLIENT_BURST)
+boards = RateLimiter(RATE_LIMIT_BOARD_RATE, RATE_LIMIT_BOARD_BURST)
+admission = Admission(ADMISSION_MAX_WRITES, ADMISSION_MAX_LATENCY_MS / 1000)
+
+_counts: Counter[str] = Counter()
+_last_rejected: dict[str, str] = {}
+_counts_lock = threading.Lock()
+
+
+def _count(outcome: str) -> None:
+    with _counts_lock:
+        _counts[outcome] += 1
+        if outcome != "admitted":
+            _last_rejected[outcome] = datetime.now(timezone.utc).isoformat()
+
+
+def check_board(board_id: str) -> None:
+    """Take a token from the board's bucket, or raise 429 before anything is written."""
+    wait = boards.take(board_id)
+    if wait:
+        _count("limited_board")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many changes to this board",
+            headers={"Retry-After": retry_after(wait)},
+        )
+
+
+def metrics() -> dict:
+    with _counts_lock:
+        counts = dict(_counts)
+        last_rejected = dict(_last_rejected)
+    outcomes = ("admitted", "limited_client", "limited_board", "shed_queue", "shed_latency")
+    return {
+        "mutations": {outcome: counts.get(outcome, 0) for outcome in outcomes},
+        "last_rejected": last_rejected,
+        "in_flight": admission.in_flight,
+        "latency_ms": round(admission.latency() * 1000, 1),
+    }
+
+
+def reset() -> None:
+    """Forget all buckets, samples and counts (for tests)."""
+    clients.reset()
+    boards.reset()
+    admission.reset()
+    with _counts_lock:
+        _counts.clear()
+        _last_rejected.clear()
+
+
+_MESSAGES = {
+    "limited_client": "Too many requests",
+    "shed_queue": "Server is busy, retry later",
+    "shed_latency": "Server is busy, retry later",
+}
+
+
+class AdmissionMiddleware:
+    """Applies the per-client limit and admission control to mutations."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_mutation(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        wait = clients.take(client_key(scope))
+        rejected = ("limited_client", wait) if wait else admission.check()
+        if rejected:
+            outcome, wait = rejected
+            _count(outcome)
+            response = JSONResponse(
+                {"detail": _MESSAGES[outcome]},
+                status_code=429,
+                headers={"Retry-After": retry_after(wait)},
+            )
+            await response(scope, receive, send)
+            return
+        _count("admitted")
+        admission.started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.finished(time.perf_counter() - start)
@@ -0,0 +1,146 @@
+"""Read-replica routing with read-your-writes.
+
+With ``REPLICA_DATABASE_URL`` set, read-only routes take their session from
+``get_read_db``, which returns a replica session, and every other route keeps
+using the primary through ``get_db``.
+
+Replicas lag, so a client reading right after its own write could miss that
+write. When a mutation commits, the response therefore sets a short-lived
+cookie holding a write token: the commit time, plus the primary's WAL
+position on PostgreSQL, read on the committing connection just before the
+commit. A read carrying the cookie goes to the primary until the replica has
+caught up. On PostgreSQL that is when the replica has replayed past that
+position, i.e. into the commit record that follows it. Elsewhere (e.g. two
+SQLite files in development), or when the replica cannot be asked, it is
+when ``REPLICA_MAX_LAG`` seconds have passed.
+
+Without a replica none of this is installed and ``get_read_db`` is just the
+primary session.
+"""
+import logging
+import time
+from collections.abc import Generator
+from contextvars import ContextVar
+
+from fastapi import Depends, FastAPI, Request
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app import database
+from app.config import REPLICA_MAX_LAG
+from app.database import get_db
+
+logger = logging.getLogger(__name__)
+
+COOKIE = "corkboard_write"
+_READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Set by the middleware for mutations; the commit hook fills in the token
+_pending: ContextVar[dict | None] = ContextVar("replication_pending", default=None)
+
+
+def write_token(db: Session) -> str:
+    """Token for the state ``db`` is about to commit: ``<epoch>[:<wal lsn>]``.
+
+    Call while the transaction is still open, so the position is read on its
+    own connection instead of a second one from the pool.
+    """
+    token = f"{time.time():.3f}"
+    if db.get_bind().dialect.name == "postgresql":
+        token += f":{db.connection().scalar(text('SELECT pg_current_wal_lsn()'))}"
+    return token
+
+
+def caught_up(token: str | None) -> bool:
+    """Whether the replica is known to have the write ``token`` describes."""
+    if not token:
+        return True
+    committed, _, lsn = token.partition(":")
+    try:
+        if time.time() - float(committed) >= REPLICA_MAX_LAG:
+            return True
+    except ValueError:
+        return True
+    if not lsn or database.replica_engine.dialect.name != "postgresql":
+        return False
+    try:
+        with database.replica_engine.connect() as conn:
+            replayed = conn.scalar(
+                text("SELECT pg_last_wal_replay_lsn() > CAST(:lsn AS pg_lsn)"),
+                {"lsn": lsn},
+            )
+    except Exception:
+        logger.warning("Replica position check failed", exc_info=True)
+        return False
+    # NULL when the "replica" is not a standby, so it has every write
+    return replayed is None or replayed
+
+
+def get_read_db(
+    request: Request, primary: Session = Depends(get_db)
+) -> Generator[Session, None, None]:
+    """Session for read-only routes: the replica, unless this client's own
+    recent write may not have reached it yet.
+
+    The primary session is opened lazily, so it costs nothing when unused.
+    """
+    if database.ReplicaSessionLocal is None or not caught_up(request.cookies.get(COOKIE)):
+        yield primary
+        return
+    db = database.ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _before_commit(session: Session) -> None:
+    pending = _pending.get()
+    if pending is not None:
+        pending["committing"] = write_token(session)
+
+
+def _after_commit(session: Session) -> None:
+    # Only a commit that went through earns a token; the last one wins
+    pending = _pending.get()
+    if pending is not None and "committing" in pending:
+        pending["token"] = pending.pop("committing")
+
+
+class ReplicationMiddleware:
+    """Sets the write-token cookie on responses to mutations that committed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+        pending = {}
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and "token" in pending:
+                cookie = (
+                    f"{COOKIE}={pending['token']}; Max-Age={REPLICA_MAX_LAG}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode("latin-1")),
+                ]
+            await send(message)
+
+        reset = _pending.set(pending)
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            _pending.reset(reset)
+
+
+def install(app: FastAPI) -> None:
+    """Issue write tokens; call when a replica is configured."""
+    app.add_middleware(ReplicationMiddleware)
+    if not event.contains(Session, "after_commit", _after_commit):
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _after_commit)
@@ -1,15 +1,32 @@
+from datetime import datetime, timezone
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Column, MetaData, Table, insert, literal, select
+from sqlalchemy.orm import Session, selectinload
 
 from app.database import get_db
-from app.models import Board
-from app.schemas import BoardCreate, BoardDetail, BoardRead, BoardUpdate
+from app.geometry import GEOMETRY_FIELDS
+from app.models import GUID, Board, Card, Connection, new_uuid, utcnow
+from app.replication import get_read_db
+from app.routes.cards import parse_card_fields, select_card_rows
+from app.schemas import (
+    BoardCreate,
+    BoardDetail,
+    BoardDuplicate,
+    BoardRead,
+    BoardUpdate,
+    CardColumns,
+    CompactBoardDetail,
+    ConnectionColumns,
+    ConnectionRead,
+    ProjectedBoardDetail,
+)
 
 router = APIRouter(prefix="/api/boards", tags=["boards"])
 
 
 @router.get("", response_model=list[BoardRead])
-def list_boards(db: Session = Depends(get_db)):
+def list_boards(db: Session = Depends(get_read_db)):
     return db.query(Board).order_by(Board.updated_at.desc()).all()
 
 
@@ -22,19 +39,178 @@ def create_board(data: BoardCreate, db: Session = Depends(get_db)):
     return board
 
 
-@router.get("/{board_id}", response_model=BoardDetail)
-def get_board(board_id: str, db: Session = Depends(get_db)):
-    board = (
-        db.query(Board)
-        .options(joinedload(Board.cards), joinedload(Board.connections))
-        .filter(Board.id == board_id)
-        .first()
+@router.post("/{board_id}/duplicate", response_model=BoardRead, status_code=201)
+def duplicate_board(
+    board_id: str, data: BoardDuplicate | None = None, db: Session = Depends(get_db)
+):
+    source = db.query(Board).filter(Board.id == board_id).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Board not found")
+    board = Board(name=duplicate_name(source, data))
+    db.add(board)
+    db.flush()
+    copy_board_contents(db, source.id, board.id)
+    db.commit()
+    db.refresh(board)
+    return board
+
+
+def duplicate_name(source: Board, data: BoardDuplicate | None) -> str:
+    return data.name if data and data.name else f"{source.name[:248]} (copy)"
+
+
+# Per-connection scratch table mapping source card ids to their copies.
+# PostgreSQL drops it when the transaction commits.
+_card_id_map = Table(
+    "card_id_map",
+    MetaData(),
+    Column("old_id", GUID, primary_key=True),
+    Column("new_id", GUID, nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+def copy_board_contents(db: Session, source_id: str, target_id: str) -> None:
+    """Copy every card and connection of one board onto another.
+
+    Runs as three INSERT ... SELECT statements in the caller's transaction, so
+    no rows pass through Python regardless of board size.
+    """
+    conn = db.connection()
+    # Connections are pooled, so one may still hold the table if an earlier
+    # copy's cleanup did not run
+    _card_id_map.create(conn, checkfirst=True)
+    try:
+        _copy_via_map(conn, source_id, target_id)
+    finally:
+        # After a failed statement PostgreSQL refuses anything but a rollback,
+        # which drops the table along with the rest of the transaction
+        if conn.dialect.name != "postgresql":
+            _card_id_map.drop(conn, checkfirst=True)
+
+
+def _copy_via_map(conn, source_id: str, target_id: str) -> None:
+    now = utcnow()
+    conn.execute(
+        insert(_card_id_map).from_select(
+            ["old_id", "new_id"],
+            select(Card.id, new_uuid()).where(Card.board_id == source_id),
+        )
+    )
+    copied = ["content_hash", "x", "y", "width", "height", "color", "z_index"]
+    conn.execute(
+        insert(Card).from_select(
+            ["id", "board_id", *copied, "created_at", "updated_at"],
+            select(
+                _card_id_map.c.new_id,
+                literal(target_id, GUID),
+                *(getattr(Card, name) for name in copied),
+                literal(now),
+                literal(now),
+            ).join(_card_id_map, _card_id_map.c.old_id == Card.id),
+        )
     )
+    from_map = _card_id_map.alias("from_map")
+    to_map = _card_id_map.alias("to_map")
+    conn.execute(
+        insert(Connection).from_select(
+            ["id", "board_id", "from_card_id", "to_card_id", "color", *GEOMETRY_FIELDS],
+            select(
+                new_uuid(),
+                literal(target_id, GUID),
+                from_map.c.new_id,
+                to_map.c.new_id,
+                Connection.color,
+                # Copied cards keep their positions, so the geometry still holds
+                *(getattr(Connection, name) for name in GEOMETRY_FIELDS),
+            )
+            .join(from_map, from_map.c.old_id == Connection.from_card_id)
+            .join(to_map, to_map.c.old_id == Connection.to_card_id)
+            .where(Connection.board_id == source_id),
+        )
+    )
+
+
+@router.get(
+    "/{board_id}",
+    response_model=BoardDetail | ProjectedBoardDetail | CompactBoardDetail,
+    response_model_exclude_unset=True,
+)
+def get_board(
+    board_id: str,
+    compact: bool = False,
+    fields: str | None = None,
+    db: Session = Depends(get_read_db),
+):
+    """Load a board with its cards and connections.
+
+    ``fields`` (e.g. ``x,y,color``) narrows the card columns that are selected
+    and returned; ``compact`` switches to the columnar representation.
+    """
+    names = parse_card_fields(fields)
+    projected = compact or fields is not None
+    query = db.query(Board).filter(Board.id == board_id)
+    if not projected:
+        # Two joinedloads would multiply cards by connections in one result set
+        query = query.options(
+            selectinload(Board.cards).undefer(Card.content),
+            selectinload(Board.connections),
+        )
+    board = query.first()
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
+    if compact:
+        return _compact_board(db, board, names)
+    if projected:
+        connections = db.execute(
+            select(Connection.__table__).where(Connection.board_id == board.id)
+        ).mappings()
+        return ProjectedBoardDetail(
+            id=board.id,
+            name=board.name,
+            created_at=board.created_at,
+            updated_at=board.updated_at,
+            cards=select_card_rows(db, names, Card.board_id == board.id),
+            connections=[ConnectionRead(**row) for row in connections],
+        )
     return board
 
 
+def _epoch_ms(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _columns(db: Session, model, names: list[str], board_id: str) -> dict[str, list]:
+    rows = db.execute(
+        select(*(getattr(model, name) for name in names)).where(
+            model.board_id == board_id
+        )
+    ).all()
+    return {name: list(values) for name, values in zip(names, zip(*rows))} or {
+        name: [] for name in names
+    }
+
+
+def _compact_board(db: Session, board: Board, names: list[str]) -> CompactBoardDetail:
+    names = [name for name in names if name in CardColumns.model_fields]
+    cards = _columns(db, Card, names, board.id)
+    for name in ("created_at", "updated_at"):
+        if name in cards:
+            cards[name] = [_epoch_ms(value) for value in cards[name]]
+    connections = _columns(db, Connection, list(ConnectionColumns.model_fields), board.id)
+    return CompactBoardDetail(
+        id=board.id,
+        name=board.name,
+        created_at=board.created_at,
+        updated_at=board.updated_at,
+        cards=CardColumns(**cards),
+        connections=ConnectionColumns(**connections),
+    )
+
+
 @router.patch("/{board_id}", response_model=BoardRead)
 def update_board(board_id: str, data: BoardUpdate, db: Session = Depends(get_db)):
     board = db.query(Board).filter(Board.id == board_id).first()
@@ -1,21 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Literal
 
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, aliased, undefer
+
+from app import contents, geometry, history, ratelimit, versioning
 from app.database import get_db
-from app.models import Board, Card
-from app.schemas import CardBatchUpdate, CardCreate, CardRead, CardUpdate
+from app.models import Board, Card, MalformedId, canonical_id
+from app.replication import get_read_db
+from app.schemas import (
+    CardBatchUpdate,
+    CardCounts,
+    CardCreate,
+    CardFields,
+    CardQueryResult,
+    CardRead,
+    CardUpdate,
+)
 
 router = APIRouter(tags=["cards"])
 
+CARD_FIELDS = list(CardRead.model_fields)
+
+
+def parse_card_fields(fields: str | None) -> list[str]:
+    """Turn a ``?fields=x,y,color`` selector into column names, ``id`` first."""
+    if not fields:
+        return CARD_FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(CARD_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown card fields: {', '.join(unknown)}"
+        )
+    return ["id", *(name for name in CARD_FIELDS[1:] if name in requested)]
+
+
+def select_card_rows(db: Session, names: list[str], *criteria) -> list[dict]:
+    """Fetch only the named card columns, without building ORM entities."""
+    query = select(*(getattr(Card, name) for name in names)).where(*criteria)
+    return [dict(row) for row in db.execute(query).mappings()]
+
+
+def load_cards(db: Session, ids: list[str]) -> list[Card]:
+    """Load full cards, content included, in one query and in the order of ``ids``.
+
+    ``Card.content`` is deferred, so cards coming back from an UPDATE ...
+    RETURNING or a commit would otherwise fetch it one row at a time.
+    """
+    cards = db.scalars(
+        select(Card).where(Card.id.in_(ids)).options(undefer(Card.content))
+    )
+    by_id = {card.id: card for card in cards}
+    return [by_id[card_id] for card_id in ids]
+
+
+@router.get(
+    "/api/boards/{board_id}/cards",
+    response_model=list[CardFields],
+    response_model_exclude_unset=True,
+)
+def list_cards(
+    board_id: str, fields: str | None = None, db: Session = Depends(get_read_db)
+):
+    names = parse_card_fields(fields)
+    board = db.query(Board.id).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return select_card_rows(db, names, Card.board_id == board_id)
+
 
 @router.post("/api/boards/{board_id}/cards", response_model=CardRead, status_code=201)
 def create_card(board_id: str, data: CardCreate, db: Session = Depends(get_db)):
     board = db.query(Board).filter(Board.id == board_id).first()
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
+    ratelimit.check_board(board_id)
     card = Card(
         board_id=board_id,
-        content=data.content,
+        content_hash=contents.store_content(db, data.content),
         x=data.x,
         y=data.y,
         width=data.width,
@@ -24,41 +88,235 @@ def create_card(board_id: str, data: CardCreate, db: Session = Depends(get_db)):
         z_index=data.z_index,
     )
     db.add(card)
+    db.flush()
+    history.record_operation(
+        db,
+        board_id,
+        "create_card",
+        undo=[history.delete_step("cards", [card.id])],
+        redo=[history.insert_step("cards", [card])],
+    )
     db.commit()
-    db.refresh(card)
-    return card
+    return load_cards(db, [card.id])[0]
+
+
+@router.post("/api/boards/{board_id}/cards/normalize-z", status_code=204)
+def normalize_z_indexes(board_id: str, db: Session = Depends(get_db)):
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    ratelimit.check_board(board_id)
+    compact_z_indexes(db, board_id)
+    db.commit()
+
+
+def compact_z_indexes(db: Session, board_id: str) -> None:
+    """Renumber a board's z-indexes to 1..n, preserving stacking order."""
+    ranked = (
+        select(
+            Card.id,
+            func.row_number()
+            .over(order_by=(Card.z_index, Card.created_at, Card.id))
+            .label("rank"),
+        )
+        .where(Card.board_id == board_id)
+        .subquery()
+    )
+    db.execute(
+        update(Card)
+        .where(Card.id == ranked.c.id, Card.z_index != ranked.c.rank)
+        .values(z_index=ranked.c.rank)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _utc_naive(value: datetime) -> datetime:
+    # Timestamps are stored as naive UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def card_filters(
+    board_id: list[str] = Query(default=[]),
+    color: list[str] = Query(default=[]),
+    x_min: float | None = None,
+    x_max: float | None = None,
+    y_min: float | None = None,
+    y_max: float | None = None,
+    updated_after: datetime | None = None,
+    updated_before: datetime | None = None,
+) -> list:
+    """Translate query parameters into WHERE criteria on ``cards``.
+
+    ``board_id`` and ``color`` may repeat and match any of their values. The
+    region keeps cards that overlap the given rectangle; ``updated_after`` is
+    inclusive and ``updated_before`` exclusive.
+    """
+    criteria = []
+    if board_id:
+        try:
+            board_id = [canonical_id(value) for value in board_id]
+        except MalformedId:
+            raise HTTPException(status_code=400, detail="Malformed board_id") from None
+        criteria.append(Card.board_id.in_(board_id))
+    if color:
+        criteria.append(Card.color.in_(color))
+    if x_min is not None:
+        criteria.append(Card.x + Card.width > x_min)
+    if x_max is not None:
+        criteria.append(Card.x < x_max)
+    if y_min is not None:
+        criteria.append(Card.y + Card.height > y_min)
+    if y_max is not None:
+        criteria.append(Card.y < y_max)
+    if updated_after is not None:
+        criteria.append(Card.updated_at >= _utc_naive(updated_after))
+    if updated_before is not None:
+        criteria.append(Card.updated_at < _utc_naive(updated_before))
+    return criteria
+
+
+# Query routes must come before {card_id} routes for the same reason as batch
+@router.get("/api/cards/query", response_model=CardQueryResult)
+def query_cards(
+    criteria: list = Depends(card_filters),
+    after: str | None = None,
+    limit: int = Query(default=1000, ge=1, le=10000),
+    db: Session = Depends(get_read_db),
+):
+    """Ids of the cards matching the filters, a page at a time in id order."""
+    query = select(Card.id).where(*criteria).order_by(Card.id).limit(limit + 1)
+    if after is not None:
+        try:
+            after = canonical_id(after)
+        except MalformedId:
+            raise HTTPException(status_code=400, detail="Malformed cursor") from None
+        query = query.where(Card.id > after)
+    ids = list(db.scalars(query))
+    if len(ids) > limit:
+        return CardQueryResult(ids=ids[:limit], next_after=ids[limit - 1])
+    return CardQueryResult(ids=ids)
+
+
+@router.get("/api/cards/counts", response_model=CardCounts)
+def count_cards(
+    group_by: Literal["color", "board"],
+    criteria: list = Depends(card_filters),
+    db: Session = Depends(get_read_db),
+):
+    """Number of cards matching the filters, per color or per board."""
+    key = Card.color if group_by == "color" else Card.board_id
+    rows = db.execute(
+        select(key, func.count()).where(*criteria).group_by(key)
+    ).all()
+    counts = {str(value): count for value, count in rows}
+    return CardCounts(group_by=group_by, counts=counts, total=sum(counts.values()))
 
 
 # Batch must come before {card_id} routes to avoid "batch" matching as a card_id
 @router.patch("/api/cards/batch", response_model=list[CardRead])
 def batch_update_cards(data: CardBatchUpdate, db: Session = Depends(get_db)):
-    updated_cards = []
+    fields = {"x", "y", "z_index"}
+    # A card listed more than once gets one UPDATE with its items merged in
+    # order; every item's expected_version is checked against the same row.
+    updates: dict[str, dict] = {}
+    expected: dict[str, int | None] = {}
+    for item in data.cards:
+        card_id = canonical_id(item.id)
+        updates.setdefault(card_id, {}).update(
+            item.model_dump(exclude_unset=True, exclude={"id", "expected_version"})
+        )
+        if expected.get(card_id) is None:
+            expected[card_id] = item.expected_version
+    before = versioning.fetch_before(db, Card, list(updates), fields)
     for item in data.cards:
-        card = db.query(Card).filter(Card.id == item.id).first()
-        if not card:
+        old = before.get(canonical_id(item.id))
+        if not old:
             raise HTTPException(
                 status_code=404, detail=f"Card {item.id} not found"
             )
-        update_data = item.model_dump(exclude_unset=True, exclude={"id"})
-        for key, value in update_data.items():
-            setattr(card, key, value)
-        updated_cards.append(card)
+        if item.expected_version not in (None, old["version"]):
+            raise versioning.conflict(Card, item.id)
+    for board_id in {old["board_id"] for old in before.values()}:
+        ratelimit.check_board(board_id)
+    changes_by_board: dict[str, list] = {}
+    moved = []
+    for card_id, update_data in updates.items():
+        if not update_data:
+            continue
+        _, old = versioning.update_versioned(
+            db, Card, card_id, update_data, before[card_id], expected[card_id]
+        )
+        changes_by_board.setdefault(old["board_id"], []).append(
+            (card_id, {k: (old[k], v) for k, v in update_data.items()})
+        )
+        if not update_data.keys().isdisjoint(geometry.RECT_FIELDS):
+            moved.append(card_id)
+    geometry.refresh_for_cards(db, moved)
+    for board_id, changes in changes_by_board.items():
+        undo, redo = history.update_steps("cards", changes)
+        history.record_operation(db, board_id, "update_cards", undo, redo)
     db.commit()
-    for card in updated_cards:
-        db.refresh(card)
-    return updated_cards
+    return load_cards(db, list(updates))
+
+
+@router.get(
+    "/api/cards/{card_id}",
+    response_model=CardFields,
+    response_model_exclude_unset=True,
+)
+def get_card(
+    card_id: str,
+    response: Response,
+    fields: str | None = None,
+    db: Session = Depends(get_read_db),
+):
+    names = parse_card_fields(fields)
+    rows = select_card_rows(db, names, Card.id == card_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Card not found")
+    if "version" in rows[0]:
+        response.headers["ETag"] = f'"{rows[0]["version"]}"'
+    return rows[0]
 
 
 @router.patch("/api/cards/{card_id}", response_model=CardRead)
-def update_card(card_id: str, data: CardUpdate, db: Session = Depends(get_db)):
-    card = db.query(Card).filter(Card.id == card_id).first()
-    if not card:
+def update_card(
+    card_id: str,
+    data: CardUpdate,
+    response: Response,
+    if_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    card_id = canonical_id(card_id)
+    expected = versioning.expected_version(data.expected_version, if_match)
+    update_data = data.model_dump(exclude_unset=True, exclude={"expected_version"})
+    fields = {"content_hash" if name == "content" else name for name in update_data}
+    old = versioning.fetch_before(db, Card, [card_id], fields).get(card_id)
+    if not old:
         raise HTTPException(status_code=404, detail="Card not found")
-    update_data = data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(card, key, value)
+    if expected not in (None, old["version"]):
+        raise versioning.conflict(Card, card_id)
+    if not update_data:
+        # Nothing to change: no new version, and no journal entry that would
+        # discard the redo branch
+        response.headers["ETag"] = f'"{old["version"]}"'
+        return load_cards(db, [card_id])[0]
+    ratelimit.check_board(old["board_id"])
+    if "content" in update_data:
+        text = update_data.pop("content")
+        update_data["content_hash"] = contents.store_content(db, text)
+    _, old = versioning.update_versioned(db, Card, card_id, update_data, old, expected)
+    if not update_data.keys().isdisjoint(geometry.RECT_FIELDS):
+        geometry.refresh_for_cards(db, [card_id])
+    undo, redo = history.update_steps(
+        "cards", [(card_id, {k: (old[k], v) for k, v in update_data.items()})]
+    )
+    history.record_operation(db, old["board_id"], "update_card", undo, redo)
     db.commit()
-    db.refresh(card)
+    card = load_cards(db, [card_id])[0]
+    response.headers["ETag"] = f'"{card.version}"'
     return card
 
 
@@ -67,5 +325,50 @@ def delete_card(card_id: str, db: Session = Depends(get_db)):
     card = db.query(Card).filter(Card.id == card_id).first()
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
+    ratelimit.check_board(card.board_id)
+    history.record_operation(
+        db,
+        card.board_id,
+        "delete_card",
+        undo=[
+            history.insert_step("cards", [card]),
+            history.insert_step(
+                "connections", card.connections_from + card.connections_to
+            ),
+        ],
+        redo=[history.delete_step("cards", [card.id])],
+    )
     db.delete(card)
     db.commit()
+
+
+def _restack_card(db: Session, card_id: str, to_front: bool) -> Card:
+    # Computing the new z_index in a correlated subquery keeps the read and the
+    # write in one statement, so concurrent raises cannot pick the same value.
+    # Only *other* cards are considered, so re-raising the top card is a no-op.
+    peers = aliased(Card)
+    bound = func.max(peers.z_index) + 1 if to_front else func.min(peers.z_index) - 1
+    new_z = (
+        select(func.coalesce(bound, Card.z_index))
+        .where(peers.board_id == Card.board_id, peers.id != Card.id)
+        .scalar_subquery()
+    )
+    card = db.scalars(
+        update(Card).where(Card.id == card_id).values(z_index=new_z).returning(Card)
+    ).first()
+    if not card:
+        raise HTTPException(status_code=404, detail="Card not found")
+    # Checked after the UPDATE, which is what finds the board; a 429 rolls it back
+    ratelimit.check_board(card.board_id)
+    db.commit()
+    return load_cards(db, [card_id])[0]
+
+
+@router.post("/api/cards/{card_id}/raise", response_model=CardRead)
+def raise_card(card_id: str, db: Session = Depends(get_db)):
+    return _restack_card(db, card_id, to_front=True)
+
+
+@router.post("/api/cards/{card_id}/lower", response_model=CardRead)
+def lower_card(card_id: str, db: Session = Depends(get_db)):
+    return _restack_card(db, card_id, to_front=False)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from sqlalchemy.orm import Session
 
+from app import geometry, history, ratelimit, versioning
 from app.database import get_db
-from app.models import Board, Card, Connection
+from app.models import Board, Card, Connection, canonical_id
 from app.schemas import ConnectionCreate, ConnectionRead, ConnectionUpdate
 
 router = APIRouter(tags=["connections"])
@@ -19,6 +20,7 @@ def create_connection(
     board = db.query(Board).filter(Board.id == board_id).first()
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
+    ratelimit.check_board(board_id)
 
     # Validate: cannot connect a card to itself
     if data.from_card_id == data.to_card_id:
@@ -66,8 +68,19 @@ def create_connection(
         from_card_id=data.from_card_id,
         to_card_id=data.to_card_id,
         color=data.color,
+        **geometry.connection_path(
+            geometry.card_rect(from_card), geometry.card_rect(to_card)
+        ),
     )
     db.add(connection)
+    db.flush()
+    history.record_operation(
+        db,
+        board_id,
+        "create_connection",
+        undo=[history.delete_step("connections", [connection.id])],
+        redo=[history.insert_step("connections", [connection])],
+    )
     db.commit()
     db.refresh(connection)
     return connection
@@ -75,14 +88,31 @@ def create_connection(
 
 @router.patch("/api/connections/{connection_id}", response_model=ConnectionRead)
 def update_connection(
-    connection_id: str, data: ConnectionUpdate, db: Session = Depends(get_db)
+    connection_id: str,
+    data: ConnectionUpdate,
+    response: Response,
+    if_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
 ):
-    connection = db.query(Connection).filter(Connection.id == connection_id).first()
-    if not connection:
+    connection_id = canonical_id(connection_id)
+    expected = versioning.expected_version(data.expected_version, if_match)
+    old = versioning.fetch_before(db, Connection, [connection_id], {"color"}).get(
+        connection_id
+    )
+    if not old:
         raise HTTPException(status_code=404, detail="Connection not found")
-    connection.color = data.color
+    if expected not in (None, old["version"]):
+        raise versioning.conflict(Connection, connection_id)
+    ratelimit.check_board(old["board_id"])
+    connection, old = versioning.update_versioned(
+        db, Connection, connection_id, {"color": data.color}, old, expected
+    )
+    undo, redo = history.update_steps(
+        "connections", [(connection_id, {"color": (old["color"], data.color)})]
+    )
+    history.record_operation(db, old["board_id"], "update_connection", undo, redo)
     db.commit()
-    db.refresh(connection)
+    response.headers["ETag"] = f'"{connection.version}"'
     return connection
 
 
@@ -91,5 +121,13 @@ def delete_connection(connection_id: str, db: Session = Depends(get_db)):
     connection = db.query(Connection).filter(Connection.id == connection_id).first()
     if not connection:
         raise HTTPException(status_code=404, detail="Connection not found")
+    ratelimit.check_board(connection.board_id)
+    history.record_operation(
+        db,
+        connection.board_id,
+        "delete_connection",
+        undo=[history.insert_step("connections", [connection])],
+        redo=[history.delete_step("connections", [connection.id])],
+    )
     db.delete(connection)
     db.commit()
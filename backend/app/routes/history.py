@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app import history
+from app.database import get_db
+from app.models import Board
+from app.schemas import BoardOperationRead
+
+router = APIRouter(prefix="/api/boards", tags=["history"])
+
+
+def _get_board(db: Session, board_id: str) -> Board:
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return board
+
+
+@router.post("/{board_id}/undo", response_model=BoardOperationRead)
+def undo(board_id: str, db: Session = Depends(get_db)):
+    _get_board(db, board_id)
+    operation = history.undo(db, board_id)
+    if not operation:
+        raise HTTPException(status_code=409, detail="Nothing to undo")
+    db.commit()
+    return operation
+
+
+@router.post("/{board_id}/redo", response_model=BoardOperationRead)
+def redo(board_id: str, db: Session = Depends(get_db)):
+    _get_board(db, board_id)
+    operation = history.redo(db, board_id)
+    if not operation:
+        raise HTTPException(status_code=409, detail="Nothing to redo")
+    db.commit()
+    return operation
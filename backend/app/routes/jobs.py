@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app import jobs
+from app.database import get_db
+from app.models import Board, Job
+from app.routes.boards import duplicate_name
+from app.schemas import BoardDuplicate, JobRead, SnapshotCreate
+
+router = APIRouter(tags=["jobs"])
+
+
+def _get_board(db: Session, board_id: str) -> Board:
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return board
+
+
+def _get_job(db: Session, job_id: str) -> Job:
+    # Resumes jobs a previous process left queued
+    jobs.runner.ensure_polling()
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _submit(db: Session, kind: str, board_id: str | None, **params) -> Job:
+    job = jobs.enqueue(db, kind, board_id, **params)
+    db.commit()
+    jobs.runner.wake()
+    db.refresh(job)
+    return job
+
+
+@router.post(
+    "/api/boards/{board_id}/jobs/duplicate", response_model=JobRead, status_code=202
+)
+def duplicate_board_job(
+    board_id: str, data: BoardDuplicate | None = None, db: Session = Depends(get_db)
+):
+    source = _get_board(db, board_id)
+    return _submit(db, "duplicate_board", board_id, name=duplicate_name(source, data))
+
+
+@router.post(
+    "/api/boards/{board_id}/jobs/delete", response_model=JobRead, status_code=202
+)
+def delete_board_job(board_id: str, db: Session = Depends(get_db)):
+    _get_board(db, board_id)
+    return _submit(db, "delete_board", board_id)
+
+
+@router.post(
+    "/api/boards/{board_id}/jobs/snapshot", response_model=JobRead, status_code=202
+)
+def snapshot_job(
+    board_id: str, data: SnapshotCreate | None = None, db: Session = Depends(get_db)
+):
+    _get_board(db, board_id)
+    name = data.name if data else SnapshotCreate().name
+    return _submit(db, "create_snapshot", board_id, name=name)
+
+
+@router.post("/api/jobs/collect-contents", response_model=JobRead, status_code=202)
+def collect_contents_job(db: Session = Depends(get_db)):
+    """Delete card bodies nothing refers to any more (see ``contents.collect_garbage``)."""
+    return _submit(db, "collect_contents", None)
+
+
+@router.get("/api/jobs/{job_id}", response_model=JobRead)
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    return _get_job(db, job_id)
+
+
+@router.post("/api/jobs/{job_id}/cancel", response_model=JobRead)
+def cancel_job(job_id: str, db: Session = Depends(get_db)):
+    """Cancel a queued job, or ask a running one to stop at its next step.
+
+    Finished jobs are returned unchanged.
+    """
+    job = _get_job(db, job_id)
+    jobs.cancel(db, job)
+    db.commit()
+    db.refresh(job)
+    return job
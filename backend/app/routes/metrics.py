@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from app import ratelimit
+
+router = APIRouter(tags=["metrics"])
+
+
+# Async so it runs on the event loop, which owns the admission state
+@router.get("/api/metrics")
+async def get_metrics():
+    """Mutation admission counters for the worker process that answers."""
+    return {"admission": ratelimit.metrics()}
@@ -0,0 +1,344 @@
+"""Several card and connection edits applied as one atomic action.
+
+``POST /api/boards/{board_id}/ops`` takes an ordered list of ops. They are
+first played against an in-memory copy of the rows they touch, which checks
+them in order (and assigns ids to temp ids) before anything is written; the
+net change is then written with as few statements as it allows (one INSERT
+of new cards, one DELETE per table, and one version-checked UPDATE per
+changed row), journaled as a single undoable operation, and committed once.
+
+Unlike the single-row routes, ``expected_version`` is checked against the
+row as it was before the request, however many ops touch it; the row's
+version goes up by one.
+"""
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app import contents, geometry, history, ratelimit, versioning
+from app.database import get_db
+from app.models import Board, Card, Connection, MalformedId, canonical_id
+from app.routes.cards import load_cards
+from app.schemas import BoardOpResult, BoardOps, BoardOpsResult
+
+router = APIRouter(tags=["ops"])
+
+_CARD_COLUMNS = [column.key for column in Card.__table__.columns]
+_CONNECTION_COLUMNS = [column.key for column in Connection.__table__.columns]
+
+
+def _fail(index: int, status_code: int, detail: str) -> HTTPException:
+    return HTTPException(status_code=status_code, detail=f"ops[{index}]: {detail}")
+
+
+def _canonical(ref: str) -> str:
+    """A row id in the form the database returns; other refs come back as they are."""
+    try:
+        return canonical_id(ref)
+    except MalformedId:
+        # Cannot name a row, so the op using it fails with 404
+        return ref
+
+
+def _row_ids(refs: set[str]) -> set[str]:
+    ids = set()
+    for ref in refs:
+        try:
+            ids.add(canonical_id(ref))
+        except MalformedId:
+            pass
+    return ids
+
+
+class _Plan:
+    """The rows a request touches, as they stand after each op so far."""
+
+    def __init__(self, db: Session, board_id: str, ops: list):
+        self.board_id = board_id
+        self.declared = {op.temp_id for op in ops if getattr(op, "temp_id", None)}
+        self.temp_ids: dict[str, str] = {}
+
+        card_refs, connection_refs = set(), set()
+        for op in ops:
+            if op.op in ("update_card", "delete_card"):
+                card_refs.add(op.id)
+            elif op.op == "create_connection":
+                card_refs.update((op.from_card_id, op.to_card_id))
+            elif op.op in ("update_connection", "delete_connection"):
+                connection_refs.add(op.id)
+        card_refs = _row_ids(card_refs - self.declared)
+        connection_refs = _row_ids(connection_refs - self.declared)
+
+        # Existing rows: the referenced cards and every connection touching
+        # them (deletes cascade to those, and creates must not duplicate one)
+        self.originals: dict[str, Card | Connection] = {}
+        found_cards = db.scalars(
+            select(Card).where(Card.id.in_(card_refs), Card.board_id == board_id)
+        ).all()
+        found_connections = db.scalars(
+            select(Connection).where(
+                Connection.board_id == board_id,
+                or_(
+                    Connection.id.in_(connection_refs),
+                    Connection.from_card_id.in_(card_refs),
+                    Connection.to_card_id.in_(card_refs),
+                ),
+            )
+        ).all()
+        self.cards = {}
+        for card in found_cards:
+            self.originals[card.id] = card
+            self.cards[card.id] = {name: getattr(card, name) for name in _CARD_COLUMNS}
+        self.connections = {}
+        self.pairs = {}
+        for connection in found_connections:
+            self.originals[connection.id] = connection
+            self.connections[connection.id] = {
+                name: getattr(connection, name) for name in _CONNECTION_COLUMNS
+            }
+            self.pairs[frozenset((connection.from_card_id, connection.to_card_id))] = (
+                connection.id
+            )
+
+        # Net changes: new rows, {id: {field: value}} for existing rows, and
+        # deleted existing rows, each in the order the ops produced them
+        self.new_cards: list[str] = []
+        self.new_connections: list[str] = []
+        self.card_changes: dict[str, dict] = {}
+        self.connection_changes: dict[str, dict] = {}
+        self.deleted_cards: list[str] = []
+        self.deleted_connections: list[str] = []
+
+    def resolve(self, index: int, ref: str) -> str:
+        if ref in self.temp_ids:
+            return self.temp_ids[ref]
+        if ref in self.declared:
+            raise _fail(index, 400, f"temp id {ref} is used before it is created")
+        return _canonical(ref)
+
+    def _new_id(self, index: int, temp_id: str | None) -> str:
+        row_id = str(uuid.uuid4())
+        if temp_id is not None:
+            if temp_id in self.temp_ids:
+                raise _fail(index, 400, f"temp id {temp_id} is created twice")
+            self.temp_ids[temp_id] = row_id
+        return row_id
+
+    def _existing(self, index: int, rows: dict, ref: str, name: str) -> str:
+        row_id = self.resolve(index, ref)
+        if row_id not in rows:
+            raise _fail(index, 404, f"{name} not found")
+        return row_id
+
+    def _check_version(self, index: int, model, row_id: str, expected: int | None):
+        original = self.originals.get(row_id)
+        if original is not None and expected not in (None, original.version):
+            raise _fail(index, 409, versioning.conflict(model, row_id).detail)
+
+    def create_card(self, index: int, op) -> str:
+        card_id = self._new_id(index, op.temp_id)
+        self.cards[card_id] = {
+            "id": card_id,
+            "board_id": self.board_id,
+            **op.model_dump(exclude={"op", "temp_id"}),
+        }
+        self.new_cards.append(card_id)
+        return card_id
+
+    def update_card(self, index: int, op) -> str:
+        card_id = self._existing(index, self.cards, op.id, "Card")
+        self._check_version(index, Card, card_id, op.expected_version)
+        values = op.model_dump(exclude_unset=True, exclude={"op", "id", "expected_version"})
+        self.cards[card_id].update(values)
+        if card_id in self.originals:
+            self.card_changes.setdefault(card_id, {}).update(values)
+        return card_id
+
+    def delete_card(self, index: int, op) -> str:
+        card_id = self._existing(index, self.cards, op.id, "Card")
+        for connection_id, connection in list(self.connections.items()):
+            if card_id in (connection["from_card_id"], connection["to_card_id"]):
+                self._remove_connection(connection_id)
+        del self.cards[card_id]
+        if card_id in self.originals:
+            self.card_changes.pop(card_id, None)
+            self.deleted_cards.append(card_id)
+        else:
+            self.new_cards.remove(card_id)
+        return card_id
+
+    def create_connection(self, index: int, op) -> str:
+        from_card_id = self.resolve(index, op.from_card_id)
+        to_card_id = self.resolve(index, op.to_card_id)
+        if from_card_id == to_card_id:
+            raise _fail(index, 400, "Cannot connect a card to itself")
+        if from_card_id not in self.cards:
+            raise _fail(index, 404, "Source card not found on this board")
+        if to_card_id not in self.cards:
+            raise _fail(index, 404, "Target card not found on this board")
+        pair = frozenset((from_card_id, to_card_id))
+        if pair in self.pairs:
+            raise _fail(index, 409, "Connection between these cards already exists")
+        connection_id = self._new_id(index, op.temp_id)
+        self.connections[connection_id] = {
+            "id": connection_id,
+            "board_id": self.board_id,
+            "from_card_id": from_card_id,
+            "to_card_id": to_card_id,
+            "color": op.color,
+        }
+        self.pairs[pair] = connection_id
+        self.new_connections.append(connection_id)
+        return connection_id
+
+    def update_connection(self, index: int, op) -> str:
+        connection_id = self._existing(index, self.connections, op.id, "Connection")
+        self._check_version(index, Connection, connection_id, op.expected_version)
+        self.connections[connection_id]["color"] = op.color
+        if connection_id in self.originals:
+            self.connection_changes.setdefault(connection_id, {})["color"] = op.color
+        return connection_id
+
+    def delete_connection(self, index: int, op) -> str:
+        connection_id = self._existing(index, self.connections, op.id, "Connection")
+        self._remove_connection(connection_id)
+        return connection_id
+
+    def _remove_connection(self, connection_id: str) -> None:
+        connection = self.connections.pop(connection_id)
+        del self.pairs[frozenset((connection["from_card_id"], connection["to_card_id"]))]
+        if connection_id in self.originals:
+            self.connection_changes.pop(connection_id, None)
+            self.deleted_connections.append(connection_id)
+        else:
+            self.new_connections.remove(connection_id)
+
+
+def _changes(plan: _Plan, changes: dict[str, dict]) -> list[tuple[str, dict[str, tuple]]]:
+    """``(id, {field: (old, new)})`` for each changed existing row."""
+    return [
+        (row_id, {k: (getattr(plan.originals[row_id], k), v) for k, v in values.items()})
+        for row_id, values in changes.items()
+    ]
+
+
+def _update(db: Session, plan: _Plan, model, changes: dict[str, dict]) -> None:
+    rows = [
+        {"id": row_id, "version": plan.originals[row_id].version, **values}
+        for row_id, values in changes.items()
+    ]
+    versioning.bulk_update_versioned(db, model, rows)
+
+
+def _write(db: Session, plan: _Plan) -> list[str]:
+    """Write the plan; return the ids of the connections moved cards redrew."""
+    new_cards = [plan.cards[card_id] for card_id in plan.new_cards]
+    hashes = contents.store_contents(
+        db,
+        [card["content"] for card in new_cards]
+        + [c["content"] for c in plan.card_changes.values() if "content" in c],
+    )
+    for values in (*new_cards, *plan.card_changes.values()):
+        if "content" in values:
+            values["content_hash"] = hashes[values.pop("content")]
+
+    deleted_connections = [plan.originals[i] for i in plan.deleted_connections]
+    deleted_cards = [plan.originals[i] for i in plan.deleted_cards]
+    if plan.deleted_connections:
+        db.execute(
+            delete(Connection)
+            .where(Connection.id.in_(plan.deleted_connections))
+            .execution_options(synchronize_session=False)
+        )
+    if plan.deleted_cards:
+        db.execute(
+            delete(Card)
+            .where(Card.id.in_(plan.deleted_cards))
+            .execution_options(synchronize_session=False)
+        )
+    if new_cards:
+        db.execute(insert(Card), new_cards)
+    _update(db, plan, Card, plan.card_changes)
+    _update(db, plan, Connection, plan.connection_changes)
+
+    # New connections are drawn between the cards' final rectangles, which
+    # the plan already holds; existing ones touching a moved card are redrawn
+    rect = geometry.RECT_FIELDS
+    new_connections = []
+    for connection_id in plan.new_connections:
+        connection = plan.connections[connection_id]
+        from_card, to_card = (
+            plan.cards[connection[end]] for end in ("from_card_id", "to_card_id")
+        )
+        path = geometry.connection_path(
+            tuple(from_card[f] for f in rect), tuple(to_card[f] for f in rect)
+        )
+        new_connections.append({**connection, **path})
+    if new_connections:
+        db.execute(insert(Connection), new_connections)
+    redrawn = geometry.refresh_for_cards(
+        db,
+        [
+            card_id
+            for card_id, values in plan.card_changes.items()
+            if not values.keys().isdisjoint(rect)
+        ],
+    )
+
+    created_cards = db.scalars(select(Card).where(Card.id.in_(plan.new_cards))).all()
+    created_connections = db.scalars(
+        select(Connection).where(Connection.id.in_(plan.new_connections))
+    ).all()
+    card_undo, card_redo = history.update_steps("cards", _changes(plan, plan.card_changes))
+    connection_undo, connection_redo = history.update_steps(
+        "connections", _changes(plan, plan.connection_changes)
+    )
+    undo = [
+        history.delete_step("connections", plan.new_connections),
+        history.delete_step("cards", plan.new_cards),
+        history.insert_step("cards", deleted_cards),
+        history.insert_step("connections", deleted_connections),
+        *card_undo,
+        *connection_undo,
+    ]
+    redo = [
+        history.delete_step("connections", plan.deleted_connections),
+        history.delete_step("cards", plan.deleted_cards),
+        history.insert_step("cards", created_cards),
+        history.insert_step("connections", created_connections),
+        *card_redo,
+        *connection_redo,
+    ]
+    history.record_operation(db, plan.board_id, "apply_ops", undo, redo)
+    return redrawn
+
+
+@router.post("/api/boards/{board_id}/ops", response_model=BoardOpsResult)
+def apply_ops(board_id: str, data: BoardOps, db: Session = Depends(get_db)):
+    """Apply the ops in order, all or nothing; errors name the failing op."""
+    board = db.query(Board.id).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    ratelimit.check_board(board_id)
+
+    plan = _Plan(db, board_id, data.ops)
+    results = [
+        BoardOpResult(op=op.op, id=getattr(plan, op.op)(index, op))
+        for index, op in enumerate(data.ops)
+    ]
+    redrawn = _write(db, plan)
+    db.commit()
+
+    connection_ids = {*plan.new_connections, *plan.connection_changes, *redrawn}
+    return {
+        "results": results,
+        "ids": plan.temp_ids,
+        "cards": load_cards(db, [*plan.new_cards, *plan.card_changes]),
+        "connections": db.scalars(
+            select(Connection).where(Connection.id.in_(connection_ids))
+        ).all(),
+        "deleted_card_ids": plan.deleted_cards,
+        "deleted_connection_ids": plan.deleted_connections,
+    }
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+
+from app import profiling
+
+
+def require_token(x_corkboard_profile: str | None = Header(default=None)) -> None:
+    if not profiling.token_matches(x_corkboard_profile):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+
+# Only included when profiling is configured (see app.main)
+router = APIRouter(
+    prefix="/api/debug/profiles",
+    tags=["profiling"],
+    dependencies=[Depends(require_token)],
+)
+
+
+def _get_capture(capture_id: str) -> profiling.Capture:
+    capture = profiling.get_capture(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return capture
+
+
+@router.get("")
+def list_profiles():
+    """Captures held by this worker process, oldest first."""
+    return [capture.summary() for capture in profiling.captures()]
+
+
+@router.get("/{capture_id}")
+def get_profile(capture_id: str):
+    capture = _get_capture(capture_id)
+    return {
+        **capture.summary(),
+        "queries": capture.queries,
+        "functions": capture.functions(),
+    }
+
+
+@router.get("/{capture_id}/pstats")
+def download_pstats(capture_id: str):
+    """The cProfile data; load it with ``pstats.Stats(path)`` or snakeviz."""
+    capture = _get_capture(capture_id)
+    return Response(
+        capture.dump(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{capture.id}.pstats"'},
+    )
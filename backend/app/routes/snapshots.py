@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app import snapshots
+from app.database import get_db
+from app.models import Board, BoardSnapshot
+from app.schemas import SnapshotCreate, SnapshotDiff, SnapshotRead
+
+router = APIRouter(prefix="/api/boards/{board_id}/snapshots", tags=["snapshots"])
+
+
+def _get_board(db: Session, board_id: str) -> Board:
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return board
+
+
+def _get_snapshot(db: Session, board_id: str, snapshot_id: str) -> BoardSnapshot:
+    snapshot = (
+        db.query(BoardSnapshot)
+        .filter(BoardSnapshot.id == snapshot_id, BoardSnapshot.board_id == board_id)
+        .first()
+    )
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return snapshot
+
+
+@router.post("", response_model=SnapshotRead, status_code=201)
+def create_snapshot(
+    board_id: str, data: SnapshotCreate | None = None, db: Session = Depends(get_db)
+):
+    _get_board(db, board_id)
+    snapshot = snapshots.create_snapshot(
+        db, board_id, data.name if data else SnapshotCreate().name
+    )
+    db.commit()
+    return snapshot
+
+
+@router.get("", response_model=list[SnapshotRead])
+def list_snapshots(board_id: str, db: Session = Depends(get_db)):
+    _get_board(db, board_id)
+    return (
+        db.query(BoardSnapshot)
+        .filter(BoardSnapshot.board_id == board_id)
+        .order_by(BoardSnapshot.created_at.desc())
+        .all()
+    )
+
+
+@router.get("/{snapshot_id}/diff", response_model=SnapshotDiff)
+def diff_snapshot(
+    board_id: str,
+    snapshot_id: str,
+    against: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """Changes from the snapshot to ``against`` (another snapshot id) or the live board."""
+    _get_board(db, board_id)
+    old = _get_snapshot(db, board_id, snapshot_id)
+    new = _get_snapshot(db, board_id, against) if against else None
+    return snapshots.diff_snapshots(db, board_id, old, new)
+
+
+@router.post("/{snapshot_id}/restore", status_code=204)
+def restore_snapshot(board_id: str, snapshot_id: str, db: Session = Depends(get_db)):
+    _get_board(db, board_id)
+    snapshot = _get_snapshot(db, board_id, snapshot_id)
+    snapshots.restore_snapshot(db, board_id, snapshot)
+    db.commit()
@@ -1,6 +1,7 @@
 from datetime import datetime
+from typing import Annotated, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 # --- Board schemas ---
@@ -14,6 +15,10 @@ class BoardUpdate(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
 
 
+class BoardDuplicate(BaseModel):
+    name: str | None = Field(default=None, min_length=1, max_length=255)
+
+
 class CardRead(BaseModel):
     id: str
     board_id: str
@@ -24,6 +29,7 @@ class CardRead(BaseModel):
     height: float
     color: str
     z_index: int
+    version: int
     created_at: datetime
     updated_at: datetime
 
@@ -36,6 +42,14 @@ class ConnectionRead(BaseModel):
     from_card_id: str
     to_card_id: str
     color: str
+    version: int
+    # Quadratic bezier from start to end through control, in board percent
+    start_x: float
+    start_y: float
+    control_x: float
+    control_y: float
+    end_x: float
+    end_y: float
 
     model_config = {"from_attributes": True}
 
@@ -60,6 +74,76 @@ class BoardDetail(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class CardFields(BaseModel):
+    """A card narrowed to the fields requested with ``?fields=``."""
+
+    id: str
+    board_id: str | None = None
+    content: str | None = None
+    x: float | None = None
+    y: float | None = None
+    width: float | None = None
+    height: float | None = None
+    color: str | None = None
+    z_index: int | None = None
+    version: int | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
+class ProjectedBoardDetail(BaseModel):
+    id: str
+    name: str
+    created_at: datetime
+    updated_at: datetime
+    cards: list[CardFields]
+    connections: list[ConnectionRead]
+
+
+class CardColumns(BaseModel):
+    """Cards as parallel arrays; timestamps are Unix epoch milliseconds.
+
+    With ``?fields=`` only the requested columns are present.
+    """
+
+    id: list[str]
+    content: list[str] | None = None
+    x: list[float] | None = None
+    y: list[float] | None = None
+    width: list[float] | None = None
+    height: list[float] | None = None
+    color: list[str] | None = None
+    z_index: list[int] | None = None
+    version: list[int] | None = None
+    created_at: list[int] | None = None
+    updated_at: list[int] | None = None
+
+
+class ConnectionColumns(BaseModel):
+    id: list[str]
+    from_card_id: list[str]
+    to_card_id: list[str]
+    color: list[str]
+    version: list[int]
+    start_x: list[float]
+    start_y: list[float]
+    control_x: list[float]
+    control_y: list[float]
+    end_x: list[float]
+    end_y: list[float]
+
+
+class CompactBoardDetail(BaseModel):
+    """``BoardDetail`` without per-row ``board_id`` and with columnar children."""
+
+    id: str
+    name: str
+    created_at: datetime
+    updated_at: datetime
+    cards: CardColumns
+    connections: ConnectionColumns
+
+
 # --- Card schemas ---
 
 
@@ -81,6 +165,15 @@ class CardUpdate(BaseModel):
     height: float | None = Field(default=None, ge=5, le=50)
     color: str | None = Field(default=None, pattern=r"^#[0-9a-fA-F]{6}$")
     z_index: int | None = None
+    expected_version: int | None = None
+
+    @field_validator("content", "x", "y", "width", "height", "color", "z_index")
+    @classmethod
+    def not_null(cls, value):
+        # Leave a field out to keep it; an explicit null is not a value
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
 
 
 class CardBatchItem(BaseModel):
@@ -88,12 +181,25 @@ class CardBatchItem(BaseModel):
     x: float | None = Field(default=None, ge=0, le=100)
     y: float | None = Field(default=None, ge=0, le=100)
     z_index: int | None = None
+    expected_version: int | None = None
 
 
 class CardBatchUpdate(BaseModel):
     cards: list[CardBatchItem]
 
 
+class CardQueryResult(BaseModel):
+    ids: list[str]
+    # Pass as ``after`` to fetch the next page; None on the last page
+    next_after: str | None = None
+
+
+class CardCounts(BaseModel):
+    group_by: Literal["color", "board"]
+    counts: dict[str, int]
+    total: int
+
+
 # --- Connection schemas ---
 
 
@@ -105,3 +211,131 @@ class ConnectionCreate(BaseModel):
 
 class ConnectionUpdate(BaseModel):
     color: str = Field(..., pattern=r"^#[0-9a-fA-F]{6}$")
+    expected_version: int | None = None
+
+
+# --- Ops schemas ---
+# An op refers to a row by its id, or by the temp_id a create earlier in the
+# same request gave it.
+
+
+class CreateCardOp(CardCreate):
+    op: Literal["create_card"]
+    temp_id: str | None = None
+
+
+class UpdateCardOp(CardUpdate):
+    op: Literal["update_card"]
+    id: str
+
+
+class DeleteCardOp(BaseModel):
+    op: Literal["delete_card"]
+    id: str
+
+
+class CreateConnectionOp(ConnectionCreate):
+    op: Literal["create_connection"]
+    temp_id: str | None = None
+
+
+class UpdateConnectionOp(ConnectionUpdate):
+    op: Literal["update_connection"]
+    id: str
+
+
+class DeleteConnectionOp(BaseModel):
+    op: Literal["delete_connection"]
+    id: str
+
+
+BoardOp = Annotated[
+    CreateCardOp
+    | UpdateCardOp
+    | DeleteCardOp
+    | CreateConnectionOp
+    | UpdateConnectionOp
+    | DeleteConnectionOp,
+    Field(discriminator="op"),
+]
+
+
+class BoardOps(BaseModel):
+    ops: list[BoardOp] = Field(..., min_length=1, max_length=1000)
+
+
+class BoardOpResult(BaseModel):
+    op: str
+    id: str
+
+
+class BoardOpsResult(BaseModel):
+    # One per op, in order
+    results: list[BoardOpResult]
+    # temp_id -> id
+    ids: dict[str, str]
+    # Final state of every card and connection created or updated
+    cards: list[CardRead]
+    connections: list[ConnectionRead]
+    # Including connections removed along with their cards
+    deleted_card_ids: list[str]
+    deleted_connection_ids: list[str]
+
+
+# --- History schemas ---
+
+
+class BoardOperationRead(BaseModel):
+    id: int
+    kind: str
+    undone: bool
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+# --- Snapshot schemas ---
+
+
+class SnapshotCreate(BaseModel):
+    name: str = Field(default="Snapshot", min_length=1, max_length=255)
+
+
+class SnapshotRead(BaseModel):
+    id: str
+    board_id: str
+    name: str
+    card_count: int
+    connection_count: int
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class RowDiff(BaseModel):
+    added: list[str]
+    removed: list[str]
+    changed: list[str]
+
+
+class SnapshotDiff(BaseModel):
+    cards: RowDiff
+    connections: RowDiff
+
+
+# --- Job schemas ---
+
+
+class JobRead(BaseModel):
+    id: str
+    kind: str
+    board_id: str | None
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    progress: float
+    result: dict | None
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+    model_config = {"from_attributes": True}
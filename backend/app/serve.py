@@ -0,0 +1,33 @@
+"""Production entry point: ``corkboard-serve`` or ``python -m app.serve``.
+
+Runs the API under uvicorn's process supervisor. Each worker is a separate
+process with its own engine, connection pool and threadpool (nothing is shared
+between workers), sized from the settings in ``app.config``. SIGTERM/SIGINT
+stop accepting connections and let in-flight requests finish before exiting.
+"""
+import argparse
+
+import uvicorn
+
+from app import config
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the CorkBoard API.")
+    parser.add_argument("--host", default=config.HOST)
+    parser.add_argument("--port", type=int, default=config.PORT)
+    parser.add_argument("--workers", type=int, default=config.WORKERS)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=config.GRACEFUL_SHUTDOWN_TIMEOUT,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Copy-on-write board snapshots.
+
+Every card and connection row is stored once per board as a content-addressed
+``SnapshotObject`` (the SHA-256 of its canonical JSON). Rows are grouped into
+pages by the first two hex digits of their id; a page is the sorted list of
+``[id, row hash]`` pairs in that bucket and is itself content-addressed. A
+snapshot only keeps a manifest of page hashes.
+
+Taking a snapshot after a few edits therefore writes the changed rows, the
+pages that contain them and one manifest; diffing and restoring only open the
+pages whose hashes differ.
+"""
+import hashlib
+import json
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import DateTime, delete, insert, select
+from sqlalchemy.orm import Session
+
+from app import geometry, history, versioning
+from app.models import BoardSnapshot, Card, Connection, SnapshotObject
+
+TABLES = {"cards": Card, "connections": Connection}
+
+# Derived or bookkeeping columns that are not part of a row's recorded state:
+# geometry follows from the cards, and restoring a row must bump its version
+# (so clients holding the old one get 409) without making it differ again
+_UNRECORDED = {*geometry.GEOMETRY_FIELDS, "version"}
+
+# Keeps IN lists well below SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+def _digest(data) -> str:
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _bucket(row_id: str) -> str:
+    return row_id[:2]
+
+
+def _current_rows(db: Session, table: str, board_id: str) -> dict[str, tuple[str, dict]]:
+    """Map row id to (row hash, encoded row) for the board's live rows."""
+    model = TABLES[table]
+    columns = [
+        column
+        for column in model.__table__.columns
+        if column.key not in _UNRECORDED
+    ]
+    rows = {}
+    for row in db.execute(select(*columns).where(model.board_id == board_id)).mappings():
+        data = {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in row.items()
+        }
+        rows[data["id"]] = (_digest(data), data)
+    return rows
+
+
+def _paginate(rows: dict[str, tuple[str, dict]]) -> dict[str, list[list[str]]]:
+    pages: dict[str, list[list[str]]] = {}
+    for row_id, (row_hash, _) in rows.items():
+        pages.setdefault(_bucket(row_id), []).append([row_id, row_hash])
+    for members in pages.values():
+        members.sort()
+    return pages
+
+
+def _load_objects(db: Session, board_id: str, hashes: Iterable[str]) -> dict:
+    hashes = list(hashes)
+    found = {}
+    for start in range(0, len(hashes), _CHUNK):
+        found.update(
+            db.execute(
+                select(SnapshotObject.hash, SnapshotObject.data).where(
+                    SnapshotObject.board_id == board_id,
+                    SnapshotObject.hash.in_(hashes[start : start + _CHUNK]),
+                )
+            ).all()
+        )
+    return found
+
+
+def _store_objects(db: Session, board_id: str, objects: dict[str, object]) -> None:
+    """Insert the objects whose hashes the board does not already hold."""
+    existing = _existing_hashes(db, board_id, objects)
+    rows = [
+        {"board_id": board_id, "hash": object_hash, "data": data}
+        for object_hash, data in objects.items()
+        if object_hash not in existing
+    ]
+    if rows:
+        db.execute(insert(SnapshotObject), rows)
+
+
+def _existing_hashes(db: Session, board_id: str, hashes: Iterable[str]) -> set[str]:
+    hashes = list(hashes)
+    existing = set()
+    for start in range(0, len(hashes), _CHUNK):
+        existing.update(
+            db.scalars(
+                select(SnapshotObject.hash).where(
+                    SnapshotObject.board_id == board_id,
+                    SnapshotObject.hash.in_(hashes[start : start + _CHUNK]),
+                )
+            )
+        )
+    return existing
+
+
+def create_snapshot(db: Session, board_id: str, name: str) -> BoardSnapshot:
+    manifest = {}
+    counts = {}
+    for table in TABLES:
+        rows = _current_rows(db, table, board_id)
+        counts[table] = len(rows)
+        pages = {
+            bucket: (_digest(members), members)
+            for bucket, members in _paginate(rows).items()
+        }
+        manifest[table] = {bucket: page_hash for bucket, (page_hash, _) in pages.items()}
+        # A stored page implies its rows are stored, so only new pages are opened
+        stored_pages = _existing_hashes(db, board_id, manifest[table].values())
+        new_pages = {
+            page_hash: members
+            for page_hash, members in pages.values()
+            if page_hash not in stored_pages
+        }
+        if not new_pages:
+            continue
+        new_rows = {
+            row_hash: rows[row_id][1]
+            for members in new_pages.values()
+            for row_id, row_hash in members
+        }
+        _store_objects(db, board_id, new_rows)
+        _store_objects(db, board_id, new_pages)
+    snapshot = BoardSnapshot(
+        board_id=board_id,
+        name=name,
+        manifest=manifest,
+        card_count=counts["cards"],
+        connection_count=counts["connections"],
+    )
+    db.add(snapshot)
+    db.flush()
+    return snapshot
+
+
+def _changed_buckets(a: dict[str, str], b: dict[str, str]) -> set[str]:
+    return {bucket for bucket in a.keys() | b.keys() if a.get(bucket) != b.get(bucket)}
+
+
+def _stored_members(
+    db: Session, board_id: str, manifest: dict[str, str], buckets: set[str]
+) -> dict[str, str]:
+    """Map row id to row hash across the manifest's pages in ``buckets``."""
+    page_hashes = [manifest[b] for b in buckets if b in manifest]
+    members = {}
+    for page in _load_objects(db, board_id, page_hashes).values():
+        members.update((row_id, row_hash) for row_id, row_hash in page)
+    return members
+
+
+def _live_members(rows: dict[str, tuple[str, dict]], buckets: set[str]) -> dict[str, str]:
+    return {
+        row_id: row_hash
+        for row_id, (row_hash, _) in rows.items()
+        if _bucket(row_id) in buckets
+    }
+
+
+def _compare(before: dict[str, str], after: dict[str, str]) -> dict[str, dict[str, str]]:
+    """Split row ids into added/removed/changed, keyed to their ``after`` hash."""
+    return {
+        "added": {i: h for i, h in after.items() if i not in before},
+        "removed": {i: h for i, h in before.items() if i not in after},
+        "changed": {i: h for i, h in after.items() if i in before and before[i] != h},
+    }
+
+
+def _live_state(db: Session, board_id: str) -> tuple[dict, dict]:
+    """Return the live board's (manifest, rows) without storing anything."""
+    rows = {table: _current_rows(db, table, board_id) for table in TABLES}
+    manifest = {
+        table: {
+            bucket: _digest(members)
+            for bucket, members in _paginate(rows[table]).items()
+        }
+        for table in TABLES
+    }
+    return manifest, rows
+
+
+def diff_snapshots(
+    db: Session, board_id: str, old: BoardSnapshot, new: BoardSnapshot | None
+) -> dict[str, dict[str, list[str]]]:
+    """Diff ``old`` against ``new``, or against the live board when ``new`` is None."""
+    if new is None:
+        manifest, rows = _live_state(db, board_id)
+    else:
+        manifest, rows = new.manifest, None
+    result = {}
+    for table in TABLES:
+        buckets = _changed_buckets(old.manifest[table], manifest[table])
+        before = _stored_members(db, board_id, old.manifest[table], buckets)
+        if rows is None:
+            after = _stored_members(db, board_id, manifest[table], buckets)
+        else:
+            after = _live_members(rows[table], buckets)
+        changes = _compare(before, after)
+        result[table] = {kind: sorted(ids) for kind, ids in changes.items()}
+    return result
+
+
+def _decode(table: str, data: dict) -> dict:
+    columns = TABLES[table].__table__.columns
+    return {
+        key: datetime.fromisoformat(value)
+        if value is not None and isinstance(columns[key].type, DateTime)
+        else value
+        for key, value in data.items()
+    }
+
+
+def restore_snapshot(db: Session, board_id: str, snapshot: BoardSnapshot) -> None:
+    """Bring the live board back to ``snapshot``, touching only differing rows.
+
+    Runs in the caller's transaction as a handful of set-based statements.
+    """
+    manifest, rows = _live_state(db, board_id)
+    changes = {}
+    for table in TABLES:
+        buckets = _changed_buckets(manifest[table], snapshot.manifest[table])
+        changes[table] = _compare(
+            _live_members(rows[table], buckets),
+            _stored_members(db, board_id, snapshot.manifest[table], buckets),
+        )
+    records = _load_objects(
+        db,
+        board_id,
+        {
+            row_hash
+            for table in TABLES
+            for kind in ("added", "changed")
+            for row_hash in changes[table][kind].values()
+        },
+    )
+
+    # Removed connections go before removed cards; anything attached to a
+    # removed card is absent from the snapshot too, so the cascade is safe.
+    for table in ("connections", "cards"):
+        model = TABLES[table]
+        removed = list(changes[table]["removed"])
+        for start in range(0, len(removed), _CHUNK):
+            db.execute(
+                delete(model)
+                .where(model.id.in_(removed[start : start + _CHUNK]))
+                .execution_options(synchronize_session=False)
+            )
+    for table in ("cards", "connections"):
+        model = TABLES[table]
+        changed = [_decode(table, records[h]) for h in changes[table]["changed"].values()]
+        versioning.bulk_update(db, model, changed)
+        added = [_decode(table, records[h]) for h in changes[table]["added"].values()]
+        if added:
+            db.execute(insert(model), added)
+    # Records carry no geometry, and kept connections may run to moved cards
+    geometry.refresh_connections(db, changes["connections"]["added"])
+    geometry.refresh_for_cards(db, changes["cards"]["changed"])
+    # Journaled inverses may refer to rows that no longer exist
+    history.clear(db, board_id)
@@ -0,0 +1,129 @@
+"""Optimistic concurrency for card and connection updates.
+
+Every card and connection row carries a ``version`` that each update bumps.
+Clients may send the version they last saw, as ``expected_version`` in the
+body or as an ``If-Match`` header, and get 409 if the row moved on since.
+
+The version check and the write are one statement::
+
+    UPDATE cards SET ..., version = version + 1
+    WHERE id = :id AND version = :v RETURNING *
+
+so no lock is held between reading and writing. The only read beforehand is
+a column-only fetch of the fields being changed, which the undo journal needs
+as the inverse, and the UPDATE is always pinned to the version that read
+saw. A client that sends no version gets last-writer-wins: when another
+write lands in between, the row is read again and the UPDATE retried, so
+the journal never records an inverse the row did not have. Only a client
+that sent a version gets 409.
+"""
+from fastapi import HTTPException
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+
+def expected_version(body_version: int | None, if_match: str | None) -> int | None:
+    """Resolve the client's expected version from the body or ``If-Match``."""
+    if body_version is not None:
+        return body_version
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip().removeprefix("W/").strip('"')
+    if not tag.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match must be a row version")
+    return int(tag)
+
+
+def conflict(model, row_id: str) -> HTTPException:
+    name = model.__name__
+    return HTTPException(
+        status_code=409,
+        detail=f"{name} {row_id} was modified concurrently; reload and retry",
+    )
+
+
+def fetch_before(db: Session, model, ids: list[str], fields: set[str]) -> dict[str, dict]:
+    """Map id to the board_id, version and given fields of each existing row."""
+    columns = [model.id, model.board_id, model.version]
+    columns += [getattr(model, name) for name in sorted(fields)]
+    rows = db.execute(select(*columns).where(model.id.in_(ids))).mappings()
+    return {row["id"]: dict(row) for row in rows}
+
+
+# Re-reads before giving a client without a version 409 on a hot row
+_RETRIES = 5
+
+
+def update_versioned(
+    db: Session, model, row_id: str, values: dict, old: dict, expected: int | None
+) -> tuple[object, dict]:
+    """Apply ``values`` to the row ``old`` was read from, at ``old``'s version.
+
+    ``old`` comes from ``fetch_before``. If the row moved on since, it is
+    409 when the client expected a version, and otherwise the row is read
+    again and the UPDATE retried. Returns the new row and the ``old`` it
+    was applied over.
+    """
+    fields = old.keys() - {"id", "board_id", "version"}
+    for _ in range(_RETRIES):
+        row = db.scalars(
+            update(model)
+            .where(model.id == row_id, model.version == old["version"])
+            .values(**values, version=model.version + 1)
+            .returning(model)
+        ).first()
+        if row is not None:
+            return row, old
+        if expected is not None:
+            break
+        old = fetch_before(db, model, [row_id], fields).get(row_id)
+        if old is None:
+            raise HTTPException(status_code=404, detail=f"{model.__name__} not found")
+    raise conflict(model, row_id)
+
+
+def bulk_update(db: Session, model, rows: list[dict]) -> None:
+    """Executemany UPDATE by primary key that also bumps each row's version.
+
+    Used to apply journaled or restored values, which must invalidate any
+    version a client is holding.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    fields = [name for name in rows[0] if name not in ("id", "version")]
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("_id"))
+        .values(
+            {
+                **{name: bindparam(f"_{name}") for name in fields},
+                "version": table.c.version + 1,
+            }
+        )
+    )
+    db.execute(
+        statement,
+        [{f"_{name}": row[name] for name in ("id", *fields)} for row in rows],
+    )
+
+
+def bulk_update_versioned(db: Session, model, rows: list[dict]) -> None:
+    """UPDATE each row still at the ``version`` it carries; 409 naming the first that is not.
+
+    Every row has ``id``, ``version`` and the fields to set; each matched
+    row's version is bumped. There is one statement per row, since drivers
+    such as psycopg2 do not report an executemany's rowcount reliably, and
+    RETURNING tells exactly which row missed.
+    """
+    table = model.__table__
+    for row in rows:
+        values = {name: value for name, value in row.items() if name not in ("id", "version")}
+        updated = db.execute(
+            update(table)
+            .where(table.c.id == row["id"], table.c.version == row["version"])
+            .values(**values, version=table.c.version + 1)
+            .returning(table.c.id)
+        ).first()
+        if updated is None:
+            raise conflict(model, row["id"])
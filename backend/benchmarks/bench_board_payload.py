@@ -0,0 +1,52 @@
+"""Bytes on the wire and response time for GET /api/boards/{id}.
+
+Compares the full and compact (``?compact=true``) representations, each with
+and without gzip, for boards of increasing size.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import migrate, seed_boards, summarize
+
+CONTENT = "Remember to follow up on the quarterly planning notes before Friday."
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        migrate(database_url)
+        os.environ["DATABASE_URL"] = database_url
+        from starlette.testclient import TestClient
+
+        from app.main import app
+
+        client = TestClient(app)
+        for size in args.sizes:
+            (board_id,) = seed_boards(database_url, 1, size, size // 2, CONTENT)
+            print(f"--- {size} cards, {size // 2} connections")
+            for compact in (False, True):
+                for encoding in ("identity", "gzip"):
+                    samples = []
+                    for _ in range(args.runs):
+                        start = time.perf_counter()
+                        resp = client.get(
+                            f"/api/boards/{board_id}",
+                            params={"compact": compact},
+                            headers={"Accept-Encoding": encoding},
+                        )
+                        samples.append(time.perf_counter() - start)
+                        resp.raise_for_status()
+                    label = f"{'compact' if compact else 'full':<8}{encoding:<9}"
+                    wire = int(resp.headers["content-length"])
+                    print(f"{label}{wire:>10} bytes   " + summarize("time", samples))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Latency of /api/cards/query and /api/cards/counts over a large database.
+
+Seeds 1M cards across 10k boards (by default) with a handful of colors and
+``updated_at`` spread over a year, times each query, then drops the filter
+indexes and times them again.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import migrate, seed_boards, summarize
+
+COLORS = ("#FEF3C7", "#DBEAFE", "#DCFCE7", "#FCE7F3", "#EDE9FE", "#FFEDD5")
+FILTER_INDEXES = ("ix_cards_color_board", "ix_cards_updated_at")
+
+
+def spread_updated_at(path: str) -> None:
+    # One UPDATE in SQLite itself; seeding gives every card the same timestamp
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "UPDATE cards SET updated_at = "
+            "strftime('%Y-%m-%d %H:%M:%f', 'now', -abs(random() % 31536000) || ' seconds')"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--boards", type=int, default=10_000)
+    parser.add_argument("--cards", type=int, default=100, help="cards per board")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/bench.db"
+        database_url = f"sqlite:///{path}"
+        migrate(database_url)
+        os.environ["DATABASE_URL"] = database_url
+        start = time.perf_counter()
+        board_ids = seed_boards(database_url, args.boards, args.cards, 0, colors=COLORS)
+        spread_updated_at(path)
+        with sqlite3.connect(path) as conn:
+            conn.execute("ANALYZE")
+        print(f"seeded {args.boards * args.cards} cards in {time.perf_counter() - start:.1f}s")
+
+        from starlette.testclient import TestClient
+
+        from app.main import app
+
+        client = TestClient(app)
+        week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
+        queries = [
+            ("ids, one color", "/api/cards/query", {"color": COLORS[1]}),
+            ("ids, updated last week", "/api/cards/query", {"updated_after": week_ago}),
+            (
+                "ids, board + color + region",
+                "/api/cards/query",
+                {"board_id": board_ids[0], "color": COLORS[1], "x_max": 50},
+            ),
+            ("counts per color", "/api/cards/counts", {"group_by": "color"}),
+            (
+                "counts per board, one color",
+                "/api/cards/counts",
+                {"group_by": "board", "color": COLORS[2]},
+            ),
+            (
+                "counts per color, last week",
+                "/api/cards/counts",
+                {"group_by": "color", "updated_after": week_ago},
+            ),
+        ]
+        for label in ("with filter indexes", "without filter indexes"):
+            print(f"--- {label}")
+            for name, url, params in queries:
+                samples = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    client.get(url, params=params).raise_for_status()
+                    samples.append(time.perf_counter() - start)
+                print(summarize(f"{name:<30}", samples))
+            with sqlite3.connect(path) as conn:
+                for index in FILTER_INDEXES:
+                    conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Cold start: time from spawning uvicorn to the first successful response.
+
+Each run starts a fresh ``uvicorn app.main:app`` process against an
+already-migrated SQLite database and polls ``GET /api/boards`` until it
+returns 200.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import BACKEND_DIR, free_port, migrate, summarize, wait_until_ok
+
+
+def cold_start(database_url: str) -> float:
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": database_url}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ok(f"http://127.0.0.1:{port}/api/boards")
+        return time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        migrate(database_url)
+        samples = [cold_start(database_url) for _ in range(args.runs)]
+    print(summarize("time to first response", samples))
+
+
+if __name__ == "__main__":
+    main()
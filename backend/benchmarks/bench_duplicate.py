@@ -0,0 +1,41 @@
+"""Board duplication time as the board grows.
+
+Seeds boards of increasing size and times ``POST /api/boards/{id}/duplicate``
+in-process. With set-based copying the per-card cost should stay flat.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import migrate, seed_boards
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        migrate(database_url)
+        os.environ["DATABASE_URL"] = database_url
+        from starlette.testclient import TestClient
+
+        from app.main import app
+
+        client = TestClient(app)
+        for size in args.sizes:
+            (board_id,) = seed_boards(database_url, 1, size, size // 2)
+            start = time.perf_counter()
+            resp = client.post(f"/api/boards/{board_id}/duplicate")
+            elapsed = time.perf_counter() - start
+            resp.raise_for_status()
+            print(
+                f"{size:>7} cards: {elapsed * 1000:8.1f}ms  "
+                f"({elapsed / size * 1e6:.2f}us/card)"
+            )
+
+
+if __name__ == "__main__":
+    main()
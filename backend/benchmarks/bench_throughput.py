@@ -0,0 +1,84 @@
+"""Read-heavy throughput of ``app.serve`` as the worker count grows.
+
+Seeds a database with boards, starts the production launcher with 1, 2, 4 ...
+workers (up to the CPU count) and drives it with one keep-alive client process
+per worker slot mixing ``GET /api/boards`` and ``GET /api/boards/{id}``.
+Scaling is only meaningful on a machine with at least as many idle cores as
+server workers plus client processes.
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import BACKEND_DIR, free_port, migrate, seed_boards, wait_until_ok
+
+
+def _client(port: int, board_ids: list[str], duration: float) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    done = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        # Roughly one board list per ten board loads
+        path = "/api/boards" if done % 10 == 0 else f"/api/boards/{random.choice(board_ids)}"
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status != 200:
+            raise RuntimeError(f"{path} returned {resp.status}")
+        done += 1
+    conn.close()
+    return done
+
+
+def measure(database_url: str, board_ids: list[str], workers: int, clients: int, duration: float) -> float:
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": database_url, "CORKBOARD_WORKERS": str(workers)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ok(f"http://127.0.0.1:{port}/api/boards")
+        _client(port, board_ids, 1.0)  # warm every worker's pool
+        with multiprocessing.Pool(clients) as pool:
+            counts = pool.starmap(_client, [(port, board_ids, duration)] * clients)
+        return sum(counts) / duration
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--boards", type=int, default=20)
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        migrate(database_url)
+        board_ids = seed_boards(database_url, args.boards, args.cards, args.cards // 2)
+        baseline = None
+        for workers in worker_counts:
+            rps = measure(database_url, board_ids, workers, 2 * workers, args.duration)
+            baseline = baseline or rps
+            print(f"{workers:>3} workers: {rps:8.1f} req/s  (x{rps / baseline:.2f})")
+
+
+if __name__ == "__main__":
+    main()
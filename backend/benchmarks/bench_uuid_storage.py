@@ -0,0 +1,86 @@
+"""Table/index size and board-load latency: String(36) keys vs. compact keys.
+
+Builds a SQLite database at the revision before the compact-key migration,
+seeds it with string ids and measures it, then runs ``alembic upgrade head``
+on a copy (exercising the data migration) and measures again.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import BACKEND_DIR, seed_boards, summarize
+
+STRING_KEYS_REVISION = "5c1e2a7b9d40"
+
+
+def alembic_upgrade(database_url: str, revision: str) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", revision],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "DATABASE_URL": database_url},
+        check=True,
+        capture_output=True,
+    )
+
+
+def object_sizes(path: str) -> dict[str, int]:
+    """Bytes used by every table and index, via SQLite's dbstat view."""
+    with sqlite3.connect(path) as conn:
+        conn.execute("VACUUM")
+        rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+    return dict(rows)
+
+
+def board_load_latency(path: str, board_ids: list, runs: int) -> list[float]:
+    """Time the two queries behind GET /api/boards/{id}."""
+    samples = []
+    with sqlite3.connect(path) as conn:
+        for i in range(runs):
+            board_id = board_ids[i % len(board_ids)]
+            start = time.perf_counter()
+            conn.execute("SELECT * FROM cards WHERE board_id = ?", (board_id,)).fetchall()
+            conn.execute(
+                "SELECT * FROM connections WHERE board_id = ?", (board_id,)
+            ).fetchall()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--boards", type=int, default=20)
+    parser.add_argument("--cards", type=int, default=2_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before, after = f"{tmp}/strings.db", f"{tmp}/compact.db"
+        alembic_upgrade(f"sqlite:///{before}", STRING_KEYS_REVISION)
+        board_ids = seed_boards(
+            f"sqlite:///{before}", args.boards, args.cards, args.cards, reflect=True
+        )
+        shutil.copy(before, after)
+        start = time.perf_counter()
+        alembic_upgrade(f"sqlite:///{after}", "head")
+        print(f"data migration: {time.perf_counter() - start:.2f}s\n")
+
+        sizes = {path: object_sizes(path) for path in (before, after)}
+        print(f"{'object':<36}{'String(36)':>12}{'compact':>12}")
+        for name in sorted(sizes[before].keys() | sizes[after].keys()):
+            print(f"{name:<36}{sizes[before].get(name, 0):>12}{sizes[after].get(name, 0):>12}")
+        print(f"{'total':<36}{sum(sizes[before].values()):>12}{sum(sizes[after].values()):>12}\n")
+
+        keys = {before: board_ids, after: [uuid.UUID(b).bytes for b in board_ids]}
+        for label, path in (("String(36)", before), ("compact", after)):
+            samples = board_load_latency(path, keys[path], args.runs)
+            print(summarize(f"board load, {label}", samples))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks are plain scripts, run from ``backend/``::
+
+    python -m benchmarks.bench_cold_start
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def migrate(database_url: str) -> None:
+    """Bring a database up to the latest Alembic revision.
+
+    Runs in a subprocess so the migration never imports ``app`` modules into
+    the benchmark process with the wrong DATABASE_URL.
+    """
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "DATABASE_URL": database_url},
+        check=True,
+        capture_output=True,
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ok(url: str, timeout: float = 30.0) -> float:
+    """Poll ``url`` until it answers 200; return the time that took."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} did not answer within {timeout}s")
+
+
+def summarize(label: str, samples: list[float], unit: str = "ms") -> str:
+    scale = 1000.0 if unit == "ms" else 1.0
+    ordered = sorted(samples)
+    median = ordered[len(ordered) // 2]
+    return (
+        f"{label}: min {ordered[0] * scale:.1f}{unit}  "
+        f"median {median * scale:.1f}{unit}  max {ordered[-1] * scale:.1f}{unit}"
+    )
+
+
+def seed_boards(
+    database_url: str,
+    boards: int = 1,
+    cards_per_board: int = 100,
+    connections_per_board: int = 50,
+    content: str = "Lorem ipsum dolor sit amet",
+    reflect: bool = False,
+    colors: tuple[str, ...] = ("#FEF3C7",),
+) -> list[str]:
+    """Bulk-insert boards with cards and connections; return the board ids.
+
+    With ``reflect`` the tables are read from the database instead of the
+    models, so rows go in untyped; use it for databases at older revisions.
+    """
+    import random
+    import uuid
+
+    from sqlalchemy import MetaData, create_engine, insert, select
+
+    from app.models import utcnow
+
+    engine = create_engine(database_url)
+    if reflect:
+        metadata = MetaData()
+        metadata.reflect(engine, only=["boards", "cards", "connections"])
+        Board, Card, Connection = (
+            metadata.tables[name] for name in ("boards", "cards", "connections")
+        )
+        content_columns = {"content": content}
+
+        def path(a, b):
+            return {}
+    else:
+        from app.contents import content_hash
+        from app.geometry import RECT_FIELDS, connection_path
+        from app.models import Board, Card, CardContent, Connection
+
+        content_columns = {"content_hash": content_hash(content)}
+
+        def path(a, b):
+            return connection_path(*(tuple(r[f] for f in RECT_FIELDS) for r in (a, b)))
+    now = utcnow()
+    board_ids = []
+    with engine.begin() as conn:
+        if not reflect:
+            digest = content_columns["content_hash"]
+            stored = conn.execute(
+                select(CardContent.hash).where(CardContent.hash == digest)
+            ).first()
+            if not stored:
+                conn.execute(insert(CardContent), [{"hash": digest, "body": content}])
+        for b in range(boards):
+            board_id = str(uuid.uuid4())
+            board_ids.append(board_id)
+            conn.execute(
+                insert(Board),
+                [{"id": board_id, "name": f"Board {b}", "created_at": now, "updated_at": now}],
+            )
+            card_rows = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "board_id": board_id,
+                    **content_columns,
+                    "x": random.uniform(0, 85),
+                    "y": random.uniform(0, 90),
+                    "width": 15.0,
+                    "height": 10.0,
+                    "color": random.choice(colors),
+                    "z_index": i,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(cards_per_board)
+            ]
+            if card_rows:
+                conn.execute(insert(Card), card_rows)
+            pairs = set()
+            while len(pairs) < min(connections_per_board, cards_per_board - 1):
+                i = random.randrange(cards_per_board - 1)
+                pairs.add((i, i + 1 + random.randrange(cards_per_board - 1 - i)))
+            if pairs:
+                conn.execute(
+                    insert(Connection),
+                    [
+                        {
+                            "id": str(uuid.uuid4()),
+                            "board_id": board_id,
+                            "from_card_id": card_rows[i]["id"],
+                            "to_card_id": card_rows[j]["id"],
+                            "color": "#92400E",
+                            **path(card_rows[i], card_rows[j]),
+                        }
+                        for i, j in pairs
+                    ],
+                )
+    engine.dispose()
+    return board_ids
@@ -1,7 +1,8 @@
 import pytest
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, update
 from sqlalchemy.orm import sessionmaker
 
+from app import ratelimit, versioning
 from app.database import Base, get_db
 from app.main import app
 
@@ -35,9 +36,30 @@ def override_get_db():
 app.dependency_overrides[get_db] = override_get_db
 
 
+def write_after_first_read(monkeypatch, model, values):
+    """Make another writer update the row right after the route first reads it."""
+    fetch_before = versioning.fetch_before
+    calls = []
+
+    def racing_fetch_before(db, model_, ids, fields):
+        before = fetch_before(db, model_, ids, fields)
+        if not calls:
+            db.execute(
+                update(model)
+                .where(model.id.in_(ids))
+                .values(**values, version=model.version + 1)
+            )
+        calls.append(ids)
+        return before
+
+    monkeypatch.setattr(versioning, "fetch_before", racing_fetch_before)
+    return calls
+
+
 @pytest.fixture(autouse=True)
 def setup_db():
     Base.metadata.create_all(bind=engine)
+    ratelimit.reset()
     yield
     Base.metadata.drop_all(bind=engine)
 
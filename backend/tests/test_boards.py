@@ -1,3 +1,6 @@
+import pytest
+
+
 def test_create_board(client):
     resp = client.post("/api/boards", json={"name": "My Board"})
     assert resp.status_code == 201
@@ -92,3 +95,198 @@ def test_get_board_with_cards_and_connections(client):
 def test_create_board_empty_name(client):
     resp = client.post("/api/boards", json={"name": ""})
     assert resp.status_code == 422
+
+
+def test_duplicate_board(client):
+    board = client.post("/api/boards", json={"name": "Original"}).json()
+    card1 = client.post(
+        f"/api/boards/{board['id']}/cards",
+        json={"content": "Card 1", "x": 20.0, "z_index": 3},
+    ).json()
+    card2 = client.post(
+        f"/api/boards/{board['id']}/cards", json={"content": "Card 2"}
+    ).json()
+    client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": card1["id"], "to_card_id": card2["id"]},
+    )
+    resp = client.post(f"/api/boards/{board['id']}/duplicate")
+    assert resp.status_code == 201
+    copy = resp.json()
+    assert copy["id"] != board["id"]
+    assert copy["name"] == "Original (copy)"
+
+    detail = client.get(f"/api/boards/{copy['id']}").json()
+    assert len(detail["cards"]) == 2
+    new_ids = {c["id"] for c in detail["cards"]}
+    assert not new_ids & {card1["id"], card2["id"]}
+    by_content = {c["content"]: c for c in detail["cards"]}
+    assert by_content["Card 1"]["x"] == 20.0
+    assert by_content["Card 1"]["z_index"] == 3
+    assert by_content["Card 1"]["board_id"] == copy["id"]
+    (conn,) = detail["connections"]
+    assert conn["board_id"] == copy["id"]
+    assert conn["from_card_id"] == by_content["Card 1"]["id"]
+    assert conn["to_card_id"] == by_content["Card 2"]["id"]
+
+    # The source board is untouched
+    original = client.get(f"/api/boards/{board['id']}").json()
+    assert {c["id"] for c in original["cards"]} == {card1["id"], card2["id"]}
+    assert len(original["connections"]) == 1
+
+
+def test_duplicate_board_custom_name(client):
+    board = client.post("/api/boards", json={"name": "Template"}).json()
+    resp = client.post(
+        f"/api/boards/{board['id']}/duplicate", json={"name": "Sprint 12"}
+    )
+    assert resp.status_code == 201
+    assert resp.json()["name"] == "Sprint 12"
+
+
+def test_duplicate_board_not_found(client):
+    resp = client.post("/api/boards/nonexistent-id/duplicate")
+    assert resp.status_code == 404
+
+
+@pytest.mark.slow
+def test_duplicate_large_board(client):
+    from sqlalchemy import func, select
+
+    from app.models import Card, Connection
+    from benchmarks.common import seed_boards
+    from tests.conftest import SQLALCHEMY_TEST_URL, TestingSessionLocal
+
+    (board_id,) = seed_boards(SQLALCHEMY_TEST_URL, 1, 50_000, 25_000)
+    resp = client.post(f"/api/boards/{board_id}/duplicate")
+    assert resp.status_code == 201
+    copy_id = resp.json()["id"]
+
+    with TestingSessionLocal() as db:
+        def count(model, board):
+            return db.scalar(
+                select(func.count()).select_from(model).where(model.board_id == board)
+            )
+
+        assert count(Card, copy_id) == 50_000
+        assert count(Connection, copy_id) == 25_000
+        # Every copied connection points at copied cards
+        foreign = db.scalar(
+            select(func.count())
+            .select_from(Connection)
+            .join(Card, Card.id == Connection.from_card_id)
+            .where(Connection.board_id == copy_id, Card.board_id != copy_id)
+        )
+        assert foreign == 0
+
+
+def test_board_ids_stored_compactly(client):
+    from sqlalchemy import text
+
+    from tests.conftest import TestingSessionLocal
+
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    client.post(f"/api/boards/{board['id']}/cards", json={})
+    with TestingSessionLocal() as db:
+        stored = db.execute(text("SELECT length(id), length(board_id) FROM cards")).one()
+    assert tuple(stored) == (16, 16)
+    # The API still speaks the canonical string form
+    assert client.get(f"/api/boards/{board['id']}").json()["id"] == board["id"]
+
+
+def test_get_board_compact(client):
+    board = client.post("/api/boards", json={"name": "Compact"}).json()
+    card1 = client.post(
+        f"/api/boards/{board['id']}/cards", json={"content": "A", "x": 20.0}
+    ).json()
+    card2 = client.post(
+        f"/api/boards/{board['id']}/cards", json={"content": "B"}
+    ).json()
+    conn = client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": card1["id"], "to_card_id": card2["id"]},
+    ).json()
+    resp = client.get(f"/api/boards/{board['id']}", params={"compact": True})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["name"] == "Compact"
+    cards = data["cards"]
+    assert "board_id" not in cards
+    index = cards["id"].index(card1["id"])
+    assert cards["content"][index] == "A"
+    assert cards["x"][index] == 20.0
+    assert isinstance(cards["created_at"][index], int)
+    assert data["connections"] == {
+        "id": [conn["id"]],
+        "from_card_id": [card1["id"]],
+        "to_card_id": [card2["id"]],
+        "color": ["#92400E"],
+        "version": [1],
+        **{
+            name: [conn[name]]
+            for name in ("start_x", "start_y", "control_x", "control_y", "end_x", "end_y")
+        },
+    }
+
+
+def test_get_board_compact_empty(client):
+    board = client.post("/api/boards", json={"name": "Empty"}).json()
+    data = client.get(
+        f"/api/boards/{board['id']}", params={"compact": True}
+    ).json()
+    assert data["cards"]["id"] == []
+    assert data["connections"]["id"] == []
+
+
+def test_large_responses_are_gzipped(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    for i in range(20):
+        client.post(
+            f"/api/boards/{board['id']}/cards", json={"content": f"Card {i}"}
+        )
+    resp = client.get(
+        f"/api/boards/{board['id']}", headers={"Accept-Encoding": "gzip"}
+    )
+    assert resp.headers["content-encoding"] == "gzip"
+    assert len(resp.json()["cards"]) == 20
+    # Below the threshold the body is sent as-is
+    resp = client.get("/api/boards", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+
+
+def test_get_board_fields(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card1 = client.post(
+        f"/api/boards/{board['id']}/cards", json={"content": "Body", "x": 30.0}
+    ).json()
+    card2 = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": card1["id"], "to_card_id": card2["id"]},
+    )
+    resp = client.get(
+        f"/api/boards/{board['id']}", params={"fields": "x,y,color"}
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["name"] == "Board"
+    assert all(set(c) == {"id", "x", "y", "color"} for c in data["cards"])
+    assert {c["id"]: c["x"] for c in data["cards"]}[card1["id"]] == 30.0
+    assert len(data["connections"]) == 1
+
+
+def test_get_board_compact_fields(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    client.post(f"/api/boards/{board['id']}/cards", json={"x": 30.0})
+    data = client.get(
+        f"/api/boards/{board['id']}", params={"compact": True, "fields": "x"}
+    ).json()
+    assert set(data["cards"]) == {"id", "x"}
+    assert data["cards"]["x"] == [30.0]
+
+
+def test_board_ids_in_any_uuid_form(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    resp = client.get(f"/api/boards/{board['id'].upper()}")
+    assert resp.status_code == 200
+    assert resp.json()["id"] == board["id"]
@@ -1,3 +1,7 @@
+from app.models import Card
+from tests.conftest import write_after_first_read
+
+
 def test_create_card(client):
     board = client.post("/api/boards", json={"name": "Board"}).json()
     resp = client.post(
@@ -165,3 +169,418 @@ def test_card_invalid_color(client):
         f"/api/boards/{board['id']}/cards", json={"color": "red"}
     )
     assert resp.status_code == 422
+
+
+def test_raise_card(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card1 = client.post(
+        f"/api/boards/{board['id']}/cards", json={"z_index": 3}
+    ).json()
+    card2 = client.post(
+        f"/api/boards/{board['id']}/cards", json={"z_index": 7}
+    ).json()
+    resp = client.post(f"/api/cards/{card1['id']}/raise")
+    assert resp.status_code == 200
+    assert resp.json()["z_index"] == 8
+    # Raising the top card again does not grow the value
+    resp = client.post(f"/api/cards/{card1['id']}/raise")
+    assert resp.json()["z_index"] == 8
+    resp = client.post(f"/api/cards/{card2['id']}/raise")
+    assert resp.json()["z_index"] == 9
+
+
+def test_lower_card(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    client.post(f"/api/boards/{board['id']}/cards", json={"z_index": 3})
+    card = client.post(
+        f"/api/boards/{board['id']}/cards", json={"z_index": 7}
+    ).json()
+    resp = client.post(f"/api/cards/{card['id']}/lower")
+    assert resp.status_code == 200
+    assert resp.json()["z_index"] == 2
+
+
+def test_raise_only_considers_same_board(client):
+    board1 = client.post("/api/boards", json={"name": "Board 1"}).json()
+    board2 = client.post("/api/boards", json={"name": "Board 2"}).json()
+    client.post(f"/api/boards/{board2['id']}/cards", json={"z_index": 100})
+    card = client.post(
+        f"/api/boards/{board1['id']}/cards", json={"z_index": 4}
+    ).json()
+    resp = client.post(f"/api/cards/{card['id']}/raise")
+    assert resp.json()["z_index"] == 4
+
+
+def test_raise_card_not_found(client):
+    resp = client.post("/api/cards/nonexistent-id/raise")
+    assert resp.status_code == 404
+
+
+def test_normalize_z_indexes(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    ids = [
+        client.post(
+            f"/api/boards/{board['id']}/cards", json={"z_index": z}
+        ).json()["id"]
+        for z in (500, -20, 9000)
+    ]
+    resp = client.post(f"/api/boards/{board['id']}/cards/normalize-z")
+    assert resp.status_code == 204
+    cards = client.get(f"/api/boards/{board['id']}").json()["cards"]
+    z_by_id = {c["id"]: c["z_index"] for c in cards}
+    assert [z_by_id[i] for i in ids] == [2, 1, 3]
+
+
+def test_normalize_z_indexes_board_not_found(client):
+    resp = client.post("/api/boards/nonexistent-id/cards/normalize-z")
+    assert resp.status_code == 404
+
+
+def test_get_card(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(
+        f"/api/boards/{board['id']}/cards", json={"content": "Hi"}
+    ).json()
+    resp = client.get(f"/api/cards/{card['id']}")
+    assert resp.status_code == 200
+    assert resp.json() == card
+
+
+def test_get_card_fields(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(
+        f"/api/boards/{board['id']}/cards",
+        json={"content": "Long body", "x": 12.0, "color": "#DBEAFE"},
+    ).json()
+    resp = client.get(f"/api/cards/{card['id']}", params={"fields": "x,color"})
+    assert resp.status_code == 200
+    assert resp.json() == {"id": card["id"], "x": 12.0, "color": "#DBEAFE"}
+
+
+def test_get_card_not_found(client):
+    resp = client.get("/api/cards/nonexistent-id")
+    assert resp.status_code == 404
+
+
+def test_list_cards_fields(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    for x in (10.0, 20.0):
+        client.post(f"/api/boards/{board['id']}/cards", json={"x": x})
+    resp = client.get(
+        f"/api/boards/{board['id']}/cards", params={"fields": "x, y"}
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert sorted(c["x"] for c in data) == [10.0, 20.0]
+    assert all(set(c) == {"id", "x", "y"} for c in data)
+
+
+def test_list_cards_unknown_field(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    resp = client.get(
+        f"/api/boards/{board['id']}/cards", params={"fields": "x,secret"}
+    )
+    assert resp.status_code == 400
+    assert "secret" in resp.json()["detail"]
+
+
+def test_list_cards_board_not_found(client):
+    resp = client.get("/api/boards/nonexistent-id/cards")
+    assert resp.status_code == 404
+
+
+def test_update_card_bumps_version(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    assert card["version"] == 1
+    resp = client.patch(f"/api/cards/{card['id']}", json={"x": 40.0})
+    assert resp.json()["version"] == 2
+    assert resp.headers["etag"] == '"2"'
+
+
+def test_update_card_expected_version(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    resp = client.patch(
+        f"/api/cards/{card['id']}", json={"x": 40.0, "expected_version": 1}
+    )
+    assert resp.status_code == 200
+    # A second writer still holding version 1 is rejected
+    resp = client.patch(
+        f"/api/cards/{card['id']}", json={"x": 60.0, "expected_version": 1}
+    )
+    assert resp.status_code == 409
+    assert client.get(f"/api/cards/{card['id']}").json()["x"] == 40.0
+
+
+def test_update_card_retries_lost_race(client, monkeypatch):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    calls = write_after_first_read(monkeypatch, Card, {"x": 25.0})
+    resp = client.patch(f"/api/cards/{card['id']}", json={"x": 40.0})
+    assert resp.status_code == 200
+    assert resp.json()["version"] == 3
+    assert len(calls) == 2
+    monkeypatch.undo()
+    # The inverse is the other writer's value, not the one first read
+    client.post(f"/api/boards/{board['id']}/undo")
+    assert client.get(f"/api/cards/{card['id']}").json()["x"] == 25.0
+
+
+def test_update_card_lost_race_with_version_conflicts(client, monkeypatch):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    write_after_first_read(monkeypatch, Card, {"x": 25.0})
+    resp = client.patch(
+        f"/api/cards/{card['id']}", json={"x": 40.0, "expected_version": 1}
+    )
+    assert resp.status_code == 409
+
+
+def test_batch_update_retries_lost_race(client, monkeypatch):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    write_after_first_read(monkeypatch, Card, {"y": 25.0})
+    resp = client.patch(
+        "/api/cards/batch", json={"cards": [{"id": card["id"], "x": 50.0}]}
+    )
+    assert resp.status_code == 200
+    assert resp.json()[0]["version"] == 3
+    assert resp.json()[0]["y"] == 25.0
+
+
+def test_update_card_if_match(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    etag = client.get(f"/api/cards/{card['id']}").headers["etag"]
+    resp = client.patch(
+        f"/api/cards/{card['id']}", json={"y": 20.0}, headers={"If-Match": etag}
+    )
+    assert resp.status_code == 200
+    resp = client.patch(
+        f"/api/cards/{card['id']}", json={"y": 30.0}, headers={"If-Match": etag}
+    )
+    assert resp.status_code == 409
+    resp = client.patch(
+        f"/api/cards/{card['id']}", json={"y": 30.0}, headers={"If-Match": "abc"}
+    )
+    assert resp.status_code == 400
+
+
+def test_batch_update_version_conflict_is_atomic(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card1 = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    card2 = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    client.patch(f"/api/cards/{card2['id']}", json={"x": 5.0})
+    resp = client.patch(
+        "/api/cards/batch",
+        json={
+            "cards": [
+                {"id": card1["id"], "x": 50.0, "expected_version": 1},
+                {"id": card2["id"], "x": 70.0, "expected_version": 1},
+            ]
+        },
+    )
+    assert resp.status_code == 409
+    assert client.get(f"/api/cards/{card1['id']}").json()["x"] == 10.0
+
+
+def test_batch_update_same_card_twice(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    resp = client.patch(
+        "/api/cards/batch",
+        json={
+            "cards": [
+                {"id": card["id"], "x": 50.0, "expected_version": 1},
+                {"id": card["id"].upper(), "y": 70.0},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    [updated] = resp.json()
+    assert (updated["x"], updated["y"], updated["version"]) == (50.0, 70.0, 2)
+
+
+def test_empty_update_changes_nothing(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    client.patch(f"/api/cards/{card['id']}", json={"x": 40.0})
+    client.post(f"/api/boards/{board['id']}/undo")
+    resp = client.patch(f"/api/cards/{card['id']}", json={})
+    assert resp.status_code == 200
+    assert resp.json()["version"] == 3
+    # The undone move can still be redone
+    assert client.post(f"/api/boards/{board['id']}/redo").status_code == 200
+    assert client.get(f"/api/cards/{card['id']}").json()["x"] == 40.0
+
+
+def test_update_card_uppercase_id(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    resp = client.patch(f"/api/cards/{card['id'].upper()}", json={"x": 40.0})
+    assert resp.status_code == 200
+    assert resp.json()["id"] == card["id"]
+
+
+def test_card_content_is_deduplicated(client):
+    from sqlalchemy import func, select
+
+    from app.models import CardContent
+    from tests.conftest import TestingSessionLocal
+
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    for _ in range(3):
+        client.post(f"/api/boards/{board['id']}/cards", json={"content": "Same note"})
+    client.post(f"/api/boards/{board['id']}/cards", json={})
+    client.post(f"/api/boards/{board['id']}/duplicate", json={})
+    with TestingSessionLocal() as db:
+        # "Same note" and the empty body
+        assert db.scalar(select(func.count()).select_from(CardContent)) == 2
+
+
+def test_unused_content_is_collected(client):
+    from sqlalchemy import select
+
+    from app import contents
+    from app.models import CardContent
+    from tests.conftest import TestingSessionLocal
+
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={"content": "Old"}).json()
+    client.post(f"/api/boards/{board['id']}/snapshots", json={"name": "Before"})
+    client.patch(f"/api/cards/{card['id']}", json={"content": "New"})
+    with TestingSessionLocal() as db:
+        contents.store_content(db, "Stray")
+        assert contents.collect_garbage(db) == 1
+        db.commit()
+        # "Old" lives on in the journal and the snapshot
+        assert set(db.scalars(select(CardContent.body))) == {"Old", "New"}
+
+    client.delete(f"/api/boards/{board['id']}")
+    with TestingSessionLocal() as db:
+        assert contents.collect_garbage(db) == 2
+        db.commit()
+
+
+def test_update_card_null_content(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    resp = client.patch(f"/api/cards/{card['id']}", json={"content": None})
+    assert resp.status_code == 422
+    resp = client.patch("/api/cards/nonexistent-id", json={"content": "Hi"})
+    assert resp.status_code == 404
+
+
+def test_large_card_content_is_compressed(client):
+    from sqlalchemy import text
+
+    from tests.conftest import TestingSessionLocal
+
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    body = "All work and no play makes Jack a dull boy. " * 500
+    card = client.post(
+        f"/api/boards/{board['id']}/cards", json={"content": body}
+    ).json()
+    assert card["content"] == body
+    assert client.get(f"/api/boards/{board['id']}").json()["cards"][0]["content"] == body
+    with TestingSessionLocal() as db:
+        stored = db.execute(text("SELECT body FROM card_contents")).scalars().all()
+    assert any(value[:1] == b"z" and len(value) < len(body) // 10 for value in stored)
+
+
+def test_update_card_content_undo(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card = client.post(
+        f"/api/boards/{board['id']}/cards", json={"content": "First"}
+    ).json()
+    resp = client.patch(f"/api/cards/{card['id']}", json={"content": "Second"})
+    assert resp.json()["content"] == "Second"
+    client.post(f"/api/boards/{board['id']}/undo")
+    assert client.get(f"/api/cards/{card['id']}").json()["content"] == "First"
+    client.post(f"/api/boards/{board['id']}/redo")
+    assert client.get(f"/api/cards/{card['id']}").json()["content"] == "Second"
+
+
+def test_query_cards_filters(client):
+    board1 = client.post("/api/boards", json={"name": "One"}).json()
+    board2 = client.post("/api/boards", json={"name": "Two"}).json()
+    red = client.post(
+        f"/api/boards/{board1['id']}/cards",
+        json={"color": "#FF0000", "x": 0.0, "y": 0.0},
+    ).json()
+    blue = client.post(
+        f"/api/boards/{board1['id']}/cards",
+        json={"color": "#0000FF", "x": 60.0, "y": 60.0},
+    ).json()
+    other_red = client.post(
+        f"/api/boards/{board2['id']}/cards",
+        json={"color": "#FF0000", "x": 60.0, "y": 60.0},
+    ).json()
+
+    def query(**params):
+        resp = client.get("/api/cards/query", params=params)
+        assert resp.status_code == 200
+        return set(resp.json()["ids"])
+
+    assert query(color="#FF0000") == {red["id"], other_red["id"]}
+    assert query(color=["#FF0000", "#0000FF"], board_id=board1["id"]) == {
+        red["id"],
+        blue["id"],
+    }
+    # Overlap, not containment: the red card spans x 0-15
+    assert query(x_min=10, x_max=20, y_max=50) == {red["id"]}
+    assert query(updated_after="2000-01-01T00:00:00Z") == {
+        red["id"],
+        blue["id"],
+        other_red["id"],
+    }
+    assert query(updated_before="2000-01-01T00:00:00+02:00") == set()
+
+
+def test_query_cards_pagination(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    for _ in range(5):
+        client.post(f"/api/boards/{board['id']}/cards", json={})
+    page = client.get("/api/cards/query", params={"limit": 3}).json()
+    assert len(page["ids"]) == 3
+    rest = client.get(
+        "/api/cards/query", params={"limit": 3, "after": page["next_after"]}
+    ).json()
+    assert len(rest["ids"]) == 2
+    assert rest["next_after"] is None
+    assert set(page["ids"]).isdisjoint(rest["ids"])
+
+
+def test_query_cards_malformed_cursor(client):
+    resp = client.get("/api/cards/query", params={"after": "garbage"})
+    assert resp.status_code == 400
+
+
+def test_card_filters_malformed_board_id(client):
+    resp = client.get("/api/cards/query", params={"board_id": "garbage"})
+    assert resp.status_code == 400
+    resp = client.get(
+        "/api/cards/counts", params={"group_by": "board", "board_id": "garbage"}
+    )
+    assert resp.status_code == 400
+
+
+def test_count_cards(client):
+    board1 = client.post("/api/boards", json={"name": "One"}).json()
+    board2 = client.post("/api/boards", json={"name": "Two"}).json()
+    for board, color in [(board1, "#FF0000"), (board1, "#FF0000"), (board2, "#0000FF")]:
+        client.post(f"/api/boards/{board['id']}/cards", json={"color": color})
+
+    resp = client.get("/api/cards/counts", params={"group_by": "color"})
+    assert resp.json() == {
+        "group_by": "color",
+        "counts": {"#FF0000": 2, "#0000FF": 1},
+        "total": 3,
+    }
+    resp = client.get(
+        "/api/cards/counts", params={"group_by": "board", "color": "#FF0000"}
+    )
+    assert resp.json()["counts"] == {board1["id"]: 2}
+    resp = client.get("/api/cards/counts", params={"group_by": "z_index"})
+    assert resp.status_code == 422
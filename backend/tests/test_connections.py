@@ -1,3 +1,7 @@
+from app.models import Connection
+from tests.conftest import write_after_first_read
+
+
 def _setup_board_with_cards(client):
     """Helper: create a board with two cards and return (board, card1, card2)."""
     board = client.post("/api/boards", json={"name": "Board"}).json()
@@ -162,3 +166,98 @@ def test_connection_invalid_color(client):
         },
     )
     assert resp.status_code == 422
+
+
+def test_update_connection_version_conflict(client):
+    board, card1, card2 = _setup_board_with_cards(client)
+    conn = client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": card1["id"], "to_card_id": card2["id"]},
+    ).json()
+    assert conn["version"] == 1
+    resp = client.patch(
+        f"/api/connections/{conn['id']}",
+        json={"color": "#0000FF", "expected_version": 1},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["version"] == 2
+    resp = client.patch(
+        f"/api/connections/{conn['id']}",
+        json={"color": "#00FF00"},
+        headers={"If-Match": '"1"'},
+    )
+    assert resp.status_code == 409
+
+
+def test_update_connection_retries_lost_race(client, monkeypatch):
+    board, card1, card2 = _setup_board_with_cards(client)
+    conn = client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": card1["id"], "to_card_id": card2["id"]},
+    ).json()
+    write_after_first_read(monkeypatch, Connection, {"color": "#00FF00"})
+    resp = client.patch(f"/api/connections/{conn['id']}", json={"color": "#0000FF"})
+    assert resp.status_code == 200
+    assert resp.json()["version"] == 3
+    monkeypatch.undo()
+    # The inverse is the other writer's color, not the one first read
+    client.post(f"/api/boards/{board['id']}/undo")
+    connections = client.get(f"/api/boards/{board['id']}").json()["connections"]
+    assert connections[0]["color"] == "#00FF00"
+
+
+def _geometry(connection):
+    return [
+        connection[name]
+        for name in ("start_x", "start_y", "control_x", "control_y", "end_x", "end_y")
+    ]
+
+
+def test_connection_geometry(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    left = client.post(
+        f"/api/boards/{board['id']}/cards", json={"x": 10.0, "y": 10.0}
+    ).json()
+    right = client.post(
+        f"/api/boards/{board['id']}/cards", json={"x": 50.0, "y": 10.0}
+    ).json()
+    conn = client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": left["id"], "to_card_id": right["id"]},
+    ).json()
+    # Right edge of the left card to the left edge of the right card, bowed
+    # by the capped offset of 5
+    assert _geometry(conn) == [25.0, 15.0, 37.5, 20.0, 50.0, 15.0]
+
+
+def test_connection_geometry_follows_card_moves(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    a = client.post(f"/api/boards/{board['id']}/cards", json={"x": 10.0}).json()
+    b = client.post(f"/api/boards/{board['id']}/cards", json={"x": 50.0}).json()
+    c = client.post(f"/api/boards/{board['id']}/cards", json={"x": 50.0, "y": 60.0}).json()
+    for target in (b, c):
+        client.post(
+            f"/api/boards/{board['id']}/connections",
+            json={"from_card_id": a["id"], "to_card_id": target["id"]},
+        )
+
+    def geometry_by_target():
+        detail = client.get(f"/api/boards/{board['id']}").json()
+        return {conn["to_card_id"]: _geometry(conn) for conn in detail["connections"]}
+
+    before = geometry_by_target()
+    client.patch(f"/api/cards/{b['id']}", json={"y": 30.0})
+    after_move = geometry_by_target()
+    assert after_move[b["id"]] != before[b["id"]]
+    assert after_move[c["id"]] == before[c["id"]]
+
+    client.patch(
+        "/api/cards/batch", json={"cards": [{"id": a["id"], "x": 20.0, "y": 40.0}]}
+    )
+    after_batch = geometry_by_target()
+    assert after_batch[b["id"]] != after_move[b["id"]]
+    assert after_batch[c["id"]] != after_move[c["id"]]
+
+    # Undoing the batch move puts the geometry back as well
+    client.post(f"/api/boards/{board['id']}/undo")
+    assert geometry_by_target() == after_move
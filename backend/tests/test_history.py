@@ -0,0 +1,149 @@
+def _board(client):
+    return client.post("/api/boards", json={"name": "Board"}).json()
+
+
+def _cards(client, board_id):
+    return client.get(f"/api/boards/{board_id}").json()["cards"]
+
+
+def test_undo_redo_create_card(client):
+    board = _board(client)
+    card = client.post(
+        f"/api/boards/{board['id']}/cards", json={"content": "Note"}
+    ).json()
+    resp = client.post(f"/api/boards/{board['id']}/undo")
+    assert resp.status_code == 200
+    assert resp.json()["kind"] == "create_card"
+    assert _cards(client, board["id"]) == []
+
+    resp = client.post(f"/api/boards/{board['id']}/redo")
+    assert resp.status_code == 200
+    (restored,) = _cards(client, board["id"])
+    assert restored["id"] == card["id"]
+    assert restored["content"] == "Note"
+
+
+def test_undo_update_card(client):
+    board = _board(client)
+    card = client.post(
+        f"/api/boards/{board['id']}/cards", json={"content": "Old", "x": 5.0}
+    ).json()
+    client.patch(f"/api/cards/{card['id']}", json={"content": "New", "x": 50.0})
+    client.post(f"/api/boards/{board['id']}/undo")
+    (restored,) = _cards(client, board["id"])
+    assert restored["content"] == "Old"
+    assert restored["x"] == 5.0
+    client.post(f"/api/boards/{board['id']}/redo")
+    (redone,) = _cards(client, board["id"])
+    assert redone["content"] == "New"
+    assert redone["x"] == 50.0
+
+
+def test_undo_batch_move_is_one_operation(client):
+    board = _board(client)
+    cards = [
+        client.post(
+            f"/api/boards/{board['id']}/cards", json={"x": 1.0, "y": 2.0}
+        ).json()
+        for _ in range(20)
+    ]
+    client.patch(
+        "/api/cards/batch",
+        json={"cards": [{"id": c["id"], "x": 60.0, "y": 70.0} for c in cards]},
+    )
+    resp = client.post(f"/api/boards/{board['id']}/undo")
+    assert resp.json()["kind"] == "update_cards"
+    assert all(
+        (c["x"], c["y"]) == (1.0, 2.0) for c in _cards(client, board["id"])
+    )
+
+
+def test_undo_delete_card_restores_connections(client):
+    board = _board(client)
+    card1 = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    card2 = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    conn = client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": card1["id"], "to_card_id": card2["id"]},
+    ).json()
+    client.delete(f"/api/cards/{card1['id']}")
+    client.post(f"/api/boards/{board['id']}/undo")
+    detail = client.get(f"/api/boards/{board['id']}").json()
+    assert {c["id"] for c in detail["cards"]} == {card1["id"], card2["id"]}
+    assert [c["id"] for c in detail["connections"]] == [conn["id"]]
+
+    # Redo deletes the card again, cascading to the connection
+    client.post(f"/api/boards/{board['id']}/redo")
+    detail = client.get(f"/api/boards/{board['id']}").json()
+    assert [c["id"] for c in detail["cards"]] == [card2["id"]]
+    assert detail["connections"] == []
+
+
+def test_undo_connection_color(client):
+    board = _board(client)
+    card1 = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    card2 = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+    conn = client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": card1["id"], "to_card_id": card2["id"]},
+    ).json()
+    client.patch(f"/api/connections/{conn['id']}", json={"color": "#0000FF"})
+    client.post(f"/api/boards/{board['id']}/undo")
+    detail = client.get(f"/api/boards/{board['id']}").json()
+    assert detail["connections"][0]["color"] == "#92400E"
+
+
+def test_new_action_discards_redo(client):
+    board = _board(client)
+    client.post(f"/api/boards/{board['id']}/cards", json={})
+    client.post(f"/api/boards/{board['id']}/undo")
+    client.post(f"/api/boards/{board['id']}/cards", json={})
+    resp = client.post(f"/api/boards/{board['id']}/redo")
+    assert resp.status_code == 409
+
+
+def test_nothing_to_undo(client):
+    board = _board(client)
+    resp = client.post(f"/api/boards/{board['id']}/undo")
+    assert resp.status_code == 409
+    resp = client.post(f"/api/boards/{board['id']}/redo")
+    assert resp.status_code == 409
+
+
+def test_undo_board_not_found(client):
+    resp = client.post("/api/boards/nonexistent-id/undo")
+    assert resp.status_code == 404
+
+
+def test_history_is_pruned(client, monkeypatch):
+    from app import history
+
+    monkeypatch.setattr(history, "HISTORY_LIMIT", 3)
+    board = _board(client)
+    for _ in range(5):
+        client.post(f"/api/boards/{board['id']}/cards", json={})
+    for _ in range(3):
+        assert client.post(f"/api/boards/{board['id']}/undo").status_code == 200
+    assert client.post(f"/api/boards/{board['id']}/undo").status_code == 409
+    assert len(_cards(client, board["id"])) == 2
+
+
+def test_empty_operation_keeps_redo(client):
+    from app import history
+    from tests.conftest import TestingSessionLocal
+
+    board = _board(client)
+    client.post(f"/api/boards/{board['id']}/cards", json={})
+    client.post(f"/api/boards/{board['id']}/undo")
+    with TestingSessionLocal() as db:
+        history.record_operation(
+            db,
+            board["id"],
+            "update_cards",
+            undo=[history.update_step("cards", ["x"], [])],
+            redo=[history.delete_step("cards", [])],
+        )
+        db.commit()
+    resp = client.post(f"/api/boards/{board['id']}/redo")
+    assert resp.status_code == 200
+    assert resp.json()["kind"] == "create_card"
@@ -0,0 +1,180 @@
+import time
+import uuid
+
+import pytest
+
+from app import jobs
+from app.models import Job
+from tests.conftest import SQLALCHEMY_TEST_URL, TestingSessionLocal, engine
+
+
+@pytest.fixture
+def runner():
+    jobs.runner.start(TestingSessionLocal)
+    yield jobs.runner
+    jobs.runner.stop()
+
+
+def _wait(client, job, timeout=10.0):
+    """Poll a job until it leaves the queue and finishes; return its final state."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = client.get(f"/api/jobs/{job['id']}").json()
+        if data["status"] in ("succeeded", "failed", "cancelled"):
+            return data
+        time.sleep(0.02)
+    raise TimeoutError(f"job {job['id']} still {data['status']}")
+
+
+def _setup_board(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    card1 = client.post(f"/api/boards/{board['id']}/cards", json={"content": "A"}).json()
+    card2 = client.post(f"/api/boards/{board['id']}/cards", json={"content": "B"}).json()
+    client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": card1["id"], "to_card_id": card2["id"]},
+    )
+    return board
+
+
+def test_duplicate_board_job(client, runner):
+    board = _setup_board(client)
+    resp = client.post(f"/api/boards/{board['id']}/jobs/duplicate")
+    assert resp.status_code == 202
+    assert resp.json()["kind"] == "duplicate_board"
+
+    job = _wait(client, resp.json())
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    copy = client.get(f"/api/boards/{job['result']['board_id']}").json()
+    assert copy["name"] == "Board (copy)"
+    assert len(copy["cards"]) == 2
+    assert len(copy["connections"]) == 1
+
+
+def test_delete_board_job(client, runner):
+    board = _setup_board(client)
+    resp = client.post(f"/api/boards/{board['id']}/jobs/delete")
+    assert resp.status_code == 202
+
+    assert _wait(client, resp.json())["status"] == "succeeded"
+    assert client.get(f"/api/boards/{board['id']}").status_code == 404
+
+
+def test_snapshot_job(client, runner):
+    board = _setup_board(client)
+    resp = client.post(
+        f"/api/boards/{board['id']}/jobs/snapshot", json={"name": "Nightly"}
+    )
+    job = _wait(client, resp.json())
+    assert job["status"] == "succeeded"
+
+    snapshots = client.get(f"/api/boards/{board['id']}/snapshots").json()
+    assert [s["id"] for s in snapshots] == [job["result"]["snapshot_id"]]
+    assert snapshots[0]["name"] == "Nightly"
+
+
+def _claimed_job(kind: str, board_id: str, **params) -> str:
+    """Insert a job as if the runner had just claimed it; return its id."""
+    with TestingSessionLocal() as db:
+        job = jobs.enqueue(db, kind, board_id, **params)
+        job.status = "running"
+        db.commit()
+        return job.id
+
+
+def test_failed_job_records_error():
+    job_id = _claimed_job("duplicate_board", str(uuid.uuid4()), name="Copy")
+    jobs.run_job(job_id, {"progress": 0.0, "cancelled": False}, TestingSessionLocal)
+
+    with TestingSessionLocal() as db:
+        job = db.get(Job, job_id)
+        assert job.status == "failed"
+        assert job.error == "Board not found"
+
+
+def test_cancel_queued_job(client):
+    # No runner, so the job stays queued
+    board = _setup_board(client)
+    job = client.post(f"/api/boards/{board['id']}/jobs/delete").json()
+    assert job["status"] == "queued"
+
+    resp = client.post(f"/api/jobs/{job['id']}/cancel")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "cancelled"
+    assert resp.json()["finished_at"] is not None
+    assert client.get(f"/api/boards/{board['id']}").status_code == 200
+
+
+def test_cancelled_job_rolls_back(client):
+    board = _setup_board(client)
+    job_id = _claimed_job("delete_board", board["id"])
+    jobs.run_job(job_id, {"progress": 0.0, "cancelled": True}, TestingSessionLocal)
+
+    assert client.get(f"/api/jobs/{job_id}").json()["status"] == "cancelled"
+    assert client.get(f"/api/boards/{board['id']}").status_code == 200
+
+
+def test_get_job_not_found(client):
+    assert client.get("/api/jobs/nonexistent").status_code == 404
+    assert client.post("/api/jobs/nonexistent/cancel").status_code == 404
+    assert client.post("/api/boards/nonexistent/jobs/delete").status_code == 404
+
+
+def test_resume_picks_up_leftover_jobs(client, runner):
+    board = _setup_board(client)
+    # Queued by an earlier process; nothing has asked about it since
+    with TestingSessionLocal() as db:
+        job_id = jobs.enqueue(db, "delete_board", board["id"]).id
+        db.commit()
+    assert runner._poller is None
+    assert runner.resume()
+    assert runner._poller is not None
+    assert _wait(client, {"id": job_id})["status"] == "succeeded"
+
+
+def test_cpu_bound_job_on_process_pool(client, monkeypatch):
+    # Spawned workers read the database URL from the environment
+    monkeypatch.setenv("DATABASE_URL", SQLALCHEMY_TEST_URL)
+    monkeypatch.setattr(jobs, "JOB_PROCESSES", 1)
+    jobs.runner.start(TestingSessionLocal)
+    try:
+        board = _setup_board(client)
+        resp = client.post(f"/api/boards/{board['id']}/jobs/snapshot", json={})
+        job = _wait(client, resp.json(), timeout=60.0)
+    finally:
+        jobs.runner.stop()
+        # The worker's engine switched test.db to WAL, which other tests
+        # copying the file do not expect
+        engine.dispose()
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode = DELETE")
+    assert job["status"] == "succeeded"
+    snapshots = client.get(f"/api/boards/{board['id']}/snapshots").json()
+    assert [s["id"] for s in snapshots] == [job["result"]["snapshot_id"]]
+
+
+def test_queue_limit(client, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_QUEUE_LIMIT", 1)
+    board = _setup_board(client)
+    assert client.post(f"/api/boards/{board['id']}/jobs/delete").status_code == 202
+    assert client.post(f"/api/boards/{board['id']}/jobs/delete").status_code == 503
+
+
+def test_cancel_finished_job_is_unchanged(client):
+    board = _setup_board(client)
+    job_id = _claimed_job("delete_board", board["id"])
+    jobs.run_job(job_id, {"progress": 0.0, "cancelled": False}, TestingSessionLocal)
+
+    resp = client.post(f"/api/jobs/{job_id}/cancel")
+    assert resp.json()["status"] == "succeeded"
+    with TestingSessionLocal() as db:
+        assert db.get(Job, job_id).cancel_requested is False
+
+
+def test_collect_contents_job(client, runner):
+    resp = client.post("/api/jobs/collect-contents")
+    assert resp.status_code == 202
+    job = _wait(client, resp.json())
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"deleted": 0}
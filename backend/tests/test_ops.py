@@ -0,0 +1,198 @@
+def _board(client):
+    return client.post("/api/boards", json={"name": "Board"}).json()
+
+
+def _card(client, board_id, **fields):
+    return client.post(f"/api/boards/{board_id}/cards", json=fields).json()
+
+
+def _detail(client, board_id):
+    return client.get(f"/api/boards/{board_id}").json()
+
+
+def test_create_card_and_connect_it(client):
+    board = _board(client)
+    others = [_card(client, board["id"], content=str(i)) for i in range(3)]
+    resp = client.post(
+        f"/api/boards/{board['id']}/ops",
+        json={
+            "ops": [
+                {"op": "create_card", "temp_id": "new", "content": "Hub", "x": 40},
+                {"op": "update_card", "id": "new", "z_index": 7},
+                *(
+                    {"op": "create_connection", "from_card_id": "new", "to_card_id": c["id"]}
+                    for c in others
+                ),
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    card_id = data["ids"]["new"]
+    assert [r["op"] for r in data["results"]] == [
+        "create_card", "update_card", *["create_connection"] * 3
+    ]
+    assert data["results"][1]["id"] == card_id
+    (card,) = data["cards"]
+    assert (card["id"], card["content"], card["x"], card["z_index"]) == (
+        card_id, "Hub", 40, 7
+    )
+    assert len(data["connections"]) == 3
+    assert all(c["from_card_id"] == card_id for c in data["connections"])
+    assert all(c["start_x"] is not None for c in data["connections"])
+
+    detail = _detail(client, board["id"])
+    assert len(detail["cards"]) == 4
+    assert len(detail["connections"]) == 3
+
+
+def test_update_and_delete_existing_rows(client):
+    board = _board(client)
+    a, b, c = (_card(client, board["id"], content=n) for n in "abc")
+    connection = client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": a["id"], "to_card_id": b["id"]},
+    ).json()
+    resp = client.post(
+        f"/api/boards/{board['id']}/ops",
+        json={
+            "ops": [
+                {"op": "update_card", "id": a["id"], "x": 80, "expected_version": 1},
+                {"op": "update_card", "id": a["id"], "content": "moved"},
+                {"op": "update_connection", "id": connection["id"], "color": "#000000"},
+                {"op": "delete_card", "id": c["id"]},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    (card,) = data["cards"]
+    assert (card["x"], card["content"], card["version"]) == (80, "moved", 2)
+    (updated,) = data["connections"]
+    assert (updated["color"], updated["version"]) == ("#000000", 2)
+    assert data["deleted_card_ids"] == [c["id"]]
+
+    # Deleting a card takes its connections with it
+    resp = client.post(
+        f"/api/boards/{board['id']}/ops",
+        json={"ops": [{"op": "delete_card", "id": b["id"]}]},
+    )
+    assert resp.json()["deleted_connection_ids"] == [connection["id"]]
+    detail = _detail(client, board["id"])
+    assert [card["id"] for card in detail["cards"]] == [a["id"]]
+    assert detail["connections"] == []
+
+
+def test_failed_op_writes_nothing(client):
+    board = _board(client)
+    card = _card(client, board["id"])
+    resp = client.post(
+        f"/api/boards/{board['id']}/ops",
+        json={
+            "ops": [
+                {"op": "create_card", "temp_id": "new"},
+                {"op": "update_card", "id": card["id"], "x": 90},
+                {"op": "create_connection", "from_card_id": "new", "to_card_id": "new"},
+            ]
+        },
+    )
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "ops[2]: Cannot connect a card to itself"
+    (unchanged,) = _detail(client, board["id"])["cards"]
+    assert unchanged["x"] == card["x"]
+
+
+def test_op_errors(client):
+    board = _board(client)
+    card = _card(client, board["id"])
+    url = f"/api/boards/{board['id']}/ops"
+
+    resp = client.post(url, json={"ops": [{"op": "update_card", "id": "new", "x": 1},
+                                          {"op": "create_card", "temp_id": "new"}]})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "ops[0]: temp id new is used before it is created"
+
+    resp = client.post(url, json={"ops": [{"op": "delete_card", "id": card["id"]},
+                                          {"op": "delete_card", "id": card["id"]}]})
+    assert resp.status_code == 404
+    assert resp.json()["detail"] == "ops[1]: Card not found"
+
+    resp = client.post(
+        url, json={"ops": [{"op": "update_card", "id": card["id"], "expected_version": 5}]}
+    )
+    assert resp.status_code == 409
+
+    other = _board(client)
+    resp = client.post(
+        f"/api/boards/{other['id']}/ops",
+        json={"ops": [{"op": "delete_card", "id": card["id"]}]},
+    )
+    assert resp.status_code == 404
+    assert client.post("/api/boards/nonexistent/ops", json={"ops": [
+        {"op": "create_card"}]}).status_code == 404
+    assert client.post(url, json={"ops": [{"op": "explode"}]}).status_code == 422
+
+
+def test_ops_undo_redo_as_one_operation(client):
+    board = _board(client)
+    a, b = (_card(client, board["id"], content=n, x=5) for n in "ab")
+    client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": a["id"], "to_card_id": b["id"]},
+    )
+    client.post(
+        f"/api/boards/{board['id']}/ops",
+        json={
+            "ops": [
+                {"op": "create_card", "temp_id": "c", "content": "c"},
+                {"op": "create_connection", "from_card_id": "c", "to_card_id": a["id"]},
+                {"op": "update_card", "id": a["id"], "x": 60},
+                {"op": "delete_card", "id": b["id"]},
+            ]
+        },
+    )
+    before = _detail(client, board["id"])
+
+    resp = client.post(f"/api/boards/{board['id']}/undo")
+    assert resp.json()["kind"] == "apply_ops"
+    detail = _detail(client, board["id"])
+    assert sorted(c["content"] for c in detail["cards"]) == ["a", "b"]
+    assert {c["id"]: c["x"] for c in detail["cards"]}[a["id"]] == 5
+    assert [(c["from_card_id"], c["to_card_id"]) for c in detail["connections"]] == [
+        (a["id"], b["id"])
+    ]
+
+    client.post(f"/api/boards/{board['id']}/redo")
+    detail = _detail(client, board["id"])
+    assert sorted(c["id"] for c in detail["cards"]) == sorted(c["id"] for c in before["cards"])
+    assert detail["connections"][0]["id"] == before["connections"][0]["id"]
+
+
+def test_moving_a_card_returns_redrawn_connections(client):
+    board = _board(client)
+    a, b = (_card(client, board["id"], content=n) for n in "ab")
+    connection = client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": a["id"], "to_card_id": b["id"]},
+    ).json()
+    resp = client.post(
+        f"/api/boards/{board['id']}/ops",
+        json={"ops": [{"op": "update_card", "id": a["id"].upper(), "x": 70}]},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["results"][0]["id"] == a["id"]
+    (redrawn,) = data["connections"]
+    assert redrawn["id"] == connection["id"]
+    assert redrawn["start_x"] != connection["start_x"]
+    assert redrawn == _detail(client, board["id"])["connections"][0]
+
+
+def test_malformed_ref_names_the_op(client):
+    board = _board(client)
+    resp = client.post(
+        f"/api/boards/{board['id']}/ops",
+        json={"ops": [{"op": "delete_card", "id": "garbage"}]},
+    )
+    assert resp.status_code == 404
+    assert resp.json()["detail"].startswith("ops[0]")
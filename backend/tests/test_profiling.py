@@ -0,0 +1,105 @@
+import marshal
+
+import pytest
+from starlette.testclient import TestClient
+
+from app import profiling
+from app.database import get_db
+from app import main
+from tests.conftest import engine, override_get_db
+
+TOKEN = {"X-Corkboard-Profile": "secret"}
+
+
+@pytest.fixture
+def profiled(monkeypatch):
+    """A client for an app built with profiling on, against the test database."""
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "_captures", profiling.deque(maxlen=2))
+    monkeypatch.setattr(main, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(main, "engine", engine)
+    app = main.create_app()
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def test_profiling_is_not_installed_by_default(client):
+    board = client.post("/api/boards", json={"name": "Board"}, headers=TOKEN)
+    assert "X-Corkboard-Profile-Id" not in board.headers
+    assert client.get("/api/debug/profiles", headers=TOKEN).status_code == 404
+
+
+def test_profile_request(profiled):
+    board = profiled.post("/api/boards", json={"name": "Board"}).json()
+    resp = profiled.get(f"/api/boards/{board['id']}", headers=TOKEN)
+    assert resp.status_code == 200
+    capture_id = resp.headers["X-Corkboard-Profile-Id"]
+
+    (summary,) = profiled.get("/api/debug/profiles", headers=TOKEN).json()
+    assert summary["id"] == capture_id
+    assert summary["path"] == f"/api/boards/{board['id']}"
+    assert summary["status"] == 200
+
+    profile = profiled.get(f"/api/debug/profiles/{capture_id}", headers=TOKEN).json()
+    assert profile["query_count"] == len(profile["queries"]) > 0
+    boards_query = next(
+        q for q in profile["queries"] if q["statement"].lstrip().startswith("SELECT boards")
+    )
+    assert any("boards" in line for line in boards_query["plan"])
+    assert any("get_board" in f["function"] for f in profile["functions"])
+
+    resp = profiled.get(f"/api/debug/profiles/{capture_id}/pstats", headers=TOKEN)
+    stats = marshal.loads(resp.content)
+    assert any(name == "get_board" for _, _, name in stats)
+
+
+def test_profiles_need_token_and_are_bounded(profiled):
+    assert profiled.get("/api/debug/profiles").status_code == 403
+    assert profiled.get("/api/debug/profiles", headers={"X-Corkboard-Profile": "x"}).status_code == 403
+    wrong = profiled.get("/api/boards", headers={"X-Corkboard-Profile": "wrong"})
+    assert "X-Corkboard-Profile-Id" not in wrong.headers
+
+    ids = [profiled.get("/api/boards", headers=TOKEN).headers["X-Corkboard-Profile-Id"] for _ in range(3)]
+    listed = profiled.get("/api/debug/profiles", headers=TOKEN).json()
+    assert [p["id"] for p in listed] == ids[1:]
+    assert profiled.get(f"/api/debug/profiles/{ids[0]}", headers=TOKEN).status_code == 404
+
+
+def test_one_profiled_request_at_a_time(profiled):
+    assert profiling._active.acquire(blocking=False)
+    try:
+        resp = profiled.get("/api/boards", headers=TOKEN)
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "1"
+        # Requests without the token are unaffected
+        assert profiled.get("/api/boards").status_code == 200
+    finally:
+        profiling._active.release()
+    assert profiled.get("/api/boards", headers=TOKEN).status_code == 200
+
+
+def test_profile_replica_read(profiled, tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import database
+    from app.database import Base
+
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=replica)
+    monkeypatch.setattr(database, "replica_engine", replica)
+    monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(bind=replica))
+    monkeypatch.setattr(main, "replica_engine", replica)
+    monkeypatch.setattr(main, "REPLICA_DATABASE_URL", "sqlite:///replica.db")
+    app = main.create_app()
+    app.dependency_overrides[get_db] = override_get_db
+    profiled.post("/api/boards", json={"name": "Only on the primary"})
+    try:
+        resp = TestClient(app).get("/api/boards", headers=TOKEN)
+        assert resp.json() == []
+        capture = profiling.get_capture(resp.headers["X-Corkboard-Profile-Id"])
+        (query,) = capture.queries
+        assert "FROM boards" in query["statement"]
+        assert query["plan"]
+    finally:
+        replica.dispose()
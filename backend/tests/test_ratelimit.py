@@ -0,0 +1,89 @@
+from app import ratelimit
+
+
+def _create_board(client, name="Board"):
+    return client.post("/api/boards", json={"name": name}).json()
+
+
+def test_client_rate_limit(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "clients", ratelimit.RateLimiter(1, 2))
+    board = _create_board(client)
+    url = f"/api/boards/{board['id']}/cards"
+    assert client.post(url, json={"content": "A"}).status_code == 201
+    assert client.post(url, json={"content": "B"}).status_code == 201
+
+    resp = client.post(url, json={"content": "C"})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "1"
+    # Reads and non-card routes are not limited
+    assert len(client.get(url).json()) == 2
+    assert client.post("/api/boards", json={"name": "Other"}).status_code == 201
+
+    counts = client.get("/api/metrics").json()["admission"]
+    assert counts["mutations"]["admitted"] == 2
+    assert counts["mutations"]["limited_client"] == 1
+    assert "limited_client" in counts["last_rejected"]
+
+
+def test_client_key_behind_trusted_proxy(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "clients", ratelimit.RateLimiter(1, 1))
+    board = _create_board(client)
+    url = f"/api/boards/{board['id']}/cards"
+
+    def post(forwarded):
+        return client.post(url, json={}, headers={"X-Forwarded-For": forwarded})
+
+    # By default the header is ignored and everyone shares the peer's bucket
+    assert post("1.1.1.1").status_code == 201
+    assert post("2.2.2.2").status_code == 429
+
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUSTED_PROXIES", 1)
+    assert post("3.3.3.3").status_code == 201
+    # A client cannot pick its bucket by prepending to the header
+    assert post("4.4.4.4, 3.3.3.3").status_code == 429
+    assert post("4.4.4.4").status_code == 201
+
+
+def test_board_rate_limit(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "boards", ratelimit.RateLimiter(1, 1))
+    board = _create_board(client)
+    other = _create_board(client, "Other")
+    card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+
+    resp = client.patch(f"/api/cards/{card['id']}", json={"x": 50})
+    assert resp.status_code == 429
+    assert resp.json()["detail"] == "Too many changes to this board"
+    assert client.get(f"/api/cards/{card['id']}").json()["x"] == card["x"]
+    assert client.post(f"/api/boards/{other['id']}/cards", json={}).status_code == 201
+    assert client.get("/api/metrics").json()["admission"]["mutations"]["limited_board"] == 1
+
+
+def test_shed_when_too_many_writes_in_flight(client, monkeypatch):
+    busy = ratelimit.Admission(max_writes=1, max_latency=0)
+    busy.started()
+    monkeypatch.setattr(ratelimit, "admission", busy)
+    board = _create_board(client)
+
+    resp = client.post(f"/api/boards/{board['id']}/cards", json={})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "1"
+    assert client.get(f"/api/boards/{board['id']}/cards").status_code == 200
+
+    busy.finished(0.0)
+    assert client.post(f"/api/boards/{board['id']}/cards", json={}).status_code == 201
+
+
+def test_shed_when_writes_are_slow(client, monkeypatch):
+    slow = ratelimit.Admission(max_writes=0, max_latency=0.5)
+    for _ in range(5):
+        slow.started()
+        slow.finished(2.0)
+    monkeypatch.setattr(ratelimit, "admission", slow)
+    board = _create_board(client)
+
+    resp = client.post(f"/api/boards/{board['id']}/cards", json={})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) <= 5
+    admission = client.get("/api/metrics").json()["admission"]
+    assert admission["mutations"]["shed_latency"] == 1
+    assert admission["latency_ms"] == 2000.0
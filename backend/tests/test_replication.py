@@ -0,0 +1,102 @@
+import shutil
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.testclient import TestClient
+
+from app import database, main, replication
+from app.database import Base, get_db
+from tests.conftest import override_get_db
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A second SQLite file standing in for a replica of test.db."""
+    path = tmp_path / "replica.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(database, "replica_engine", engine)
+    monkeypatch.setattr(
+        database, "ReplicaSessionLocal", sessionmaker(autoflush=False, bind=engine)
+    )
+
+    def sync():
+        # "Replication": copy the primary over the replica
+        engine.dispose()
+        shutil.copy("test.db", path)
+
+    yield sync
+    engine.dispose()
+
+
+@pytest.fixture
+def routed(replica, monkeypatch):
+    monkeypatch.setattr(main, "REPLICA_DATABASE_URL", "sqlite:///replica.db")
+    app = main.create_app()
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def test_reads_go_to_replica(routed, replica):
+    board = routed.post("/api/boards", json={"name": "Board"}).json()
+    routed.cookies.clear()
+    # Not replicated yet, and this client has no pending write
+    assert routed.get("/api/boards").json() == []
+    assert routed.get(f"/api/boards/{board['id']}").status_code == 404
+
+    replica()
+    assert [b["id"] for b in routed.get("/api/boards").json()] == [board["id"]]
+
+
+def test_reads_own_writes_from_primary(routed, replica):
+    resp = routed.post("/api/boards", json={"name": "Board"})
+    assert replication.COOKIE in resp.cookies
+    board = resp.json()
+    card = routed.post(f"/api/boards/{board['id']}/cards", json={"content": "A"}).json()
+
+    # The cookie keeps this client's reads on the primary
+    assert routed.get(f"/api/boards/{board['id']}").json()["cards"][0]["id"] == card["id"]
+    assert routed.get(f"/api/cards/{card['id']}").status_code == 200
+
+    # Other clients read the (stale) replica
+    other = TestClient(routed.app)
+    assert other.get(f"/api/boards/{board['id']}").status_code == 404
+
+
+def test_write_token_expires_after_max_lag(routed, replica, monkeypatch):
+    routed.post("/api/boards", json={"name": "Board"})
+    token = routed.cookies[replication.COOKIE]
+    assert not replication.caught_up(token)
+
+    monkeypatch.setattr(replication, "REPLICA_MAX_LAG", 0)
+    assert replication.caught_up(token)
+    assert replication.caught_up(None)
+    assert routed.get("/api/boards").json() == []
+
+
+def test_failed_mutation_sets_no_token(routed):
+    resp = routed.post("/api/boards/nonexistent/cards", json={})
+    assert resp.status_code == 404
+    assert replication.COOKIE not in resp.cookies
+
+
+def test_without_replica_reads_use_primary(client):
+    resp = client.post("/api/boards", json={"name": "Board"})
+    assert replication.COOKIE not in resp.cookies
+    assert len(client.get("/api/boards").json()) == 1
+
+
+def test_token_is_issued_once_the_commit_succeeds():
+    from tests.conftest import TestingSessionLocal
+
+    pending = {}
+    reset = replication._pending.set(pending)
+    try:
+        with TestingSessionLocal() as db:
+            replication._before_commit(db)
+            assert "token" not in pending
+            replication._after_commit(db)
+    finally:
+        replication._pending.reset(reset)
+    assert replication.caught_up(pending["token"]) is False
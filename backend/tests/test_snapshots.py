@@ -0,0 +1,147 @@
+from sqlalchemy import func, select
+
+from app.models import SnapshotObject
+from tests.conftest import TestingSessionLocal
+
+
+def _object_count():
+    with TestingSessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(SnapshotObject))
+
+
+def _setup_board(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    cards = [
+        client.post(
+            f"/api/boards/{board['id']}/cards", json={"content": f"Card {i}"}
+        ).json()
+        for i in range(3)
+    ]
+    conn = client.post(
+        f"/api/boards/{board['id']}/connections",
+        json={"from_card_id": cards[0]["id"], "to_card_id": cards[1]["id"]},
+    ).json()
+    return board, cards, conn
+
+
+def test_create_and_list_snapshots(client):
+    board, _, _ = _setup_board(client)
+    resp = client.post(
+        f"/api/boards/{board['id']}/snapshots", json={"name": "Monday"}
+    )
+    assert resp.status_code == 201
+    data = resp.json()
+    assert data["name"] == "Monday"
+    assert data["card_count"] == 3
+    assert data["connection_count"] == 1
+
+    resp = client.get(f"/api/boards/{board['id']}/snapshots")
+    assert resp.status_code == 200
+    assert [s["id"] for s in resp.json()] == [data["id"]]
+
+
+def test_snapshots_share_unchanged_rows(client):
+    board, cards, _ = _setup_board(client)
+    client.post(f"/api/boards/{board['id']}/snapshots")
+    after_first = _object_count()
+    client.post(f"/api/boards/{board['id']}/snapshots")
+    assert _object_count() == after_first
+
+    client.patch(f"/api/cards/{cards[0]['id']}", json={"x": 42.0})
+    client.post(f"/api/boards/{board['id']}/snapshots")
+    # One new card record and the one page that holds it
+    assert _object_count() == after_first + 2
+
+
+def test_diff_against_live_board(client):
+    board, cards, conn = _setup_board(client)
+    snap = client.post(f"/api/boards/{board['id']}/snapshots").json()
+    client.patch(f"/api/cards/{cards[2]['id']}", json={"content": "Edited"})
+    client.delete(f"/api/cards/{cards[0]['id']}")
+    new_card = client.post(f"/api/boards/{board['id']}/cards", json={}).json()
+
+    resp = client.get(f"/api/boards/{board['id']}/snapshots/{snap['id']}/diff")
+    assert resp.status_code == 200
+    diff = resp.json()
+    assert diff["cards"] == {
+        "added": [new_card["id"]],
+        "removed": [cards[0]["id"]],
+        "changed": [cards[2]["id"]],
+    }
+    assert diff["connections"] == {
+        "added": [],
+        "removed": [conn["id"]],
+        "changed": [],
+    }
+
+
+def test_diff_between_snapshots(client):
+    board, cards, _ = _setup_board(client)
+    first = client.post(f"/api/boards/{board['id']}/snapshots").json()
+    client.patch(f"/api/cards/{cards[1]['id']}", json={"color": "#DBEAFE"})
+    second = client.post(f"/api/boards/{board['id']}/snapshots").json()
+    resp = client.get(
+        f"/api/boards/{board['id']}/snapshots/{first['id']}/diff",
+        params={"against": second["id"]},
+    )
+    assert resp.json()["cards"]["changed"] == [cards[1]["id"]]
+
+
+def test_restore_snapshot(client):
+    board, cards, conn = _setup_board(client)
+    before = client.get(f"/api/boards/{board['id']}").json()
+    snap = client.post(f"/api/boards/{board['id']}/snapshots").json()
+
+    client.patch(f"/api/cards/{cards[1]['id']}", json={"content": "Changed"})
+    client.delete(f"/api/cards/{cards[0]['id']}")
+    client.post(f"/api/boards/{board['id']}/cards", json={"content": "New"})
+
+    resp = client.post(
+        f"/api/boards/{board['id']}/snapshots/{snap['id']}/restore"
+    )
+    assert resp.status_code == 204
+    after = client.get(f"/api/boards/{board['id']}").json()
+
+    def by_id(rows):
+        # Restored rows get a fresh version so stale clients see a conflict
+        return sorted(
+            ({k: v for k, v in row.items() if k != "version"} for row in rows),
+            key=lambda row: row["id"],
+        )
+
+    assert by_id(after["cards"]) == by_id(before["cards"])
+    assert by_id(after["connections"]) == by_id(before["connections"])
+    versions = {c["id"]: c["version"] for c in after["cards"]}
+    assert versions[cards[1]["id"]] > cards[1]["version"]
+    # History from before the restore no longer applies
+    assert client.post(f"/api/boards/{board['id']}/undo").status_code == 409
+
+
+def test_restore_converges(client):
+    board, cards, _ = _setup_board(client)
+    snap = client.post(f"/api/boards/{board['id']}/snapshots").json()
+    client.patch(f"/api/cards/{cards[0]['id']}", json={"x": 50.0})
+    url = f"/api/boards/{board['id']}/snapshots/{snap['id']}"
+
+    client.post(f"{url}/restore")
+    empty = {"added": [], "removed": [], "changed": []}
+    assert client.get(f"{url}/diff").json() == {"cards": empty, "connections": empty}
+    # Nothing differs, so a second restore writes nothing
+    version = client.get(f"/api/cards/{cards[0]['id']}").json()["version"]
+    client.post(f"{url}/restore")
+    assert client.get(f"/api/cards/{cards[0]['id']}").json()["version"] == version
+
+
+def test_snapshot_not_found(client):
+    board = client.post("/api/boards", json={"name": "Board"}).json()
+    resp = client.post(
+        f"/api/boards/{board['id']}/snapshots/nonexistent-id/restore"
+    )
+    assert resp.status_code == 404
+    resp = client.get(f"/api/boards/{board['id']}/snapshots/nonexistent-id/diff")
+    assert resp.status_code == 404
+
+
+def test_snapshot_board_not_found(client):
+    resp = client.post("/api/boards/nonexistent-id/snapshots")
+    assert resp.status_code == 404